@@ -0,0 +1,192 @@
+"""
+Move old rows out of the hot tables into a separate archive database.
+
+    python -m app.archive [--older-than-days 730] [--table reviews] [--batch-size 5000] [--dry-run]
+
+Each table is processed in id-ordered chunks: a chunk is copied into the
+archive (ignoring rows already there, so an interrupted run can be resumed)
+and then deleted from the hot table, one transaction per chunk on each side.
+
+- audit_logs and reviews are archived by created_at;
+- booking_requests by created_at, once no longer pending and every one of
+  their slots has ended before the cutoff; each goes together with its slots
+  and pricing snapshot, in the same transactions, so a hot request always
+  keeps its children;
+- bookings by day, only in a terminal status and once no hot review still
+  points at them (reviews are archived first).
+
+Reviews are never archived inside the 12-month rating window.
+"""
+import argparse
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import Column, DateTime, Index, MetaData, Table, create_engine, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import config, models
+from app.db import engine
+
+MIN_REVIEW_AGE_DAYS = 365
+TERMINAL_BOOKING_STATUSES = ("completed", "cancelled", "rejected")
+ACTIVE_REQUEST_STATUSES = ("pending",)
+
+archive_metadata = MetaData()
+
+
+def _mirror(source: Table, age_column: str) -> Table:
+    """Same columns as the hot table, no foreign keys or checks, plus archived_at.
+
+    age_column is indexed; for child tables it is the parent's id.
+    """
+    columns = [
+        Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False)
+        for c in source.columns
+    ]
+    return Table(
+        source.name, archive_metadata, *columns,
+        Column("archived_at", DateTime, nullable=False),
+        Index(f"archive_{source.name}_{age_column}_idx", age_column),
+    )
+
+
+def _eligible(name: str, table: Table, cutoff: datetime):
+    if name == "bookings":
+        reviewed = select(models.Review.id).where(models.Review.booking_id == table.c.id).exists()
+        return [
+            table.c.day < cutoff.date(),
+            table.c.status.in_(TERMINAL_BOOKING_STATUSES),
+            ~reviewed,
+        ]
+    if name == "booking_requests":
+        slots = models.BookingRequestSlot.__table__
+        running = select(slots.c.id).where(
+            slots.c.booking_request_id == table.c.id, slots.c.ends_at >= cutoff,
+        ).exists()
+        return [
+            table.c.created_at < cutoff,
+            table.c.status.not_in(ACTIVE_REQUEST_STATUSES),
+            ~running,
+        ]
+    return [table.c[TABLES[name][1]] < cutoff]
+
+
+# archive order matters: reviews before the bookings they reference
+TABLES: Dict[str, tuple] = {
+    "audit_logs": (models.AuditLog.__table__, "created_at"),
+    "reviews": (models.Review.__table__, "created_at"),
+    "booking_requests": (models.BookingRequest.__table__, "created_at"),
+    "bookings": (models.Booking.__table__, "day"),
+}
+ARCHIVE_TABLES = {name: _mirror(table, age) for name, (table, age) in TABLES.items()}
+# rows that live and die with a parent row: (table, column holding the parent id)
+CHILDREN: Dict[str, List[Tuple[Table, str]]] = {
+    "booking_requests": [
+        (models.BookingRequestSlot.__table__, "booking_request_id"),
+        (models.BookingPricingSnapshot.__table__, "booking_request_id"),
+    ],
+}
+ARCHIVE_CHILDREN = {
+    name: [(child, _mirror(child, column), column) for child, column in children]
+    for name, children in CHILDREN.items()
+}
+
+# archive tables browsable by id (the admin archive listing)
+BROWSABLE = {
+    **ARCHIVE_TABLES,
+    **{t.name: t for children in ARCHIVE_CHILDREN.values() for _, t, _ in children if "id" in t.c},
+}
+
+
+def _copy(aconn, target: Table, rows: List[dict], now: datetime) -> None:
+    """Insert rows into an archive table, skipping those already there."""
+    if rows:
+        aconn.execute(
+            sqlite_insert(target).on_conflict_do_nothing(index_elements=[c.name for c in target.primary_key]),
+            [{**r, "archived_at": now} for r in rows],
+        )
+
+_archive_engine = None
+
+
+def archive_engine():
+    global _archive_engine
+    if _archive_engine is None:
+        _archive_engine = create_engine(config.ARCHIVE_DATABASE_URL)
+        archive_metadata.create_all(bind=_archive_engine)
+    return _archive_engine
+
+
+def archive_table(name: str, older_than_days: int, batch_size: int = config.ARCHIVE_BATCH_SIZE,
+                  dry_run: bool = False, progress=None) -> int:
+    if name == "reviews" and older_than_days < MIN_REVIEW_AGE_DAYS:
+        raise ValueError(f"reviews feed 12-month ratings; use at least {MIN_REVIEW_AGE_DAYS} days")
+    table, _ = TABLES[name]
+    target = ARCHIVE_TABLES[name]
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    conditions = _eligible(name, table, cutoff)
+    moved = 0
+    last_id = 0
+    while True:
+        stmt = (
+            select(table)
+            .where(table.c.id > last_id, *conditions)
+            .order_by(table.c.id)
+            .limit(batch_size)
+        )
+        children = ARCHIVE_CHILDREN.get(name, [])
+        with engine.connect() as conn:
+            rows = [dict(r._mapping) for r in conn.execute(stmt)]
+            ids = [r["id"] for r in rows]
+            child_rows = [
+                [dict(r._mapping) for r in conn.execute(select(child).where(child.c[column].in_(ids)))]
+                for child, _, column in children
+            ] if ids and not dry_run else []
+        if not rows:
+            break
+        last_id = ids[-1]
+        if not dry_run:
+            now = datetime.utcnow()
+            with archive_engine().begin() as aconn:
+                for (_, child_target, _), crows in zip(children, child_rows):
+                    _copy(aconn, child_target, crows, now)
+                _copy(aconn, target, rows, now)
+            with engine.begin() as conn:
+                for child, _, column in children:
+                    conn.execute(child.delete().where(child.c[column].in_(ids)))
+                conn.execute(table.delete().where(table.c.id.in_(ids)))
+        moved += len(rows)
+        if progress is not None:
+            progress.write(f"{name}: {moved} rows {'eligible' if dry_run else 'archived'}\n")
+        if len(rows) < batch_size:
+            break
+    return moved
+
+
+def run(older_than_days: int = config.ARCHIVE_AFTER_DAYS, tables: Optional[List[str]] = None,
+        batch_size: int = config.ARCHIVE_BATCH_SIZE, dry_run: bool = False, progress=None) -> Dict[str, int]:
+    return {
+        name: archive_table(name, older_than_days, batch_size, dry_run, progress)
+        for name in TABLES
+        if not tables or name in tables
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Archive old rows into the archive database.")
+    parser.add_argument("--older-than-days", type=int, default=config.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--table", action="append", choices=sorted(TABLES))
+    parser.add_argument("--batch-size", type=int, default=config.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--dry-run", action="store_true", help="count eligible rows only")
+    args = parser.parse_args(argv)
+    try:
+        counts = run(args.older_than_days, args.table, args.batch_size, args.dry_run, sys.stderr)
+    except ValueError as e:
+        parser.error(str(e))
+    print(counts)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
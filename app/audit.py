@@ -0,0 +1,164 @@
+"""
+Buffered audit log writer.
+
+Admin mutations call record() after they commit; the entry goes into an
+in-process buffer and a background thread writes buffered entries with one
+executemany insert when AUDIT_FLUSH_SIZE entries are waiting or every
+AUDIT_FLUSH_INTERVAL seconds. stop() (wired to app shutdown and atexit)
+drains the buffer, so a clean shutdown loses nothing.
+
+When a batch insert fails its entries are retried one at a time, so one bad
+entry cannot hold back the rest: an entry the database rejects (an integrity
+or data error) is logged in full and dropped, while an operational error
+(database locked or unreachable) puts the entries not yet written back at
+the head of the buffer for the next flush.
+
+Entries from the shared admin API key have no user behind them and are
+written with a NULL actor_user_id; ensure_nullable_actor() relaxes the
+NOT NULL constraint of databases created before that.
+"""
+import atexit
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Any, List, Optional
+
+from sqlalchemy import insert, text
+from sqlalchemy.exc import OperationalError
+
+from app import config, metrics, models
+from app.db import engine
+
+logger = logging.getLogger(__name__)
+
+
+class AuditBuffer:
+    def __init__(self, flush_size: int, flush_interval: float, max_buffer: int):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self._pending: List[dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, entry: dict) -> None:
+        with self._lock:
+            self._pending.append(entry)
+            overflow = len(self._pending) - self.max_buffer
+            if overflow > 0:
+                # database unreachable for a long time: keep the newest entries
+                del self._pending[:overflow]
+                logger.error("audit buffer full, dropped %d entries", overflow)
+                metrics.AUDIT_DROPPED.inc("overflow", amount=overflow)
+            size = len(self._pending)
+        if self._thread is None:
+            self.start()
+        if size >= self.flush_size:
+            self._wake.set()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return 0
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(models.AuditLog.__table__), batch)
+            except Exception:
+                logger.exception("audit flush of %d entries failed, retrying them one at a time", len(batch))
+                return self._flush_each(batch)
+            return len(batch)
+
+    def _flush_each(self, batch: List[dict]) -> int:
+        written = 0
+        for i, entry in enumerate(batch):
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(models.AuditLog.__table__), [entry])
+            except OperationalError:
+                # the database is unavailable, not the entry: keep the rest for the next flush
+                logger.exception("audit flush failed, re-queueing %d entries", len(batch) - i)
+                with self._lock:
+                    self._pending[:0] = batch[i:]
+                break
+            except Exception:
+                logger.exception("audit entry rejected, dropping it: %s", json.dumps(entry, default=str, sort_keys=True))
+                metrics.AUDIT_DROPPED.inc("rejected")
+            else:
+                written += 1
+        return written
+
+    def _run(self) -> None:
+        while not self._stopping.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        thread = self._thread
+        if thread is not None:
+            self._stopping.set()
+            self._wake.set()
+            thread.join(timeout=10)
+            self._thread = None
+        self.flush()
+
+
+buffer = AuditBuffer(config.AUDIT_FLUSH_SIZE, config.AUDIT_FLUSH_INTERVAL, config.AUDIT_MAX_BUFFER)
+atexit.register(buffer.stop)
+
+
+def record(actor_user_id: Optional[int], action: str, entity_type: str,
+           entity_id: Optional[int] = None, details: Any = None) -> None:
+    """Queue one audit entry; details may be a string or anything JSON-serialisable."""
+    if details is not None and not isinstance(details, str):
+        details = json.dumps(details, default=str, sort_keys=True)
+    buffer.record({
+        "actor_user_id": actor_user_id,
+        "action": action,
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "details": details,
+        "created_at": datetime.utcnow(),
+    })
+
+
+def ensure_nullable_actor(engine) -> bool:
+    """Rebuild an SQLite audit_logs table whose actor_user_id is still NOT NULL.
+
+    Rows recorded for the shared API key under the old placeholder actor id 0
+    get a NULL actor. Returns whether the table was rebuilt.
+    """
+    if engine.dialect.name != "sqlite":
+        return False
+    table = models.AuditLog.__table__
+    with engine.begin() as conn:
+        columns = conn.execute(text(f"PRAGMA table_info({table.name})")).all()
+        if not any(c.name == "actor_user_id" and c.notnull for c in columns):
+            return False
+        old = f"{table.name}_old"
+        conn.execute(text(f"ALTER TABLE {table.name} RENAME TO {old}"))
+        # indexes follow the renamed table; free their names for the new one
+        for (name,) in conn.execute(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :t AND sql IS NOT NULL"
+        ), {"t": old}).all():
+            conn.execute(text(f'DROP INDEX "{name}"'))
+        table.create(conn)
+        names = ", ".join(c.name for c in table.columns)
+        selected = ", ".join("NULLIF(actor_user_id, 0)" if c.name == "actor_user_id" else c.name for c in table.columns)
+        conn.execute(text(f"INSERT INTO {table.name} ({names}) SELECT {selected} FROM {old}"))
+        conn.execute(text(f"DROP TABLE {old}"))
+    return True
@@ -0,0 +1,220 @@
+"""
+Effective availability: stored one-off slots plus lazily expanded recurrence rules.
+
+Rules (NannyAvailabilityRule) are expanded with dateutil only for the date range
+being asked about, and the expansion is cached per (nanny, range). Any stored
+NannyAvailability row for a day overrides the rule windows for that day, which
+is how a single day is changed without touching the weekly pattern.
+
+Rule writes call invalidate() for the writing worker and bump the
+"availability_rules" cache version (app.coherence) in their transaction; other
+workers see the new version and drop their whole rule cache.
+"""
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from dateutil.rrule import rruleset, rrulestr
+
+from app import coherence, models
+
+MAX_EXPAND_DAYS = 400
+CACHE_SIZE = 4096
+END_OF_DAY = time(23, 59)
+
+
+class Window(NamedTuple):
+    day: date
+    start_time: time
+    end_time: time
+    is_available: bool
+    source: str  # "slot" or "rule"
+    source_id: int
+
+
+def parse_exdates(raw: Optional[str]) -> List[date]:
+    if not raw:
+        return []
+    return [date.fromisoformat(x.strip()) for x in raw.split(",") if x.strip()]
+
+
+def build_ruleset(rule) -> rruleset:
+    """Raises ValueError for an unparseable rrule string."""
+    dtstart = datetime.combine(rule.starts_on, time(0, 0))
+    rs = rrulestr(rule.rrule, dtstart=dtstart, forceset=True)
+    for d in parse_exdates(rule.exdates):
+        rs.exdate(datetime.combine(d, time(0, 0)))
+    return rs
+
+
+def expand_rule(rule, start: date, end: date) -> List[Window]:
+    """Windows produced by one rule on days in [start, end]."""
+    last = min(end, rule.ends_on) if rule.ends_on else end
+    first = max(start, rule.starts_on)
+    if first > last:
+        return []
+    occurrences = build_ruleset(rule).between(
+        datetime.combine(first, time(0, 0)), datetime.combine(last, time(0, 0)), inc=True,
+    )
+    return [
+        Window(o.date(), rule.start_time, rule.end_time, rule.is_available, "rule", rule.id)
+        for o in occurrences
+    ]
+
+
+class _RuleCache:
+    """LRU of expanded rule windows keyed by (nanny_id, start, end), invalidated per nanny."""
+
+    def __init__(self, size: int = CACHE_SIZE):
+        self.size = size
+        self._data: "OrderedDict[tuple, Tuple[int, List[Window]]]" = OrderedDict()
+        self._versions: Dict[int, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def version(self, nanny_id: int) -> int:
+        return self._versions[nanny_id]
+
+    def get(self, key: tuple) -> Optional[List[Window]]:
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None or hit[0] != self._versions[key[0]]:
+                return None
+            self._data.move_to_end(key)
+            return hit[1]
+
+    def put(self, key: tuple, version: int, windows: List[Window]) -> None:
+        with self._lock:
+            self._data[key] = (version, windows)
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def invalidate(self, nanny_id: int) -> None:
+        with self._lock:
+            self._versions[nanny_id] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+rule_cache = _RuleCache()
+coherence.versions.subscribe(coherence.AVAILABILITY_RULES, rule_cache.clear)
+
+
+def invalidate(nanny_id: int) -> None:
+    """Call after any rule write for this nanny."""
+    rule_cache.invalidate(nanny_id)
+
+
+def rule_windows(db, nanny_id: int, start: date, end: date) -> List[Window]:
+    coherence.versions.revalidate(db)
+    key = (nanny_id, start, end)
+    cached = rule_cache.get(key)
+    if cached is not None:
+        return cached
+    version = rule_cache.version(nanny_id)
+    rules = (
+        db.query(models.NannyAvailabilityRule)
+        .filter(
+            models.NannyAvailabilityRule.nanny_id == nanny_id,
+            models.NannyAvailabilityRule.starts_on <= end,
+        )
+        .all()
+    )
+    windows: List[Window] = []
+    for rule in rules:
+        windows.extend(expand_rule(rule, start, end))
+    windows.sort()
+    rule_cache.put(key, version, windows)
+    return windows
+
+
+def windows(db, nanny_id: int, start: date, end: date) -> List[Window]:
+    """Effective windows on days in [start, end], stored slots overriding rules per day."""
+    if (end - start).days > MAX_EXPAND_DAYS:
+        raise ValueError(f"date range longer than {MAX_EXPAND_DAYS} days")
+    slots = (
+        db.query(models.NannyAvailability)
+        .filter(
+            models.NannyAvailability.nanny_id == nanny_id,
+            models.NannyAvailability.date >= start,
+            models.NannyAvailability.date <= end,
+        )
+        .all()
+    )
+    overridden = {s.date for s in slots}
+    out = [
+        Window(s.date, s.start_time, s.end_time, s.is_available, "slot", s.id) for s in slots
+    ]
+    out.extend(w for w in rule_windows(db, nanny_id, start, end) if w.day not in overridden)
+    out.sort()
+    return out
+
+
+def _wall_clock(dt: datetime) -> datetime:
+    """Availability windows are wall-clock times: compare a slot by its own clock, offset dropped."""
+    return dt.replace(tzinfo=None)
+
+
+def _segments(starts_at: datetime, ends_at: datetime) -> Iterable[Tuple[date, time, time]]:
+    """Split a booking window into per-day (day, start, end) pieces."""
+    starts_at, ends_at = _wall_clock(starts_at), _wall_clock(ends_at)
+    day = starts_at.date()
+    while day <= ends_at.date():
+        seg_start = starts_at.time() if day == starts_at.date() else time(0, 0)
+        seg_end = ends_at.time() if day == ends_at.date() else END_OF_DAY
+        if seg_end > seg_start:
+            yield day, seg_start, seg_end
+        day += timedelta(days=1)
+
+
+def _spans(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """Cover the given days with as few [start, end] ranges of at most MAX_EXPAND_DAYS as possible."""
+    spans: List[Tuple[date, date]] = []
+    for day in sorted(set(days)):
+        if spans and (day - spans[-1][0]).days <= MAX_EXPAND_DAYS:
+            spans[-1] = (spans[-1][0], day)
+        else:
+            spans.append((day, day))
+    return spans
+
+
+class Coverage:
+    """Answers "is the nanny available for this window" for many slots from one load per span."""
+
+    def __init__(self, db, nanny_id: int, spans: Iterable[Tuple[date, date]]):
+        self.by_day: Dict[date, List[Window]] = defaultdict(list)
+        for start, end in spans:
+            for w in windows(db, nanny_id, start, end):
+                if w.is_available:
+                    self.by_day[w.day].append(w)
+
+    def covers(self, starts_at: datetime, ends_at: datetime) -> bool:
+        for day, seg_start, seg_end in _segments(starts_at, ends_at):
+            if not any(w.start_time <= seg_start and w.end_time >= seg_end for w in self.by_day.get(day, ())):
+                return False
+        return True
+
+
+def has_availability(db, nanny_id: int) -> bool:
+    """Whether the nanny has any stored slot or rule; without either there is nothing to check against."""
+    slots = db.query(models.NannyAvailability.id).filter(models.NannyAvailability.nanny_id == nanny_id)
+    rules = db.query(models.NannyAvailabilityRule.id).filter(models.NannyAvailabilityRule.nanny_id == nanny_id)
+    return db.query(slots.exists() | rules.exists()).scalar()
+
+
+def coverage(db, nanny_id: int, slots) -> Optional[Coverage]:
+    """Coverage for every slot (objects with starts_at/ends_at), or None if the nanny has no availability data.
+
+    Slots far apart are loaded as separate spans, so no range exceeds MAX_EXPAND_DAYS.
+    """
+    if not has_availability(db, nanny_id):
+        return None
+    days = [
+        day
+        for s in slots
+        for day, _, _ in _segments(s.starts_at, s.ends_at)
+    ]
+    return Coverage(db, nanny_id, _spans(days))
@@ -0,0 +1,105 @@
+"""
+Cache coherence across worker processes.
+
+Every worker keeps its own in-process caches (the area index, expanded
+availability rules, rate cards), so a write served by one worker leaves stale
+entries in the others. Writers bump a per-entity-type counter in the
+cache_versions table inside the same transaction as the write; readers call
+versions.revalidate() before using a cache, which reads the counters (one
+small query, at most once per CACHE_VERSION_CHECK_INTERVAL seconds per worker)
+and runs the listeners subscribed to every entity type whose counter moved.
+
+The writing worker keeps invalidating its own caches directly and precisely
+(e.g. one nanny's rules); a commit that moves a counter by exactly one past
+what the worker had already seen is recorded as seen, so its own writes do
+not also trigger the broader listener.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from app.config import CACHE_VERSION_CHECK_INTERVAL
+
+AREAS = "areas"
+AVAILABILITY_RULES = "availability_rules"
+RATE_CARDS = "rate_cards"
+
+
+class VersionTracker:
+    def __init__(self, interval: float = CACHE_VERSION_CHECK_INTERVAL):
+        self.interval = interval
+        self._seen: Dict[str, int] = {}
+        self._listeners: Dict[str, List[Callable[[], None]]] = {}
+        self._checked_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def subscribe(self, entity: str, listener: Callable[[], None]) -> None:
+        """listener() drops whatever this worker cached about entity."""
+        self._listeners.setdefault(entity, []).append(listener)
+
+    def revalidate(self, db, force: bool = False) -> List[str]:
+        """Run the listeners of every entity changed since the last check; returns those entities."""
+        if not force and time.monotonic() - self._checked_at < self.interval:
+            return []
+        if not self._lock.acquire(blocking=False):
+            return []  # another thread is checking right now
+        try:
+            from app import models
+
+            table = models.CacheVersion.__table__
+            rows = db.execute(select(table.c.entity, table.c.version)).all()
+            self._checked_at = time.monotonic()
+            changed = [r.entity for r in rows if self._seen.get(r.entity) != r.version]
+            for r in rows:
+                self._seen[r.entity] = r.version
+        finally:
+            self._lock.release()
+        for entity in changed:
+            for listener in self._listeners.get(entity, ()):
+                listener()
+        return changed
+
+    def committed(self, entity: str, version: int) -> None:
+        with self._lock:
+            if self._seen.get(entity) == version - 1:
+                self._seen[entity] = version
+
+
+versions = VersionTracker()
+
+
+def bump(db, *entities: str) -> None:
+    """Advance the counters of entities in db's transaction; the caller commits."""
+    from app import models
+
+    table = models.CacheVersion.__table__
+    now = datetime.utcnow()
+    for entity in entities:
+        stmt = (
+            sqlite_insert(table)
+            .values(entity=entity, version=1, updated_at=now)
+            .on_conflict_do_update(
+                index_elements=[table.c.entity],
+                set_={"version": table.c.version + 1, "updated_at": now},
+            )
+            .returning(table.c.version)
+        )
+        version = db.execute(stmt).scalar_one()
+        if isinstance(db, Session):
+            db.info.setdefault("cache_versions", {})[entity] = version
+
+
+@event.listens_for(Session, "after_commit")
+def _record_own_bumps(session):
+    for entity, version in session.info.pop("cache_versions", {}).items():
+        versions.committed(entity, version)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_bumps(session):
+    session.info.pop("cache_versions", None)
@@ -4,8 +4,73 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 ADMIN_API_KEY = os.getenv("ADMIN_API_KEY", "dev-admin-change-this")
+JWT_SECRET = os.getenv("JWT_SECRET", "dev-jwt-change-this")
+JWT_ALG = os.getenv("JWT_ALG", "HS256")
+# Verified admin bearer tokens are cached (app.security) for at most TOKEN_CACHE_TTL
+# seconds and never past their own exp. TOKEN_CACHE_SIZE=0 disables the cache.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+# Per-request SQL instrumentation (Server-Timing header + repeated statement detector).
+# SQL_REPEAT_THRESHOLD=0 disables the detector; SQL_REPEAT_ACTION is "log" or "raise".
+SQL_STATS_ENABLED = os.getenv("SQL_STATS_ENABLED", "1") == "1"
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "0") or "0")
+SQL_REPEAT_ACTION = os.getenv("SQL_REPEAT_ACTION", "log")
+# Buffered audit log writer (app.audit). Admin calls authenticated with the shared
+# API key have no user behind them and are recorded with a NULL actor.
+AUDIT_FLUSH_SIZE = int(os.getenv("AUDIT_FLUSH_SIZE", "200"))
+AUDIT_FLUSH_INTERVAL = float(os.getenv("AUDIT_FLUSH_INTERVAL", "2.0"))
+AUDIT_MAX_BUFFER = int(os.getenv("AUDIT_MAX_BUFFER", "50000"))
+# Archival of old rows (app.archive) into a separate SQLite file.
+ARCHIVE_DATABASE_URL = os.getenv("ARCHIVE_DATABASE_URL", "sqlite:///./nanny_archive.db")
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", "730"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+# Per-client token buckets and a cap on concurrent expensive requests (app.ratelimit).
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "1") == "1"
+RATE_LIMIT_RATE = float(os.getenv("RATE_LIMIT_RATE", "10"))
+RATE_LIMIT_BURST = float(os.getenv("RATE_LIMIT_BURST", "60"))
+RATE_LIMIT_MAX_CLIENTS = int(os.getenv("RATE_LIMIT_MAX_CLIENTS", "10000"))
+RATE_LIMIT_MAX_EXPENSIVE = int(os.getenv("RATE_LIMIT_MAX_EXPENSIVE", "4"))
+# Workers read the shared cache version counters (app.coherence) at most once per
+# this many seconds, which bounds how long another worker's write can stay unseen.
+CACHE_VERSION_CHECK_INTERVAL = float(os.getenv("CACHE_VERSION_CHECK_INTERVAL", "1.0"))
+# Nearest-area resolver (app.geo): the in-memory index is rebuilt after this many seconds
+# even when no area change was signalled.
+AREA_INDEX_TTL = float(os.getenv("AREA_INDEX_TTL", "3600"))
+# Search expands into neighbouring areas whose centres lie within max_distance_km
+# (clamped to AREA_NEIGHBOR_MAX_KM) plus twice AREA_RADIUS_KM, the farthest a parent or
+# nanny is assumed to live from their area's centre.
+AREA_NEIGHBOR_MAX_KM = float(os.getenv("AREA_NEIGHBOR_MAX_KM", "30"))
+AREA_RADIUS_KM = float(os.getenv("AREA_RADIUS_KM", "5"))
+# Search result ordering (app.ranking): "lexicographic" or "blended", and
+# "name=value,..." overrides of the blended weights (distance, rating, volume, recency, text).
+SEARCH_RANKER = os.getenv("SEARCH_RANKER", "lexicographic")
+SEARCH_RANKING_WEIGHTS = os.getenv("SEARCH_RANKING_WEIGHTS", "")
+# Booking prices (app.pricing). Nannies without a rate card are charged the default
+# rate; multipliers and the platform fee are basis points (10000 = 1x / 100%).
+PRICING_CURRENCY = os.getenv("PRICING_CURRENCY", "ZAR")
+PRICING_DEFAULT_HOURLY_RATE_CENTS = int(os.getenv("PRICING_DEFAULT_HOURLY_RATE_CENTS", "8000"))
+PRICING_DEFAULT_EVENING_BPS = int(os.getenv("PRICING_DEFAULT_EVENING_BPS", "12500"))
+PRICING_DEFAULT_NIGHT_BPS = int(os.getenv("PRICING_DEFAULT_NIGHT_BPS", "15000"))
+PRICING_DEFAULT_WEEKEND_BPS = int(os.getenv("PRICING_DEFAULT_WEEKEND_BPS", "12500"))
+PRICING_FEE_BPS = int(os.getenv("PRICING_FEE_BPS", "1500"))
+RATE_CARD_CACHE_SIZE = int(os.getenv("RATE_CARD_CACHE_SIZE", "4096"))
+# Idempotency-Key handling on booking creation (app.idempotency): stored responses
+# are replayed for IDEMPOTENCY_TTL_HOURS; a duplicate waits up to IDEMPOTENCY_WAIT_SECONDS
+# for the first request, and a claim still in progress after IDEMPOTENCY_STALE_SECONDS
+# is treated as abandoned by a crashed worker.
+IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+IDEMPOTENCY_STALE_SECONDS = float(os.getenv("IDEMPOTENCY_STALE_SECONDS", "60"))
+# Booking status event streams (app.events). Each worker reads new events once per
+# EVENTS_POLL_INTERVAL seconds while it has listeners, whatever their number.
+EVENTS_POLL_INTERVAL = float(os.getenv("EVENTS_POLL_INTERVAL", "1.0"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+EVENTS_BACKLOG_LIMIT = int(os.getenv("EVENTS_BACKLOG_LIMIT", "1000"))
+EVENTS_RETENTION_HOURS = float(os.getenv("EVENTS_RETENTION_HOURS", "72"))
 
 class Settings:
-    database_url = "sqlite:///./nanny_app.db"
+    database_url = os.getenv("DATABASE_URL", "sqlite:///./nanny_app.db")
 
 settings = Settings()
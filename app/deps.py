@@ -1,12 +1,9 @@
 from datetime import date
 from fastapi import Depends, HTTPException, Header, Query
-from jose import jwt
+from jose import JWTError
 from sqlalchemy.orm import Session
 from app.db import SessionLocal
-
-ADMIN_API_KEY = "dev-admin-change-this"
-JWT_SECRET = "dev-jwt-change-this"
-JWT_ALG = "HS256"
+from app.security import api_key_matches, decode_token
 
 def get_db():
     db = SessionLocal()
@@ -24,20 +21,26 @@ def compute_age(dob: date | None) -> int | None:
         years -= 1
     return years
 
+def _actor_id(payload: dict) -> int | None:
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
+        return None
+
 def require_admin(
     x_admin_key: str | None = Header(default=None),
     admin_key: str | None = Query(default=None),
     authorization: str | None = Header(default=None),
-) -> None:
-    key = x_admin_key or admin_key
-    if key == ADMIN_API_KEY:
-        return
+) -> int | None:
+    """Returns the admin's user id for audit records (None for the shared API key)."""
+    if api_key_matches(x_admin_key or admin_key):
+        return None
     if authorization and authorization.lower().startswith("bearer "):
         token = authorization.split(" ", 1)[1].strip()
         try:
-            payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
-        except Exception:
+            payload = decode_token(token)
+        except JWTError:
             raise HTTPException(status_code=401, detail="Unauthorized")
         if payload.get("role") == "admin":
-            return
+            return _actor_id(payload)
     raise HTTPException(status_code=401, detail="Unauthorized")
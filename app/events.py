@@ -0,0 +1,240 @@
+"""
+Booking status changes pushed to users as Server-Sent Events.
+
+Status changes are written to booking_events, one row per user to notify,
+in the same transaction as the change (record()). Each worker runs one
+broker task while it has subscribers: it reads rows newer than the last one
+it saw, at most every EVENTS_POLL_INTERVAL seconds and right away when this
+worker commits an event, and fans them out to in-memory queues per user. So
+a worker holding thousands of open streams costs one small query per
+interval, events written by other workers arrive within that interval, and
+an idle stream is just a queue and a suspended generator.
+
+The row id is the SSE id. A client reconnecting with Last-Event-ID first gets
+what it missed from the table, then the live stream. If it missed more than
+EVENTS_BACKLOG_LIMIT events, or some were already purged (after
+EVENTS_RETENTION_HOURS), it gets a "reset" event instead of the backlog and
+should reload its lists.
+A stream whose queue overflows is closed and resumes the same way.
+"""
+import asyncio
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+from app import models
+from app.config import (
+    EVENTS_BACKLOG_LIMIT, EVENTS_HEARTBEAT_SECONDS, EVENTS_POLL_INTERVAL, EVENTS_QUEUE_SIZE,
+    EVENTS_RETENTION_HOURS,
+)
+from app.db import engine
+
+FETCH_LIMIT = 1000
+PURGE_INTERVAL = 3600.0
+RETRY_MS = 3000
+
+logger = logging.getLogger(__name__)
+ID_FIELDS = {"booking": "booking_id", "booking_request": "booking_request_id"}
+
+
+def record(db, kind: str, entity_id: int, status: str, user_ids: Iterable[Optional[int]]) -> None:
+    """Queue one event per user in db's transaction; streams see it once the caller commits."""
+    now = datetime.utcnow()
+    rows = [
+        {"user_id": user_id, "kind": kind, "entity_id": entity_id, "status": status, "created_at": now}
+        for user_id in sorted({u for u in user_ids if u is not None})
+    ]
+    if rows:
+        db.execute(insert(models.BookingEvent.__table__), rows)
+        db.info["booking_events"] = True
+
+
+def participants(db, nanny_id: int, parent_user_id: int) -> List[Optional[int]]:
+    """The parent and the nanny's user, the two sides notified of a booking."""
+    nanny_user_id = db.query(models.Nanny.user_id).filter(models.Nanny.id == nanny_id).scalar()
+    return [parent_user_id, nanny_user_id]
+
+
+@event.listens_for(Session, "after_commit")
+def _wake_broker(session):
+    if session.info.pop("booking_events", False):
+        broker.notify()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_events(session):
+    session.info.pop("booking_events", None)
+
+
+class Subscription:
+    def __init__(self, user_id: int):
+        self.user_id = user_id
+        self.queue: "asyncio.Queue" = asyncio.Queue(EVENTS_QUEUE_SIZE)
+        self.overflowed = False
+
+
+class Broker:
+    def __init__(self):
+        self._subs: Dict[int, Set[Subscription]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._ready: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._last_id = 0
+        self._purged_at = float("-inf")
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(s) for s in self._subs.values())
+
+    async def subscribe(self, user_id: int) -> Subscription:
+        """Register a listener; returns once the broker is tailing, so no later event is missed."""
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop, self._wake, self._ready, self._task = loop, asyncio.Event(), asyncio.Event(), None
+            self._subs = {}
+        sub = Subscription(user_id)
+        self._subs.setdefault(user_id, set()).add(sub)
+        if self._task is None or self._task.done():
+            self._ready.clear()
+            self._task = loop.create_task(self._tail())
+        await self._ready.wait()
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._subs.get(sub.user_id)
+        if subs is not None:
+            subs.discard(sub)
+            if not subs:
+                del self._subs[sub.user_id]
+
+    def notify(self) -> None:
+        """Thread-safe: make the broker read new events now."""
+        loop, wake = self._loop, self._wake
+        if loop is None or wake is None:
+            return
+        try:
+            loop.call_soon_threadsafe(wake.set)
+        except RuntimeError:
+            pass  # loop already closed
+
+    async def _tail(self) -> None:
+        try:
+            self._last_id = await run_in_threadpool(max_event_id)
+        finally:
+            self._ready.set()
+        while self._subs:
+            try:
+                await asyncio.wait_for(self._wake.wait(), EVENTS_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                rows = await run_in_threadpool(events_after, self._last_id)
+            except Exception:
+                logger.exception("reading booking events failed")
+                continue
+            for row in rows:
+                self._last_id = row.id
+                for sub in list(self._subs.get(row.user_id, ())):
+                    self._deliver(sub, row)
+            if time.monotonic() - self._purged_at >= PURGE_INTERVAL:
+                self._purged_at = time.monotonic()
+                try:
+                    await run_in_threadpool(purge)
+                except Exception:
+                    logger.exception("purging booking events failed")
+
+    def _deliver(self, sub: Subscription, row) -> None:
+        try:
+            sub.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            # too slow a reader: end its stream, it resumes from Last-Event-ID
+            sub.overflowed = True
+            self.unsubscribe(sub)
+            sub.queue.get_nowait()
+            sub.queue.put_nowait(None)
+
+
+broker = Broker()
+
+
+def max_event_id() -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.max(models.BookingEvent.id))).scalar() or 0
+
+
+def events_after(last_id: int, user_id: Optional[int] = None, limit: int = FETCH_LIMIT):
+    table = models.BookingEvent.__table__
+    stmt = select(table).where(table.c.id > last_id)
+    if user_id is not None:
+        stmt = stmt.where(table.c.user_id == user_id)
+    with engine.connect() as conn:
+        return conn.execute(stmt.order_by(table.c.id).limit(limit)).all()
+
+
+def backlog(user_id: int, last_id: int):
+    """(rows missed since last_id, whether the client must reset instead).
+
+    A reset is due when older events may already be purged, or when more than
+    EVENTS_BACKLOG_LIMIT were missed: replaying only the first ones would skip
+    those between them and the live stream.
+    """
+    table = models.BookingEvent.__table__
+    with engine.connect() as conn:
+        oldest = conn.execute(select(func.min(table.c.id))).scalar()
+    if oldest is not None and oldest > last_id + 1:
+        return [], True
+    rows = events_after(last_id, user_id, EVENTS_BACKLOG_LIMIT + 1)
+    if len(rows) > EVENTS_BACKLOG_LIMIT:
+        return [], True
+    return rows, False
+
+
+def purge(now: Optional[datetime] = None) -> int:
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=EVENTS_RETENTION_HOURS)
+    table = models.BookingEvent.__table__
+    with engine.begin() as conn:
+        return conn.execute(delete(table).where(table.c.created_at < cutoff)).rowcount
+
+
+def format_event(row) -> str:
+    data = {
+        ID_FIELDS[row.kind]: row.entity_id,
+        "status": row.status,
+        "at": row.created_at.isoformat() + "Z",
+    }
+    return f"id: {row.id}\nevent: {row.kind}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream(user_id: int, last_event_id: Optional[int]) -> AsyncIterator[str]:
+    sub = await broker.subscribe(user_id)
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        sent = last_event_id or 0
+        if last_event_id is not None:
+            missed, reset = await run_in_threadpool(backlog, user_id, last_event_id)
+            if reset:
+                yield "event: reset\ndata: {}\n\n"
+            for row in missed:
+                yield format_event(row)
+                sent = row.id
+        while True:
+            try:
+                row = await asyncio.wait_for(sub.queue.get(), EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if row is None:
+                return
+            if row.id > sent:
+                yield format_event(row)
+                sent = row.id
+    finally:
+        broker.unsubscribe(sub)
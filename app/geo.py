@@ -0,0 +1,256 @@
+"""
+Nearest-area lookups over the areas table.
+
+AreaIndex keeps every area as a point on the unit sphere in a static k-d
+tree whose nodes carry bounding boxes, so a lookup visits O(log n) nodes even
+for points far outside the covered region. Euclidean (chord) distance between
+unit vectors orders points exactly like great-circle distance, which keeps
+the pruning exact anywhere on the globe: no projection, no trouble at the
+poles or the antimeridian.
+
+The index is built lazily from the database and rebuilt after invalidate(),
+after another worker changed the areas (app.coherence) or once it is older
+than AREA_INDEX_TTL seconds.
+
+area_neighbors holds every pair of areas whose centres are at most
+NEIGHBOR_REACH_KM apart, for search to widen from the parent's area into
+the surrounding ones. Search filters on exact locations, which may lie up to
+AREA_RADIUS_KM from their area's centre on either side, so the pairs are kept
+2 * AREA_RADIUS_KM beyond the farthest search expands (AREA_NEIGHBOR_MAX_KM;
+a larger max_distance_km is clamped to it) and neighbor_cutoff_km() widens
+the test by as much.
+The table is recomputed in the same transaction whenever a session commits a
+change to an Area, by rebuild_neighbors() for writes that bypass the ORM, and
+at startup if it is empty or was built without the margin.
+rebuild_neighbors() also bumps the "areas" cache version so every worker
+drops its index.
+"""
+import heapq
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+
+from app import coherence
+from app.config import AREA_INDEX_TTL, AREA_NEIGHBOR_MAX_KM, AREA_RADIUS_KM
+
+EARTH_RADIUS_KM = 6371.0
+LEAF_SIZE = 8
+NEIGHBOR_REACH_KM = AREA_NEIGHBOR_MAX_KM + 2 * AREA_RADIUS_KM
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    R = EARTH_RADIUS_KM
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return R * c
+
+
+def _unit(lat: float, lng: float) -> Tuple[float, float, float]:
+    phi, lam = math.radians(lat), math.radians(lng)
+    return math.cos(phi) * math.cos(lam), math.cos(phi) * math.sin(lam), math.sin(phi)
+
+
+def _chord_to_km(chord: float) -> float:
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+
+class AreaIndex:
+    """Static k-d tree over unit vectors of (area_id, lat, lng) points."""
+
+    def __init__(self, points: Sequence[Tuple[int, float, float]]):
+        self.size = len(points)
+        items = [(area_id, _unit(lat, lng)) for area_id, lat, lng in points]
+        self._root = self._build(items) if items else None
+
+    def _build(self, items):
+        """Leaf: list of items. Inner node: (left, right, lo, hi), lo/hi being its bounding box."""
+        lo = tuple(min(v[a] for _, v in items) for a in range(3))
+        hi = tuple(max(v[a] for _, v in items) for a in range(3))
+        if len(items) <= LEAF_SIZE:
+            return items
+        spreads = [hi[a] - lo[a] for a in range(3)]
+        axis = spreads.index(max(spreads))
+        items.sort(key=lambda it: it[1][axis])
+        mid = len(items) // 2
+        return (self._build(items[:mid]), self._build(items[mid:]), lo, hi)
+
+    def nearest(self, lat: float, lng: float, k: int = 1, max_km: Optional[float] = None) -> List[Tuple[int, float]]:
+        """Up to k (area_id, distance_km) pairs, closest first."""
+        if self._root is None or k < 1:
+            return []
+        qx, qy, qz = q = _unit(lat, lng)
+        best: List[Tuple[float, int]] = []  # max-heap of (-squared chord, area_id)
+
+        def visit(node):
+            if isinstance(node, list):
+                for area_id, (x, y, z) in node:
+                    d = (x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2
+                    if len(best) < k:
+                        heapq.heappush(best, (-d, area_id))
+                    elif d < -best[0][0]:
+                        heapq.heapreplace(best, (-d, area_id))
+                return
+            left, right = node[0], node[1]
+            dl, dr = _box_distance(left, q), _box_distance(right, q)
+            if dr < dl:
+                left, right, dl, dr = right, left, dr, dl
+            if len(best) < k or dl < -best[0][0]:
+                visit(left)
+            if len(best) < k or dr < -best[0][0]:
+                visit(right)
+
+        visit(self._root)
+        out = sorted((_chord_to_km(math.sqrt(-d)), area_id) for d, area_id in best)
+        return [(area_id, km) for km, area_id in out if max_km is None or km <= max_km]
+
+    def within(self, lat: float, lng: float, km: float) -> List[Tuple[int, float]]:
+        """Every (area_id, distance_km) no further than km, closest first."""
+        if self._root is None or km < 0:
+            return []
+        qx, qy, qz = q = _unit(lat, lng)
+        limit = (2 * math.sin(min(km / EARTH_RADIUS_KM, math.pi) / 2)) ** 2
+        hits = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, list):
+                for area_id, (x, y, z) in node:
+                    d = (x - qx) ** 2 + (y - qy) ** 2 + (z - qz) ** 2
+                    if d <= limit:
+                        hits.append((_chord_to_km(math.sqrt(d)), area_id))
+                continue
+            for child in (node[0], node[1]):
+                if _box_distance(child, q) <= limit:
+                    stack.append(child)
+        return [(area_id, dist) for dist, area_id in sorted(hits)]
+
+
+def _box_distance(node, q) -> float:
+    """Squared distance from q to an inner node's bounding box (0 for leaves)."""
+    if isinstance(node, list):
+        return 0.0
+    lo, hi = node[2], node[3]
+    d = 0.0
+    for a in range(3):
+        if q[a] < lo[a]:
+            d += (lo[a] - q[a]) ** 2
+        elif q[a] > hi[a]:
+            d += (q[a] - hi[a]) ** 2
+    return d
+
+
+class _AreaIndexCache:
+    def __init__(self, ttl: float = AREA_INDEX_TTL):
+        self.ttl = ttl
+        self._index: Optional[AreaIndex] = None
+        self._names: Dict[int, str] = {}
+        self._built_at = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._index = None
+
+    def get(self, db) -> Tuple[AreaIndex, Dict[int, str]]:
+        coherence.versions.revalidate(db)
+        index = self._index
+        if index is not None and time.monotonic() - self._built_at < self.ttl:
+            return index, self._names
+        from app import models
+
+        rows = db.query(models.Area.id, models.Area.name, models.Area.lat, models.Area.lng).all()
+        index = AreaIndex([(r.id, r.lat, r.lng) for r in rows])
+        with self._lock:
+            self._index = index
+            self._names = {r.id: r.name for r in rows}
+            self._built_at = time.monotonic()
+        return index, self._names
+
+
+area_index = _AreaIndexCache()
+coherence.versions.subscribe(coherence.AREAS, area_index.invalidate)
+
+
+def nearest_areas(db, lat: float, lng: float, k: int = 1, max_km: Optional[float] = None) -> List[dict]:
+    index, names = area_index.get(db)
+    return [
+        {"area_id": area_id, "name": names.get(area_id), "distance_km": round(km, 3)}
+        for area_id, km in index.nearest(lat, lng, k, max_km)
+    ]
+
+
+def nearest_area_id(db, lat: float, lng: float) -> Optional[int]:
+    hits = area_index.get(db)[0].nearest(lat, lng, 1)
+    return hits[0][0] if hits else None
+
+
+def neighbor_cutoff_km(max_distance_km: float) -> float:
+    """Largest centre-to-centre distance of an area that may hold a match within max_distance_km."""
+    return max_distance_km + 2 * AREA_RADIUS_KM
+
+
+def rebuild_neighbors(db, max_km: float = NEIGHBOR_REACH_KM) -> int:
+    """Recompute area_neighbors from the areas table; the caller commits."""
+    from app import models
+
+    rows = db.execute(select(models.Area.id, models.Area.lat, models.Area.lng)).all()
+    index = AreaIndex([(r.id, r.lat, r.lng) for r in rows])
+    pairs = [
+        {"area_id": r.id, "neighbor_id": other, "distance_km": round(km, 3)}
+        for r in rows for other, km in index.within(r.lat, r.lng, max_km)
+    ]
+    table = models.AreaNeighbor.__table__
+    db.execute(delete(table))
+    if pairs:
+        db.execute(insert(table), pairs)
+    coherence.bump(db, coherence.AREAS)
+    return len(pairs)
+
+
+def ensure_neighbors(engine) -> None:
+    """Build area_neighbors at startup when it is empty but areas exist, or lacks the margin.
+
+    A table whose farthest pair is within AREA_NEIGHBOR_MAX_KM was built
+    without the AREA_RADIUS_KM margin (or has no pairs in it, and rebuilding
+    it is cheap).
+    """
+    from app import models
+
+    table = models.AreaNeighbor.__table__
+    with engine.begin() as conn:
+        farthest = conn.execute(select(func.max(table.c.distance_km))).scalar()
+        if farthest is not None and (farthest > AREA_NEIGHBOR_MAX_KM or AREA_RADIUS_KM <= 0):
+            return
+        if conn.execute(select(func.count()).select_from(models.Area.__table__)).scalar():
+            rebuild_neighbors(conn)
+
+
+@event.listens_for(Session, "before_flush")
+def _note_area_changes(session, flush_context, instances):
+    from app import models
+
+    if any(isinstance(o, models.Area) for o in (*session.new, *session.dirty, *session.deleted)):
+        session.info["areas_changed"] = True
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_neighbors(session):
+    session.flush()
+    if session.info.pop("areas_changed", False):
+        rebuild_neighbors(session)
+        session.info["area_index_stale"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _drop_area_index(session):
+    if session.info.pop("area_index_stale", False):
+        area_index.invalidate()
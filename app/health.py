@@ -0,0 +1,73 @@
+"""
+Cached row counts for the readiness probe.
+
+Orchestrators poll health endpoints every few seconds; full-table COUNT(*)
+on every poll is real load on a large database. Counts are taken at most once
+per HEALTH_STATS_TTL seconds, in a background thread once a first snapshot
+exists, so probes only ever read the cached values. A refresh that fails
+keeps the last snapshot (or none), so a probe always gets an answer.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import func, select
+
+from app import models
+from app.db import SessionLocal
+
+HEALTH_STATS_TTL = float(os.getenv("HEALTH_STATS_TTL", "60"))
+
+COUNTED = {
+    "users": models.User,
+    "nannies": models.NannyProfile,
+    "reviews": models.Review,
+}
+
+
+class CountsSnapshot:
+    def __init__(self, ttl: float = HEALTH_STATS_TTL):
+        self.ttl = ttl
+        self.counts: Optional[dict] = None
+        self.taken_at: Optional[datetime] = None
+        self._taken_monotonic = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        if not self._lock.acquire(blocking=False):
+            return  # another thread is already refreshing
+        try:
+            with SessionLocal() as db:
+                counts = {
+                    name: db.execute(select(func.count()).select_from(model)).scalar_one()
+                    for name, model in COUNTED.items()
+                }
+            self.counts = counts
+            self.taken_at = datetime.utcnow()
+            self._taken_monotonic = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def get(self) -> dict:
+        """The cached counts; empty (None) until a first refresh succeeds, never raises."""
+        if self.counts is None:
+            # no snapshot yet: try now, but a failing database must still let
+            # the probe answer (503 from the ping) instead of raising a 500
+            self._refresh_quietly()
+        elif time.monotonic() - self._taken_monotonic >= self.ttl and not self._lock.locked():
+            threading.Thread(target=self._refresh_quietly, daemon=True).start()
+        return {
+            "counts": self.counts,
+            "counts_taken_at": self.taken_at.isoformat() + "Z" if self.taken_at else None,
+        }
+
+    def _refresh_quietly(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            pass  # keep serving the last snapshot; readiness still pings the db
+
+
+snapshot = CountsSnapshot()
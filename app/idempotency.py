@@ -0,0 +1,153 @@
+"""
+Idempotency-Key support for endpoints that create bookings.
+
+The first request with a given key claims it by inserting an "in_progress"
+row in its own short transaction, so every worker sees the claim at once,
+then does the work and stores the JSON it returned. A later request with the
+same key and the same body gets that stored response back (with an
+Idempotent-Replayed header) without touching the booking tables; the same key
+with a different body is a 422. A duplicate that arrives while the first is
+still running polls the row until it completes, for at most
+IDEMPOTENCY_WAIT_SECONDS, and then gets a 409 it may retry.
+
+Keys are scoped by endpoint and caller (scope()), so two parents who happen
+to pick the same key never see each other's bookings or block each other.
+
+If the work raises, the claim is released so a retry runs it again: the
+handler's transaction was rolled back, so nothing was created. Rows expire
+after IDEMPOTENCY_TTL_HOURS and are purged as new keys are claimed.
+"""
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import models
+from app.config import IDEMPOTENCY_STALE_SECONDS, IDEMPOTENCY_TTL_HOURS, IDEMPOTENCY_WAIT_SECONDS
+from app.db import engine
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+POLL_INTERVAL = 0.05
+PURGE_INTERVAL = 60.0
+
+_last_purge = float("-inf")
+
+
+def scope(endpoint: str, caller_id: int) -> str:
+    """Namespace of a key: the endpoint and the user it acts for."""
+    return f"{endpoint} user:{caller_id}"
+
+
+def request_hash(payload: BaseModel) -> str:
+    return hashlib.sha256(payload.model_dump_json().encode()).hexdigest()
+
+
+def _claim(scope: str, key: str, digest: str):
+    """None when this request now owns the key, else the row holding it."""
+    table = models.IdempotencyKey.__table__
+    while True:
+        now = datetime.utcnow()
+        values = {
+            "request_hash": digest,
+            "state": "in_progress",
+            "status_code": None,
+            "response_body": None,
+            "created_at": now,
+            "expires_at": now + timedelta(hours=IDEMPOTENCY_TTL_HOURS),
+        }
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(table).values(scope=scope, key=key, **values))
+            return None
+        except IntegrityError:
+            pass
+        with engine.begin() as conn:
+            row = conn.execute(select(table).where(table.c.scope == scope, table.c.key == key)).first()
+            if row is None:
+                continue  # released or purged since the insert failed
+            abandoned = row.state == "in_progress" and row.created_at <= now - timedelta(seconds=IDEMPOTENCY_STALE_SECONDS)
+            if row.expires_at > now and not abandoned:
+                return row
+            # take over an expired or abandoned key, unless someone else just did
+            taken = conn.execute(
+                update(table)
+                .where(table.c.scope == scope, table.c.key == key, table.c.created_at == row.created_at)
+                .values(**values)
+            ).rowcount
+            if taken:
+                return None
+
+
+def _finish(scope: str, key: str, status_code: int, body) -> None:
+    table = models.IdempotencyKey.__table__
+    with engine.begin() as conn:
+        conn.execute(
+            update(table)
+            .where(table.c.scope == scope, table.c.key == key)
+            .values(state="completed", status_code=status_code, response_body=json.dumps(body))
+        )
+
+
+def _release(scope: str, key: str) -> None:
+    table = models.IdempotencyKey.__table__
+    with engine.begin() as conn:
+        conn.execute(delete(table).where(table.c.scope == scope, table.c.key == key, table.c.state == "in_progress"))
+
+
+def purge(now: Optional[datetime] = None) -> int:
+    table = models.IdempotencyKey.__table__
+    with engine.begin() as conn:
+        return conn.execute(delete(table).where(table.c.expires_at <= (now or datetime.utcnow()))).rowcount
+
+
+def _purge_now_and_then() -> None:
+    global _last_purge
+    if time.monotonic() - _last_purge >= PURGE_INTERVAL:
+        _last_purge = time.monotonic()
+        purge()
+
+
+def _replay(row) -> JSONResponse:
+    return JSONResponse(
+        content=json.loads(row.response_body), status_code=row.status_code,
+        headers={"Idempotent-Replayed": "true"},
+    )
+
+
+def run(key: Optional[str], scope: str, payload: BaseModel, work: Callable[[], dict], status_code: int = 200):
+    """work()'s result, or the stored response of an earlier request with the same key."""
+    if key is None:
+        return work()
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters")
+    digest = request_hash(payload)
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        row = _claim(scope, key, digest)
+        if row is None:
+            break
+        if row.request_hash != digest:
+            raise HTTPException(status_code=422, detail=f"{HEADER} was already used with a different request body")
+        if row.state == "completed":
+            return _replay(row)
+        if time.monotonic() >= deadline:
+            raise HTTPException(status_code=409, detail=f"A request with this {HEADER} is still in progress")
+        time.sleep(POLL_INTERVAL)
+
+    _purge_now_and_then()
+    try:
+        result = work()
+    except BaseException:
+        _release(scope, key)
+        raise
+    _finish(scope, key, status_code, jsonable_encoder(result))
+    return result
@@ -0,0 +1,311 @@
+"""
+Bulk importer for nannies and their profiles.
+
+    python -m app.importer nannies.csv [--chunk-size 500] [--errors errors.jsonl] [--dry-run]
+
+Reads CSV or JSONL (by file extension, or --format) one row at a time. Facet
+and area names are resolved to ids from lookup tables loaded once up front.
+Valid rows are written per chunk in a single transaction, with one executemany
+insert per table: users, nannies, nanny_profiles, nanny_areas and the three
+profile association tables. The new nannies' search documents are written in
+the same transaction. When the database rejects a chunk, its rows are retried
+one transaction each, so only the offending rows are reported as failed.
+
+Columns: name, email (required); phone, nickname, last_initial,
+profile_photo_url, password_hash, approved, bio, date_of_birth (YYYY-MM-DD),
+nationality, ethnicity, lat, lng; areas, qualifications, tags, languages as
+lists of names or ids (";"-separated in CSV, arrays or strings in JSONL).
+
+Imported users without a password_hash get an unusable one ("!") and must go
+through a password reset before they can log in.
+"""
+import argparse
+import csv
+import json
+import sys
+import time
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from app import models, search_index
+from app.db import Base, engine
+
+UNUSABLE_PASSWORD = "!"
+
+# row field -> (lookup model, association table, association column)
+FACETS = {
+    "qualifications": (models.Qualification, models.nanny_profile_qualifications, "qualification_id"),
+    "tags": (models.NannyTag, models.nanny_profile_tags, "tag_id"),
+    "languages": (models.Language, models.nanny_profile_languages, "language_id"),
+}
+
+
+class RowError(ValueError):
+    pass
+
+
+def read_rows(path: str, fmt: Optional[str] = None) -> Iterator[Tuple[int, dict]]:
+    """Yield (line_number, raw_row) without loading the file into memory."""
+    fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".ndjson")) else "csv")
+    with open(path, newline="", encoding="utf-8") as fh:
+        if fmt == "csv":
+            reader = csv.DictReader(fh)
+            for row in reader:
+                yield reader.line_num, row
+        else:
+            for line_no, line in enumerate(fh, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_no, json.loads(line)
+                except ValueError as e:
+                    yield line_no, {"__error__": f"invalid JSON: {e}"}
+
+
+class Lookups:
+    """Case-insensitive name -> id maps for areas and facets, loaded once."""
+
+    def __init__(self, conn):
+        self.by_field: Dict[str, Tuple[Dict[str, int], set]] = {}
+        tables = {"areas": models.Area, **{k: v[0] for k, v in FACETS.items()}}
+        for field, model in tables.items():
+            names = {}
+            ids = set()
+            for id_, name in conn.execute(select(model.id, model.name)):
+                names[name.strip().lower()] = id_
+                ids.add(id_)
+            self.by_field[field] = (names, ids)
+
+    def resolve(self, field: str, values: List[str]) -> List[int]:
+        names, ids = self.by_field[field]
+        out = []
+        for v in values:
+            key = str(v).strip()
+            if key.isdigit() and int(key) in ids:
+                id_ = int(key)
+            else:
+                id_ = names.get(key.lower())
+            if id_ is None:
+                raise RowError(f"unknown {field[:-1] if field.endswith('s') else field}: {key!r}")
+            if id_ not in out:
+                out.append(id_)
+        return out
+
+
+def _text(row: dict, key: str) -> Optional[str]:
+    v = row.get(key)
+    if v is None:
+        return None
+    v = str(v).strip()
+    return v or None
+
+
+def _float(row: dict, key: str) -> Optional[float]:
+    v = _text(row, key)
+    if v is None:
+        return None
+    try:
+        return float(v)
+    except ValueError:
+        raise RowError(f"{key} must be a number")
+
+
+def _list(row: dict, key: str) -> List[str]:
+    v = row.get(key)
+    if v is None or v == "":
+        return []
+    if isinstance(v, list):
+        return [str(x) for x in v if str(x).strip()]
+    return [x for x in (p.strip() for p in str(v).split(";")) if x]
+
+
+def normalize(row: dict, lookups: Lookups) -> dict:
+    """Validate one raw row and resolve its names to ids; raises RowError."""
+    if "__error__" in row:
+        raise RowError(row["__error__"])
+    name = _text(row, "name")
+    email = (_text(row, "email") or "").lower()
+    if not name:
+        raise RowError("name is required")
+    if not email or "@" not in email:
+        raise RowError("a valid email is required")
+    last_initial = _text(row, "last_initial")
+    if last_initial is not None:
+        last_initial = last_initial.upper()
+        if len(last_initial) != 1:
+            raise RowError("last_initial must be 1 character")
+    dob = _text(row, "date_of_birth")
+    if dob is not None:
+        try:
+            dob = date.fromisoformat(dob)
+        except ValueError:
+            raise RowError("date_of_birth must be YYYY-MM-DD")
+    approved = row.get("approved")
+    if isinstance(approved, str):
+        approved = approved.strip().lower() in ("1", "true", "yes", "y")
+    lat, lng = _float(row, "lat"), _float(row, "lng")
+    return {
+        "user": {
+            "name": name,
+            "role": "nanny",
+            "email": email,
+            "password_hash": _text(row, "password_hash") or UNUSABLE_PASSWORD,
+            "phone": _text(row, "phone"),
+            "lat": lat,
+            "lng": lng,
+            "nickname": _text(row, "nickname"),
+            "last_initial": last_initial,
+            "profile_photo_url": _text(row, "profile_photo_url"),
+        },
+        "approved": bool(approved),
+        "profile": {
+            "bio": _text(row, "bio"),
+            "date_of_birth": dob,
+            "nationality": _text(row, "nationality"),
+            "ethnicity": _text(row, "ethnicity"),
+            "lat": lat,
+            "lng": lng,
+        },
+        "areas": lookups.resolve("areas", _list(row, "areas")),
+        **{field: lookups.resolve(field, _list(row, field)) for field in FACETS},
+    }
+
+
+def write_chunk(conn, chunk: List[Tuple[int, dict]]) -> List[int]:
+    """Insert one chunk of normalized rows; returns the new nanny ids in row order."""
+    users = models.User.__table__
+    nannies = models.Nanny.__table__
+    profiles = models.NannyProfile.__table__
+
+    user_ids = conn.execute(
+        insert(users).returning(users.c.id, sort_by_parameter_order=True),
+        [r["user"] for _, r in chunk],
+    ).scalars().all()
+    nanny_ids = conn.execute(
+        insert(nannies).returning(nannies.c.id, sort_by_parameter_order=True),
+        [{"user_id": uid, "approved": r["approved"]} for uid, (_, r) in zip(user_ids, chunk)],
+    ).scalars().all()
+    profile_ids = conn.execute(
+        insert(profiles).returning(profiles.c.id, sort_by_parameter_order=True),
+        [{"nanny_id": nid, **r["profile"]} for nid, (_, r) in zip(nanny_ids, chunk)],
+    ).scalars().all()
+
+    area_rows = [
+        {"nanny_id": nid, "area_id": a}
+        for nid, (_, r) in zip(nanny_ids, chunk) for a in r["areas"]
+    ]
+    if area_rows:
+        conn.execute(insert(models.NannyArea.__table__), area_rows)
+    for field, (_, table, column) in FACETS.items():
+        rows = [
+            {"nanny_profile_id": pid, column: fid}
+            for pid, (_, r) in zip(profile_ids, chunk) for fid in r[field]
+        ]
+        if rows:
+            conn.execute(insert(table), rows)
+    search_index.refresh(conn, nanny_ids)
+    return nanny_ids
+
+
+def run_import(path: str, fmt: Optional[str] = None, chunk_size: int = 500,
+               dry_run: bool = False, errors_out=None, progress=sys.stderr) -> dict:
+    # a dry run writes nothing: rows that would be imported are counted as validated
+    counted = "validated" if dry_run else "imported"
+    stats = {"read": 0, counted: 0, "failed": 0}
+    started = time.perf_counter()
+
+    def fail(line_no: int, message: str):
+        stats["failed"] += 1
+        if errors_out is not None:
+            errors_out.write(json.dumps({"line": line_no, "error": message}) + "\n")
+
+    with engine.connect() as conn:
+        lookups = Lookups(conn)
+    seen_emails = set()
+
+    def write(chunk: List[Tuple[int, dict]]):
+        """(rows written, (line_no, message) of rows rejected) in one transaction."""
+        with engine.begin() as conn:
+            emails = [r["user"]["email"] for _, r in chunk]
+            taken = set(conn.execute(
+                select(models.User.email).where(models.User.email.in_(emails))
+            ).scalars())
+            fresh = [(n, r) for n, r in chunk if r["user"]["email"] not in taken]
+            rejected = [(n, f"email already exists: {r['user']['email']}") for n, r in chunk if r["user"]["email"] in taken]
+            if fresh and not dry_run:
+                write_chunk(conn, fresh)
+        return fresh, rejected
+
+    def flush(chunk: List[Tuple[int, dict]]):
+        if not chunk:
+            return
+        try:
+            fresh, rejected = write(chunk)
+        except SQLAlchemyError:
+            # one bad row rolls back the whole chunk: retry row by row so only it is rejected
+            fresh, rejected = [], []
+            for item in chunk:
+                try:
+                    written, refused = write([item])
+                except SQLAlchemyError as e:
+                    written, refused = [], [(item[0], f"row rolled back: {getattr(e, 'orig', e)}")]
+                fresh += written
+                rejected += refused
+        for line_no, message in rejected:
+            fail(line_no, message)
+        stats[counted] += len(fresh)
+        elapsed = time.perf_counter() - started
+        if progress is not None:
+            progress.write(
+                f"read {stats['read']}  {counted} {stats[counted]}  failed {stats['failed']}"
+                f"  ({stats['read'] / elapsed if elapsed else 0:.0f} rows/s)\n"
+            )
+
+    chunk: List[Tuple[int, dict]] = []
+    for line_no, raw in read_rows(path, fmt):
+        stats["read"] += 1
+        try:
+            row = normalize(raw, lookups)
+            email = row["user"]["email"]
+            if email in seen_emails:
+                raise RowError(f"duplicate email in file: {email}")
+            seen_emails.add(email)
+        except RowError as e:
+            fail(line_no, str(e))
+            continue
+        chunk.append((line_no, row))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    flush(chunk)
+    stats["seconds"] = round(time.perf_counter() - started, 2)
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import nannies from CSV or JSONL.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "jsonl"])
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--errors", help="write per-row errors to this JSONL file (default: stderr)")
+    parser.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    args = parser.parse_args(argv)
+
+    Base.metadata.create_all(bind=engine)
+    search_index.ensure_fts(engine)
+    errors_out = open(args.errors, "w", encoding="utf-8") if args.errors else sys.stderr
+    try:
+        stats = run_import(args.path, args.format, args.chunk_size, args.dry_run, errors_out)
+    finally:
+        if args.errors:
+            errors_out.close()
+    print(json.dumps(stats))
+    return 0 if stats["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
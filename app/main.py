@@ -1,14 +1,16 @@
 # app/main.py
+import time
 from pathlib import Path
 
 
-from fastapi import FastAPI, Security
+from fastapi import FastAPI, Request, Security
 from fastapi.responses import HTMLResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
 from pathlib import Path
 from fastapi.security import APIKeyHeader
 from app.routes import router
 from app.db import Base, engine
+from app import audit, config, geo, metrics, ranking, ratelimit, search_index, sql_stats
 import app.models
 
 BASE_DIR = Path(__file__).resolve().parent
@@ -17,8 +19,54 @@ STATIC_DIR = BASE_DIR / "static"
 
 app = FastAPI()
 
+# refuse to start with a ranker setting every search would trip over
+ranking.check_config()
+
 # Ensure all models are registered before creating tables
 Base.metadata.create_all(bind=engine)
+audit.ensure_nullable_actor(engine)
+search_index.ensure_fts(engine)
+geo.ensure_neighbors(engine)
+search_index.ensure_documents(engine)
+
+if config.SQL_STATS_ENABLED:
+    sql_stats.install(engine)
+
+    @app.middleware("http")
+    async def sql_server_timing(request: Request, call_next):
+        stats, token = sql_stats.begin()
+        try:
+            response = await call_next(request)
+        finally:
+            sql_stats.end(token)
+        response.headers.append("Server-Timing", stats.server_timing())
+        return response
+
+metrics.install_pool_metrics(engine)
+
+# drain buffered audit entries before the worker exits
+app.add_event_handler("startup", audit.buffer.start)
+app.add_event_handler("shutdown", audit.buffer.stop)
+
+if config.RATE_LIMIT_ENABLED:
+    app.middleware("http")(ratelimit.middleware)
+
+
+@app.middleware("http")
+async def request_metrics(request: Request, call_next):
+    metrics.HTTP_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = "500"
+    try:
+        response = await call_next(request)
+        status = str(response.status_code)
+        return response
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.HTTP_IN_FLIGHT.dec()
+        route = metrics.route_label(request.scope)
+        metrics.HTTP_REQUESTS.inc(request.method, route, status)
+        metrics.HTTP_LATENCY.observe(elapsed, request.method, route)
 
 # Define API Key security scheme
 api_key_scheme = APIKeyHeader(name="x-admin-key", auto_error=False)
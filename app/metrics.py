@@ -0,0 +1,220 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Every collector keeps one value table per thread, so the hot path only touches
+thread-local state and never takes a lock. The registry lock is taken once per
+thread when its table is created and when /metrics merges the tables.
+"""
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Collector:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._tables: List[dict] = []
+        self._lock = threading.Lock()
+
+    def _table(self) -> dict:
+        table = getattr(self._local, "table", None)
+        if table is None:
+            table = {}
+            with self._lock:
+                self._tables.append(table)
+            self._local.table = table
+        return table
+
+    def _snapshots(self) -> List[dict]:
+        with self._lock:
+            tables = list(self._tables)
+        return [t.copy() for t in tables]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Collector):
+    kind = "counter"
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        table = self._table()
+        table[labelvalues] = table.get(labelvalues, 0) + amount
+
+    def _totals(self) -> Dict[tuple, float]:
+        totals: Dict[tuple, float] = {}
+        for table in self._snapshots():
+            for key, value in table.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def _samples(self) -> List[str]:
+        return [
+            f"{self.name}{_labels(self.labelnames, key)} {_fmt(value)}"
+            for key, value in sorted(self._totals().items())
+        ]
+
+
+class Gauge(Counter):
+    """A counter that may go down; inc/dec may happen on different threads."""
+
+    kind = "gauge"
+
+    def dec(self, *labelvalues: str, amount: float = 1) -> None:
+        self.inc(*labelvalues, amount=-amount)
+
+
+class CallbackGauge(_Collector):
+    """A gauge whose samples are computed at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, callback: Callable[[], float]):
+        super().__init__(name, help)
+        self.callback = callback
+
+    def _samples(self) -> List[str]:
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        if value is None:
+            return []
+        return [f"{self.name} {_fmt(value)}"]
+
+
+class Histogram(_Collector):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        table = self._table()
+        row = table.get(labelvalues)
+        if row is None:
+            # per-bucket counts (last slot is +Inf), then sum
+            row = [0] * (len(self.buckets) + 1) + [0.0]
+            table[labelvalues] = row
+        row[bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def _samples(self) -> List[str]:
+        merged: Dict[tuple, list] = {}
+        for table in self._snapshots():
+            for key, row in table.items():
+                row = list(row)
+                acc = merged.get(key)
+                if acc is None:
+                    merged[key] = row
+                else:
+                    merged[key] = [a + b for a, b in zip(acc, row)]
+        lines = []
+        bounds = self.buckets + (float("inf"),)
+        for key, row in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(bounds, row):
+                cumulative += count
+                le = f'le="{_fmt(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_fmt(row[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._collectors: List[_Collector] = []
+
+    def register(self, collector):
+        self._collectors.append(collector)
+        return collector
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for collector in self._collectors:
+            lines.extend(collector.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests by route template and status.", ("method", "route", "status"),
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.", ("method", "route"),
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.",
+))
+DB_POOL_CHECKOUTS = REGISTRY.register(Counter(
+    "db_pool_checkouts_total", "Connections checked out of the SQLAlchemy pool.",
+))
+DB_POOL_CONNECTS = REGISTRY.register(Counter(
+    "db_pool_connects_total", "New DBAPI connections opened by the pool.",
+))
+EMAIL_SENDS = REGISTRY.register(Counter(
+    "email_sends_total", "Outgoing emails by result.", ("result",),
+))
+RATE_LIMITED = REGISTRY.register(Counter(
+    "http_requests_rejected_total", "Requests rejected by the rate limiter, by reason.", ("reason",),
+))
+AUDIT_DROPPED = REGISTRY.register(Counter(
+    "audit_entries_dropped_total", "Audit entries never written, by reason.", ("reason",),
+))
+
+
+def install_pool_metrics(engine) -> None:
+    from sqlalchemy import event
+
+    pool = engine.pool
+    event.listen(pool, "checkout", lambda *args: DB_POOL_CHECKOUTS.inc())
+    event.listen(pool, "connect", lambda *args: DB_POOL_CONNECTS.inc())
+    REGISTRY.register(CallbackGauge(
+        "db_pool_checked_out", "Connections currently checked out of the pool.",
+        lambda: pool.checkedout() if hasattr(pool, "checkedout") else None,
+    ))
+    REGISTRY.register(CallbackGauge(
+        "db_pool_size", "Configured pool size.",
+        lambda: pool.size() if hasattr(pool, "size") else None,
+    ))
+
+
+def route_label(scope: dict) -> str:
+    """The matched route template, so path parameters don't explode label cardinality."""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return path or "unmatched"
@@ -1,5 +1,5 @@
 from .availability import NannyAvailability as Availability
-from .availability import NannyAvailability
+from .availability import NannyAvailability, NannyAvailabilityRule
 from .bookings import BookingRequest, BookingRequestSlot, BookingPricingSnapshot
 from app.db import Base
 
@@ -204,4 +204,11 @@ class NannyProfile(Base):
 
 from app.models.admin_profile import AdminProfile
 from app.models.audit_log import AuditLog
+from app.models.rating_stats import NannyRatingStats
+from app.models.search_document import NannySearchArea, NannySearchDocument
+from app.models.area_neighbor import AreaNeighbor
+from app.models.cache_version import CacheVersion
+from app.models.rate_card import NannyRateCard
+from app.models.idempotency_key import IdempotencyKey
+from app.models.booking_event import BookingEvent
 from . import availability
\ No newline at end of file
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Float, ForeignKey, Index, Integer
+
+from app.db import Base
+
+
+class AreaNeighbor(Base):
+    """Precomputed area-to-area centroid distances up to AREA_NEIGHBOR_MAX_KM (see app.geo).
+
+    Every area is its own neighbour at distance 0.
+    """
+
+    __tablename__ = "area_neighbors"
+
+    area_id = Column(Integer, ForeignKey("areas.id", ondelete="CASCADE"), primary_key=True)
+    neighbor_id = Column(Integer, ForeignKey("areas.id", ondelete="CASCADE"), primary_key=True)
+    distance_km = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("area_neighbors_distance_idx", "area_id", "distance_km"),
+    )
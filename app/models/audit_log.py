@@ -1,6 +1,6 @@
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 
 from app.db import Base
@@ -11,7 +11,7 @@ class AuditLog(Base):
 
     id = Column(Integer, primary_key=True, index=True)
 
-    actor_user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    actor_user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)  # NULL: shared API key
 
     action = Column(String, nullable=False)          # example: "update_nanny_profile"
     entity_type = Column(String, nullable=False)     # example: "NannyProfile"
@@ -20,4 +20,9 @@ class AuditLog(Base):
 
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
-    actor = relationship("User")
\ No newline at end of file
+    actor = relationship("User")
+
+    __table_args__ = (
+        Index("audit_logs_created_idx", "created_at", "id"),
+        Index("audit_logs_entity_idx", "entity_type", "entity_id", "created_at"),
+    )
\ No newline at end of file
@@ -21,4 +21,29 @@ class NannyAvailability(Base):
     __table_args__ = (
         CheckConstraint("end_time > start_time", name="availability_time_check"),
         Index("na_nanny_date_idx", "nanny_id", "date"),
-    )
\ No newline at end of file
+    )
+
+class NannyAvailabilityRule(Base):
+    """A recurring window, e.g. rrule "FREQ=WEEKLY;BYDAY=MO,TU,WE" from 08:00 to 16:00."""
+
+    __tablename__ = "nanny_availability_rules"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    nanny_id = Column(BigInteger, ForeignKey("nannies.id", ondelete="CASCADE"), nullable=False)
+
+    rrule = Column(Text, nullable=False)
+    starts_on = Column(Date, nullable=False)
+    ends_on = Column(Date)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    exdates = Column(Text)  # comma-separated ISO dates the rule skips
+
+    is_available = Column(Boolean, nullable=False, default=True)
+    notes = Column(Text)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("end_time > start_time", name="availability_rule_time_check"),
+        Index("nar_nanny_idx", "nanny_id"),
+    )
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Index, Integer, String
+
+from app.db import Base
+
+
+class BookingEvent(Base):
+    """A booking or booking-request status change, one row per user to notify (see app.events).
+
+    The id is the Server-Sent Events id clients resume from.
+    """
+
+    __tablename__ = "booking_events"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    kind = Column(String, nullable=False)  # "booking" or "booking_request"
+    entity_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("booking_events_user_id_idx", "user_id", "id"),
+        Index("booking_events_created_at_idx", "created_at"),
+        # ids must never be reused after a purge, clients resume from them
+        {"sqlite_autoincrement": True},
+    )
@@ -9,10 +9,12 @@ from sqlalchemy.sql import func
 
 from app.db import Base
 
+# SQLite only autoincrements an "INTEGER PRIMARY KEY" column, not BIGINT.
+BigIntPK = BigInteger().with_variant(Integer, "sqlite")
 
 class BookingRequest(Base):
 	__tablename__ = "booking_requests"
-	id = Column(BigInteger, primary_key=True)
+	id = Column(BigIntPK, primary_key=True)
 	parent_user_id = Column(BigInteger, ForeignKey("users.id", ondelete="RESTRICT"), nullable=False)
 	nanny_id = Column(BigInteger, ForeignKey("nannies.id", ondelete="RESTRICT"), nullable=False)
 	status = Column(Text, nullable=False)
@@ -33,7 +35,7 @@ class BookingRequest(Base):
 
 class BookingRequestSlot(Base):
 	__tablename__ = "booking_request_slots"
-	id = Column(BigInteger, primary_key=True)
+	id = Column(BigIntPK, primary_key=True)
 	booking_request_id = Column(BigInteger, ForeignKey("booking_requests.id", ondelete="CASCADE"), nullable=False)
 	starts_at = Column(DateTime(timezone=True), nullable=False)
 	ends_at = Column(DateTime(timezone=True), nullable=False)
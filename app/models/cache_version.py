@@ -0,0 +1,15 @@
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, String
+
+from app.db import Base
+
+
+class CacheVersion(Base):
+    """Per-entity-type change counter shared by every worker (see app.coherence)."""
+
+    __tablename__ = "cache_versions"
+
+    entity = Column(String, primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import CheckConstraint, Column, DateTime, ForeignKey, Integer, String
+
+from app.db import Base
+
+
+class NannyRateCard(Base):
+    """A nanny's hourly rate and time-band multipliers (see app.pricing).
+
+    Multipliers are basis points: 10000 charges the plain hourly rate.
+    """
+
+    __tablename__ = "nanny_rate_cards"
+
+    nanny_id = Column(Integer, ForeignKey("nannies.id", ondelete="CASCADE"), primary_key=True)
+    currency = Column(String, nullable=False, default="ZAR")
+    hourly_rate_cents = Column(Integer, nullable=False)
+    evening_bps = Column(Integer, nullable=False, default=10000)
+    night_bps = Column(Integer, nullable=False, default=10000)
+    weekend_bps = Column(Integer, nullable=False, default=10000)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        CheckConstraint("hourly_rate_cents >= 0", name="nrc_hourly_rate_check"),
+        CheckConstraint("evening_bps >= 0 AND night_bps >= 0 AND weekend_bps >= 0", name="nrc_multiplier_check"),
+    )
@@ -0,0 +1,19 @@
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, DateTime, Float, ForeignKey
+
+from app.db import Base
+
+
+class NannyRatingStats(Base):
+    """Maintained 12-month approved-review aggregate per nanny (see app.ratings)."""
+
+    __tablename__ = "nanny_rating_stats"
+
+    nanny_id = Column(Integer, ForeignKey("nannies.id", ondelete="CASCADE"), primary_key=True)
+
+    average_rating_12m = Column(Float, nullable=True)
+    review_count_12m = Column(Integer, nullable=False, default=0)
+    last_review_at = Column(DateTime, nullable=True)
+
+    refreshed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from sqlalchemy import Boolean, Column, Date, DateTime, Float, ForeignKey, Integer, String, Text
+
+from app.db import Base
+
+
+class NannySearchDocument(Base):
+    """One denormalized row per searchable nanny (see app.search_index).
+
+    Facets are stored twice: as JSON [{"id", "name"}] lists for display and as
+    ",1,4," id strings so "has every one of these ids" is a LIKE per id.
+    """
+
+    __tablename__ = "nanny_search_documents"
+
+    nanny_id = Column(Integer, ForeignKey("nannies.id", ondelete="CASCADE"), primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    approved = Column(Boolean, nullable=False, default=False)
+
+    name = Column(String, nullable=False)
+    nickname = Column(String, nullable=True)
+    last_initial = Column(String, nullable=True)
+    profile_photo_url = Column(String, nullable=True)
+    bio = Column(Text, nullable=True)
+    date_of_birth = Column(Date, nullable=True)
+    age = Column(Integer, nullable=True)
+    nationality = Column(String, nullable=True)
+    ethnicity = Column(String, nullable=True)
+    lat = Column(Float, nullable=True)
+    lng = Column(Float, nullable=True)
+
+    area_ids = Column(Text, nullable=False, default=",")
+    qualification_ids = Column(Text, nullable=False, default=",")
+    tag_ids = Column(Text, nullable=False, default=",")
+    language_ids = Column(Text, nullable=False, default=",")
+    qualifications = Column(Text, nullable=False, default="[]")
+    tags = Column(Text, nullable=False, default="[]")
+    languages = Column(Text, nullable=False, default="[]")
+
+    average_rating_12m = Column(Float, nullable=True)
+    review_count_12m = Column(Integer, nullable=False, default=0)
+
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class NannySearchArea(Base):
+    """(area_id, nanny_id) pairs of the documents; the primary key is the area lookup index."""
+
+    __tablename__ = "nanny_search_areas"
+
+    area_id = Column(Integer, primary_key=True)
+    nanny_id = Column(
+        Integer, ForeignKey("nanny_search_documents.nanny_id", ondelete="CASCADE"), primary_key=True,
+    )
@@ -0,0 +1,53 @@
+"""Opaque keyset cursors over (created_at, id), newest first."""
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import String, and_, or_, type_coerce
+
+
+def encode_cursor(created_at: datetime, id_: int) -> str:
+    raw = f"{created_at.isoformat()}|{id_}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Raises ValueError for a malformed cursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created, id_ = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created), int(id_)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def _older_than(query, created_col, id_col, created_at: datetime, id_: int):
+    bind = query.session.get_bind()
+    if bind.dialect.name != "sqlite":
+        return or_(created_col < created_at, and_(created_col == created_at, id_col < id_))
+    # SQLite keeps datetimes as text in two shapes: SQLAlchemy writes
+    # "YYYY-MM-DD HH:MM:SS.ffffff", server_default CURRENT_TIMESTAMP writes
+    # "YYYY-MM-DD HH:MM:SS". Compare the stored text against both spellings of
+    # the cursor instant so ties on created_at are split by id either way.
+    as_text = type_coerce(created_col, String)
+    long_form = created_at.strftime("%Y-%m-%d %H:%M:%S.%f")
+    forms = [long_form]
+    lowest = long_form
+    if created_at.microsecond == 0:
+        lowest = created_at.strftime("%Y-%m-%d %H:%M:%S")
+        forms.append(lowest)
+    return or_(as_text < lowest, and_(as_text.in_(forms), id_col < id_))
+
+
+def keyset_page(query, created_col, id_col, cursor: Optional[str], limit: int):
+    """Rows after `cursor` ordered by (created_at, id) descending, and the next cursor or None."""
+    if cursor:
+        created_at, id_ = decode_cursor(cursor)
+        query = query.filter(_older_than(query, created_col, id_col, created_at, id_))
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
@@ -0,0 +1,186 @@
+"""
+Booking prices, in integer cents throughout.
+
+A nanny's rate card (NannyRateCard, or the PRICING_DEFAULT_* settings when
+there is none) gives an hourly rate and basis-point multipliers for the
+evening (18:00-22:00) and night (22:00-06:00) bands and for Saturdays and
+Sundays; band and weekend multipliers compound. Every second of a slot is
+charged at rate * band * weekend, summed as one integer over all slots of a
+request and rounded half up once, so splitting a booking into slots never
+changes its price by rounding. The platform fee (PRICING_FEE_BPS) is added on
+top of the base amount, again rounded once.
+
+Slot times are priced by their wall-clock time as given.
+
+Rate cards are cached per worker. set_rate_card() bumps the "rate_cards"
+cache version (app.coherence) so the other workers drop theirs; the writer
+calls rate_cards.invalidate() for its own after committing.
+"""
+import bisect
+import threading
+from collections import OrderedDict
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from typing import Dict, Iterable, NamedTuple, Sequence, Tuple
+
+from sqlalchemy import insert
+
+from app import coherence, models
+from app.config import (
+    PRICING_CURRENCY, PRICING_DEFAULT_EVENING_BPS, PRICING_DEFAULT_HOURLY_RATE_CENTS,
+    PRICING_DEFAULT_NIGHT_BPS, PRICING_DEFAULT_WEEKEND_BPS, PRICING_FEE_BPS, RATE_CARD_CACHE_SIZE,
+)
+
+BPS = 10_000
+EVENING_STARTS = time(18, 0)
+NIGHT_STARTS = time(22, 0)
+NIGHT_ENDS = time(6, 0)
+DAY_SECONDS = 86_400
+# seconds since midnight at which each band starts, and the band
+BAND_STARTS = [0, NIGHT_ENDS.hour * 3600, EVENING_STARTS.hour * 3600, NIGHT_STARTS.hour * 3600, DAY_SECONDS]
+BAND_NAMES = ["night", "day", "evening", "night"]
+
+
+class RateCard(NamedTuple):
+    currency: str
+    hourly_rate_cents: int
+    evening_bps: int
+    night_bps: int
+    weekend_bps: int
+
+    def band_bps(self, band: str) -> int:
+        return {"day": BPS, "evening": self.evening_bps, "night": self.night_bps}[band]
+
+
+DEFAULT_CARD = RateCard(
+    PRICING_CURRENCY, PRICING_DEFAULT_HOURLY_RATE_CENTS,
+    PRICING_DEFAULT_EVENING_BPS, PRICING_DEFAULT_NIGHT_BPS, PRICING_DEFAULT_WEEKEND_BPS,
+)
+
+
+class Quote(NamedTuple):
+    currency: str
+    hourly_rate_cents: int
+    fee_bps: int
+    total_minutes: int
+    base_amount_cents: int
+    fee_amount_cents: int
+    total_amount_cents: int
+
+
+def _round_div(numerator: int, denominator: int) -> int:
+    """Non-negative integer division rounding half up."""
+    return (numerator + denominator // 2) // denominator
+
+
+def _weighted_seconds(card: RateCard, starts_at: datetime, ends_at: datetime) -> Tuple[int, int]:
+    """(seconds, sum of seconds * band bps * weekend-or-plain bps) over [starts_at, ends_at)."""
+    seconds = weighted = 0
+    cursor = starts_at
+    while cursor < ends_at:
+        midnight = cursor.replace(hour=0, minute=0, second=0, microsecond=0)
+        i = bisect.bisect_right(BAND_STARTS, int((cursor - midnight).total_seconds())) - 1
+        segment_end = min(ends_at, midnight + timedelta(seconds=BAND_STARTS[i + 1]))
+        span = int((segment_end - cursor).total_seconds())
+        day_bps = card.weekend_bps if cursor.weekday() >= 5 else BPS
+        seconds += span
+        weighted += span * card.band_bps(BAND_NAMES[i]) * day_bps
+        cursor = segment_end
+    return seconds, weighted
+
+
+def quote(card: RateCard, slots: Iterable[Tuple[datetime, datetime]], fee_bps: int = PRICING_FEE_BPS) -> Quote:
+    """Price all slots together; empty or inverted slots cost nothing."""
+    seconds = weighted = 0
+    for starts_at, ends_at in slots:
+        s, w = _weighted_seconds(card, starts_at, ends_at)
+        seconds += s
+        weighted += w
+    base = _round_div(weighted * card.hourly_rate_cents, 3600 * BPS * BPS)
+    fee = _round_div(base * fee_bps, BPS)
+    return Quote(card.currency, card.hourly_rate_cents, fee_bps, seconds // 60, base, fee, base + fee)
+
+
+class _RateCardCache:
+    """LRU of RateCard per nanny_id; nannies without a card are cached as DEFAULT_CARD."""
+
+    def __init__(self, size: int = RATE_CARD_CACHE_SIZE):
+        self.size = size
+        self._data: "OrderedDict[int, RateCard]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_many(self, db, nanny_ids: Sequence[int]) -> Dict[int, RateCard]:
+        coherence.versions.revalidate(db)
+        found: Dict[int, RateCard] = {}
+        with self._lock:
+            for nanny_id in set(nanny_ids):
+                card = self._data.get(nanny_id)
+                if card is not None:
+                    self._data.move_to_end(nanny_id)
+                    found[nanny_id] = card
+        missing = [n for n in set(nanny_ids) if n not in found]
+        if missing:
+            rows = db.query(models.NannyRateCard).filter(models.NannyRateCard.nanny_id.in_(missing)).all()
+            loaded = {r.nanny_id: card_from_row(r) for r in rows}
+            for nanny_id in missing:
+                found[nanny_id] = loaded.get(nanny_id, DEFAULT_CARD)
+            if self.size > 0:
+                with self._lock:
+                    for nanny_id in missing:
+                        self._data[nanny_id] = found[nanny_id]
+                        self._data.move_to_end(nanny_id)
+                    while len(self._data) > self.size:
+                        self._data.popitem(last=False)
+        return found
+
+    def get(self, db, nanny_id: int) -> RateCard:
+        return self.get_many(db, [nanny_id])[nanny_id]
+
+    def invalidate(self, nanny_id: int) -> None:
+        with self._lock:
+            self._data.pop(nanny_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+rate_cards = _RateCardCache()
+coherence.versions.subscribe(coherence.RATE_CARDS, rate_cards.clear)
+
+
+def card_from_row(row) -> RateCard:
+    return RateCard(row.currency, row.hourly_rate_cents, row.evening_bps, row.night_bps, row.weekend_bps)
+
+
+def set_rate_card(db, nanny_id: int, **fields) -> models.NannyRateCard:
+    """Create or update a nanny's card and bump the cache version; the caller commits, then invalidates."""
+    row = db.query(models.NannyRateCard).filter_by(nanny_id=nanny_id).first()
+    if row is None:
+        row = models.NannyRateCard(nanny_id=nanny_id, **{**DEFAULT_CARD._asdict(), **fields})
+        db.add(row)
+    else:
+        for name, value in fields.items():
+            setattr(row, name, value)
+    coherence.bump(db, coherence.RATE_CARDS)
+    return row
+
+
+def write_snapshots(db, quotes: Iterable[Tuple[int, Quote]]) -> int:
+    """Insert one BookingPricingSnapshot per (booking_request_id, quote) in a single statement."""
+    rows = [
+        {
+            "booking_request_id": booking_request_id,
+            "currency": q.currency,
+            "hourly_rate_cents": q.hourly_rate_cents,
+            "fee_pct": Decimal(q.fee_bps) / BPS,
+            "total_minutes": q.total_minutes,
+            "base_amount_cents": q.base_amount_cents,
+            "fee_amount_cents": q.fee_amount_cents,
+            "total_amount_cents": q.total_amount_cents,
+        }
+        for booking_request_id, q in quotes
+    ]
+    if rows:
+        db.execute(insert(models.BookingPricingSnapshot.__table__), rows)
+    return len(rows)
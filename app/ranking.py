@@ -0,0 +1,180 @@
+"""
+Ordering of nanny search results.
+
+A ranker turns the whole candidate set into sort keys in one pass (smaller
+sorts first) and top_k() orders only what the requested page needs: a bounded
+heap of offset + limit entries instead of a full sort of every candidate.
+
+Two rankers ship:
+
+* "lexicographic": text relevance, then distance, rating and review count,
+  each breaking ties of the one before. This is the historical order.
+* "blended": one weighted score per nanny mixing distance decay, a Bayesian
+  smoothed rating (few reviews pull towards the prior), review volume and
+  how recently the nanny was last reviewed.
+
+SEARCH_RANKER picks the deployment's ranker and SEARCH_RANKING_WEIGHTS
+overrides the blended weights, e.g. "distance=0.5,rating=0.3,recency=0".
+check_config() builds every ranker from them at startup, so a typo stops the
+app instead of failing each search.
+"""
+import heapq
+import math
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from app.config import SEARCH_RANKER, SEARCH_RANKING_WEIGHTS
+
+
+class Candidate(NamedTuple):
+    nanny_id: int
+    distance_km: Optional[float]
+    rating: Optional[float]
+    review_count: int
+    last_review_at: Optional[datetime]
+    # bm25 from app.search_index.match (lower is better, 0.0 without q=)
+    text_score: float
+    result: dict
+
+
+class LexicographicRanker:
+    name = "lexicographic"
+
+    def keys(self, candidates: Sequence[Candidate], now: datetime) -> List[tuple]:
+        return [
+            (
+                c.text_score,
+                c.distance_km is None,
+                c.distance_km if c.distance_km is not None else 10**9,
+                c.rating is None,
+                -(c.rating if c.rating is not None else -1),
+                -(c.review_count or 0),
+                c.nanny_id,
+            )
+            for c in candidates
+        ]
+
+
+DEFAULT_WEIGHTS = {
+    "distance": 0.35,
+    "rating": 0.35,
+    "volume": 0.15,
+    "recency": 0.15,
+    # only matters when q= is given
+    "text": 1.0,
+}
+DEFAULT_PARAMS = {
+    # km at which the distance term has decayed to 1/e
+    "distance_scale_km": 5.0,
+    # Bayesian prior: a nanny starts as prior_reviews reviews of prior_rating stars
+    "prior_rating": 3.5,
+    "prior_reviews": 5.0,
+    # review count at which the volume term saturates
+    "volume_cap": 50.0,
+    # days for the recency term to halve
+    "recency_half_life_days": 90.0,
+}
+
+
+class BlendedRanker:
+    name = "blended"
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, **params):
+        unknown = set(weights or ()) - set(DEFAULT_WEIGHTS)
+        unknown |= set(params) - set(DEFAULT_PARAMS)
+        if unknown:
+            raise ValueError(f"unknown ranking settings: {', '.join(sorted(unknown))}")
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.params = {**DEFAULT_PARAMS, **params}
+
+    def scores(self, candidates: Sequence[Candidate], now: datetime) -> List[float]:
+        w, p = self.weights, self.params
+        scale = p["distance_scale_km"]
+        prior_sum = p["prior_rating"] * p["prior_reviews"]
+        volume_norm = math.log1p(p["volume_cap"])
+        decay_per_day = math.log(2) / p["recency_half_life_days"]
+
+        out = []
+        for c in candidates:
+            n = c.review_count or 0
+            distance = math.exp(-c.distance_km / scale) if c.distance_km is not None else 0.0
+            smoothed = (prior_sum + (c.rating or 0.0) * n) / (p["prior_reviews"] + n)
+            rating = (smoothed - 1.0) / 4.0
+            volume = min(1.0, math.log1p(n) / volume_norm)
+            if c.last_review_at is not None:
+                age_days = max(0.0, (now - c.last_review_at).total_seconds() / 86400)
+                recency = math.exp(-decay_per_day * age_days)
+            else:
+                recency = 0.0
+            # bm25 is <= 0; map it to [0, 1) so it blends with the other terms
+            relevance = -c.text_score / (1.0 - c.text_score) if c.text_score < 0 else 0.0
+            out.append(
+                w["distance"] * distance
+                + w["rating"] * rating
+                + w["volume"] * volume
+                + w["recency"] * recency
+                + w["text"] * relevance
+            )
+        return out
+
+    def keys(self, candidates: Sequence[Candidate], now: datetime) -> List[tuple]:
+        return [(-s, c.nanny_id) for s, c in zip(self.scores(candidates, now), candidates)]
+
+
+def parse_weights(spec: str) -> Dict[str, float]:
+    """"distance=0.5,rating=0.3" -> {"distance": 0.5, "rating": 0.3}."""
+    weights = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"expected name=value in ranking weights, got {part!r}")
+        try:
+            weight = float(value)
+        except ValueError:
+            raise ValueError(f"expected a number in ranking weights, got {part!r}") from None
+        if not math.isfinite(weight):
+            raise ValueError(f"ranking weights must be finite, got {part!r}")
+        weights[name.strip()] = weight
+    return weights
+
+
+RANKERS: Dict[str, Callable[[], object]] = {
+    LexicographicRanker.name: LexicographicRanker,
+    BlendedRanker.name: lambda: BlendedRanker(parse_weights(SEARCH_RANKING_WEIGHTS)),
+}
+_instances: Dict[str, object] = {}
+
+
+def get_ranker(name: Optional[str] = None):
+    name = name or SEARCH_RANKER
+    ranker = _instances.get(name)
+    if ranker is None:
+        if name not in RANKERS:
+            raise ValueError(f"unknown ranker {name!r}")
+        ranker = _instances[name] = RANKERS[name]()
+    return ranker
+
+
+def check_config() -> None:
+    """Build the configured rankers now; raises ValueError naming the bad setting."""
+    if SEARCH_RANKER not in RANKERS:
+        raise ValueError(f"SEARCH_RANKER={SEARCH_RANKER!r}, expected one of: {', '.join(sorted(RANKERS))}")
+    for name in RANKERS:
+        try:
+            get_ranker(name)
+        except ValueError as e:
+            raise ValueError(f"SEARCH_RANKING_WEIGHTS={SEARCH_RANKING_WEIGHTS!r}: {e}") from None
+
+
+def top_k(
+    ranker, candidates: Sequence[Candidate], limit: Optional[int] = None, offset: int = 0,
+    now: Optional[datetime] = None,
+) -> List[Candidate]:
+    """candidates[offset:offset + limit] in ranker order; everything when limit is None."""
+    now = now or datetime.utcnow()
+    keys = ranker.keys(candidates, now)
+    if limit is None:
+        ordered = sorted(range(len(candidates)), key=keys.__getitem__)
+    else:
+        ordered = heapq.nsmallest(offset + limit, range(len(candidates)), key=keys.__getitem__)
+    return [candidates[i] for i in ordered[offset:]]
@@ -0,0 +1,196 @@
+"""
+In-process rate limiting and admission control.
+
+Every request spends tokens from a per-client bucket (refilled at
+RATE_LIMIT_RATE tokens/s up to RATE_LIMIT_BURST). Clients are keyed by their
+verified admin key or bearer token subject, falling back to the client IP.
+Routes listed in ROUTE_COSTS cost more than the default of 1; the ones marked
+expensive also take a slot from a process-wide cap of
+RATE_LIMIT_MAX_EXPENSIVE concurrent requests, so a burst of searches or bulk
+bookings cannot occupy every worker thread.
+
+An empty bucket answers 429 and a full expensive cap answers 503, both with
+Retry-After and without touching the database. Limits are per process, so
+with N workers a client gets up to N times the configured rate.
+"""
+import hashlib
+import math
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+from jose import JWTError
+
+from app import config, metrics
+from app.security import api_key_matches, decode_token
+
+# (method, path regex, cost, expensive)
+ROUTE_COSTS: List[Tuple[str, "re.Pattern", float, bool]] = [
+    ("GET", re.compile(r"^/nannies/search$"), 5, True),
+    ("POST", re.compile(r"^/bookings/bulk$"), 10, True),
+    ("GET", re.compile(r"^/admin/export/[^/]+$"), 20, True),
+    ("GET", re.compile(r"^/nannies/\d+/reviews$"), 2, False),
+]
+DEFAULT_COST = 1.0
+# large bulk payloads cost one extra token per this many body bytes
+BODY_BYTES_PER_TOKEN = 8192
+EXEMPT_PATHS = ("/health", "/metrics", "/static/")
+
+
+def route_cost(method: str, path: str, content_length: int = 0) -> Tuple[float, bool]:
+    for m, pattern, cost, expensive in ROUTE_COSTS:
+        if m == method and pattern.match(path):
+            if method == "POST":
+                cost += content_length // BODY_BYTES_PER_TOKEN
+            return float(cost), expensive
+    return DEFAULT_COST, False
+
+
+def client_key(request: Request) -> str:
+    """Bucket key: the verified admin key or token subject if present, else client IP.
+
+    Unverified credentials are ignored, so rotating junk keys cannot buy a
+    fresh bucket per request or push real clients out of the LRU.
+    """
+    if api_key_matches(request.headers.get("x-admin-key") or request.query_params.get("admin_key")):
+        return "cred:api-key"
+    authorization = request.headers.get("authorization") or ""
+    if authorization.lower().startswith("bearer "):
+        token = authorization.split(" ", 1)[1].strip()
+        try:
+            claims = decode_token(token)
+        except JWTError:
+            claims = None
+        if claims is not None:
+            subject = claims.get("sub")
+            if subject is not None:
+                return f"sub:{subject}"
+            return "cred:" + hashlib.sha256(token.encode()).hexdigest()[:32]
+    return "ip:" + (request.client.host if request.client else "unknown")
+
+
+class TokenBuckets:
+    """Bounded LRU of per-client (tokens, last_refill) buckets."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, cost: float, now: Optional[float] = None) -> float:
+        """Spend cost tokens; returns 0 on success, else seconds until they are available."""
+        now = time.monotonic() if now is None else now
+        cost = min(cost, self.burst)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [self.burst, now]
+                self._buckets[key] = bucket
+                while len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return 0.0
+            return (cost - bucket[0]) / self.rate
+
+
+class ConcurrencyCap:
+    """Non-blocking counting gate: acquire() fails instead of queueing."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        with self._lock:
+            if self.active >= self.limit:
+                return False
+            self.active += 1
+            return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.active -= 1
+
+
+buckets = TokenBuckets(config.RATE_LIMIT_RATE, config.RATE_LIMIT_BURST, config.RATE_LIMIT_MAX_CLIENTS)
+expensive = ConcurrencyCap(config.RATE_LIMIT_MAX_EXPENSIVE)
+
+
+def _once(fn: Callable[[], None]) -> Callable[[], None]:
+    done = threading.Lock()
+
+    def call() -> None:
+        if done.acquire(blocking=False):
+            fn()
+    return call
+
+
+class _ReleaseAfterSend:
+    """Wraps a response so release() runs once it has been sent, failed or been dropped.
+
+    Releasing from the body iterator alone leaks the slot when the body is
+    never iterated (client gone before the first chunk, an error while
+    sending the headers), so the whole send is wrapped instead, with a
+    finalizer as the last resort for a response that is never sent at all.
+    """
+
+    def __init__(self, response, release: Callable[[], None]):
+        self.response = response
+        self.release = release
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    async def __call__(self, scope, receive, send) -> None:
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            self.release()
+
+    def __del__(self):
+        self.release()
+
+
+def _reject(status: int, detail: str, retry_after: float, reason: str) -> JSONResponse:
+    metrics.RATE_LIMITED.inc(reason)
+    return JSONResponse(
+        {"detail": detail}, status_code=status,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+async def middleware(request: Request, call_next):
+    path = request.url.path
+    if path.startswith(EXEMPT_PATHS):
+        return await call_next(request)
+    try:
+        length = int(request.headers.get("content-length") or 0)
+    except ValueError:
+        length = 0
+    cost, is_expensive = route_cost(request.method, path, length)
+    wait = buckets.take(client_key(request), cost)
+    if wait:
+        return _reject(429, "Too many requests", wait, "rate")
+    if not is_expensive:
+        return await call_next(request)
+    if not expensive.acquire():
+        return _reject(503, "Server busy, retry shortly", 1, "concurrency")
+    try:
+        response = await call_next(request)
+    except BaseException:
+        expensive.release()
+        raise
+    # hold the slot until the body has been sent (exports stream for a while)
+    return _ReleaseAfterSend(response, _once(expensive.release))
@@ -0,0 +1,163 @@
+"""
+12-month rating aggregates per nanny.
+
+The figures are kept in nanny_rating_stats and recomputed, with one grouped
+query for all affected nannies, whenever a write changes the set of approved
+reviews. The window starts at midnight UTC 365 days ago (window_start()), so
+it moves once a day and the reviews listing can use exactly the same bounds.
+
+Missing rows, and rows refreshed before today's window moved, are recomputed
+on read and written back in a short transaction of their own, so the next
+read finds them fresh and the request's session is left alone. Search
+refreshes its candidates' rows once they are older than STATS_MAX_AGE.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import func, or_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app import models, search_index
+from app.db import engine
+
+WINDOW = timedelta(days=365)
+STATS_MAX_AGE = timedelta(hours=24)
+
+Stats = Tuple[Optional[float], int]
+
+
+def window_start(now: Optional[datetime] = None) -> datetime:
+    """First instant of the 12-month window: midnight UTC, WINDOW before today."""
+    today = (now or datetime.utcnow()).replace(hour=0, minute=0, second=0, microsecond=0)
+    return today - WINDOW
+
+
+def compute(db, nanny_ids: Iterable[int]) -> Dict[int, dict]:
+    """Aggregate approved reviews of the last 12 months for every id in one query."""
+    ids = list(set(nanny_ids))
+    out = {nid: {"average_rating_12m": None, "review_count_12m": 0, "last_review_at": None} for nid in ids}
+    if not ids:
+        return out
+    start = window_start()
+    rows = (
+        db.query(
+            models.Review.nanny_id,
+            func.avg(models.Review.stars),
+            func.count(models.Review.id),
+            func.max(models.Review.created_at),
+        )
+        .filter(
+            models.Review.nanny_id.in_(ids),
+            models.Review.approved == True,
+            models.Review.created_at >= start,
+        )
+        .group_by(models.Review.nanny_id)
+        .all()
+    )
+    for nanny_id, avg, count, last in rows:
+        out[nanny_id] = {
+            "average_rating_12m": float(avg) if avg is not None else None,
+            "review_count_12m": int(count),
+            "last_review_at": last,
+        }
+    return out
+
+
+def refresh(db, nanny_ids: Iterable[int]) -> Dict[int, dict]:
+    """Recompute and store stats for these nannies; the caller commits."""
+    fresh = compute(db, nanny_ids)
+    if not fresh:
+        return fresh
+    now = datetime.utcnow()
+    existing = {
+        s.nanny_id: s
+        for s in db.query(models.NannyRatingStats).filter(models.NannyRatingStats.nanny_id.in_(list(fresh)))
+    }
+    for nanny_id, values in fresh.items():
+        row = existing.get(nanny_id)
+        if row is None:
+            row = models.NannyRatingStats(nanny_id=nanny_id)
+            db.add(row)
+        row.average_rating_12m = values["average_rating_12m"]
+        row.review_count_12m = values["review_count_12m"]
+        row.last_review_at = values["last_review_at"]
+        row.refreshed_at = now
+    search_index.set_ratings(db, fresh)
+    return fresh
+
+
+def _store(fresh: Dict[int, dict], now: datetime) -> None:
+    """Upsert figures computed on read, in their own transaction."""
+    table = models.NannyRatingStats.__table__
+    stmt = sqlite_insert(table)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.nanny_id],
+        set_={
+            "average_rating_12m": stmt.excluded.average_rating_12m,
+            "review_count_12m": stmt.excluded.review_count_12m,
+            "last_review_at": stmt.excluded.last_review_at,
+            "refreshed_at": stmt.excluded.refreshed_at,
+        },
+    )
+    with engine.begin() as conn:
+        conn.execute(stmt, [{"nanny_id": nid, **values, "refreshed_at": now} for nid, values in fresh.items()])
+        search_index.set_ratings(conn, fresh)
+
+
+def _load(db, ids):
+    """{nanny_id: (avg, count, refreshed_at)}, recomputing and storing missing or stale rows."""
+    now = datetime.utcnow()
+    # figures from before midnight used the previous day's window
+    cutoff = window_start(now) + WINDOW
+    out = {}
+    for s in db.query(models.NannyRatingStats).filter(models.NannyRatingStats.nanny_id.in_(ids)):
+        if s.refreshed_at >= cutoff:
+            out[s.nanny_id] = (s.average_rating_12m, s.review_count_12m, s.refreshed_at)
+    missing = [nid for nid in ids if nid not in out]
+    if missing:
+        fresh = compute(db, missing)
+        _store(fresh, now)
+        for nanny_id, values in fresh.items():
+            out[nanny_id] = (values["average_rating_12m"], values["review_count_12m"], now)
+    return out
+
+
+def refresh_stale(db, nanny_ids) -> int:
+    """Recompute and store stats that are missing or older than STATS_MAX_AGE among
+    nanny_ids (ids or a subquery of them) that have a search document; returns how many.
+
+    Search calls this on its candidates, so documents, which search filters and ranks
+    on, never lag the 12-month window by more than STATS_MAX_AGE.
+    """
+    now = datetime.utcnow()
+    doc = models.NannySearchDocument
+    stats = models.NannyRatingStats
+    stale = [
+        nid for (nid,) in db.query(doc.nanny_id)
+        .outerjoin(stats, stats.nanny_id == doc.nanny_id)
+        .filter(doc.nanny_id.in_(nanny_ids), or_(stats.refreshed_at.is_(None), stats.refreshed_at < now - STATS_MAX_AGE))
+    ]
+    if stale:
+        _store(compute(db, stale), now)
+    return len(stale)
+
+
+def get_many(db, nanny_ids: Iterable[int]) -> Dict[int, Stats]:
+    """(average_rating_12m, review_count_12m) per nanny, recomputing missing or stale rows."""
+    ids = list(set(nanny_ids))
+    if not ids:
+        return {}
+    return {nid: (avg, count) for nid, (avg, count, _) in _load(db, ids).items()}
+
+
+def get(db, nanny_id: int) -> Stats:
+    return get_many(db, [nanny_id])[nanny_id]
+
+
+def get_versioned(db, nanny_id: int) -> Tuple[Optional[float], int, datetime]:
+    """get() plus the time the stored figures were last refreshed.
+
+    Every write that changes a nanny's approved reviews goes through refresh(), so
+    refreshed_at doubles as a last-modified time for that nanny's reviews.
+    """
+    return _load(db, [nanny_id])[nanny_id]
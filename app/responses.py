@@ -0,0 +1,27 @@
+"""
+Single-pass JSON responses for large result sets.
+
+By default FastAPI validates whatever a handler returns against its
+response_model, dumps the result to Python primitives and encodes those with
+the stdlib json module. For endpoints that already shape their rows to match
+the schema, model_response() validates once into the schema and lets
+pydantic-core write the JSON bytes directly. Returning a Response makes FastAPI
+skip its own response_model pass; keep response_model on the route for the
+OpenAPI schema.
+"""
+from typing import Any, Mapping, Optional, Type
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+
+class ModelResponse(Response):
+    media_type = "application/json"
+
+    def __init__(self, model: BaseModel, status_code: int = 200, headers: Optional[Mapping[str, str]] = None):
+        super().__init__(content=model.model_dump_json(), status_code=status_code, headers=headers)
+
+
+def model_response(schema: Type[BaseModel], data: Any, **kwargs) -> ModelResponse:
+    """Validate data into schema and serialize it in one step."""
+    return ModelResponse(schema.model_validate(data), **kwargs)
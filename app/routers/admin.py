@@ -1,18 +1,17 @@
 
 
 
+from bisect import bisect_left
+from collections import defaultdict
 from datetime import date, time
 from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Header
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import tuple_
 from sqlalchemy.orm import Session
 from app.db import SessionLocal
-from app import models
-from app.config import ADMIN_API_KEY
-
-def require_admin(x_admin_key: str = Header(default=None), admin_key: str = None):
-	key = x_admin_key or admin_key
-	if key != ADMIN_API_KEY:
-		raise HTTPException(status_code=401, detail="Invalid or missing admin key")
+from app import audit, availability, coherence, models, pagination, pricing, ratings
+from app.schemas import AvailabilityRuleCreate, BulkAvailabilityRequest, RateCardUpdate, ReviewModerationRequest
+from app.deps import require_admin
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -24,7 +23,7 @@ def get_db():
 	finally:
 		db.close()
 
-@router.post("/availability", dependencies=[Depends(require_admin)])
+@router.post("/availability")
 def set_availability(
 	nanny_id: int = Query(...),
 	day: date = Query(...),
@@ -33,6 +32,7 @@ def set_availability(
 	is_available: bool = Query(True),
 	notes: Optional[str] = Query(None),
 	db: Session = Depends(get_db),
+	actor: Optional[int] = Depends(require_admin),
 ):
 	if start_time >= end_time:
 		raise HTTPException(status_code=400, detail="start_time must be before end_time")
@@ -66,8 +66,86 @@ def set_availability(
 		db.add(row)
 	db.commit()
 	db.refresh(row)
+	audit.record(actor, "set_availability", "NannyAvailability", row.id, {
+		"nanny_id": nanny_id, "day": day, "start_time": start_time, "end_time": end_time,
+		"is_available": is_available, "notes": notes,
+	})
 	return row
 
+@router.post("/availability/bulk")
+def set_availability_bulk(payload: BulkAvailabilityRequest, db: Session = Depends(get_db), actor: Optional[int] = Depends(require_admin)):
+	"""
+	Upsert many slots in one transaction. A slot with the same nanny, day, start and end as an
+	existing one updates it; any other overlap, with stored slots or earlier entries of the same
+	request, rejects that entry. Results are returned per entry, in request order.
+	"""
+	results = [None] * len(payload.entries)
+	groups = defaultdict(list)
+	for i, e in enumerate(payload.entries):
+		if e.start_time >= e.end_time:
+			results[i] = {"index": i, "status": "error", "error": "start_time must be before end_time"}
+			continue
+		groups[(e.nanny_id, e.day)].append(i)
+
+	existing = defaultdict(list)
+	if groups:
+		rows = db.query(models.NannyAvailability).filter(
+			tuple_(models.NannyAvailability.nanny_id, models.NannyAvailability.date).in_(list(groups))
+		).all()
+		for row in rows:
+			existing[(row.nanny_id, row.date)].append(row)
+
+	touched = []
+	for key, indexes in groups.items():
+		by_window = {(r.start_time, r.end_time): r for r in existing[key]}
+		stored = sorted(existing[key], key=lambda r: r.start_time)
+		stored_starts = [r.start_time for r in stored]
+		accepted_end = None
+		for i in sorted(indexes, key=lambda i: (payload.entries[i].start_time, i)):
+			e = payload.entries[i]
+			match = by_window.get((e.start_time, e.end_time))
+			if match is None:
+				# stored slots don't overlap each other, so only the last one starting before e.end_time can
+				j = bisect_left(stored_starts, e.end_time)
+				if j and stored[j - 1].end_time > e.start_time:
+					results[i] = {"index": i, "status": "error", "error": "Availability overlaps an existing slot"}
+					continue
+			if accepted_end is not None and e.start_time < accepted_end:
+				results[i] = {"index": i, "status": "error", "error": "Overlaps another entry in this request"}
+				continue
+			accepted_end = e.end_time if accepted_end is None else max(accepted_end, e.end_time)
+			if match is not None:
+				match.is_available = e.is_available
+				match.notes = e.notes
+				row, status = match, "updated"
+			else:
+				row = models.NannyAvailability(
+					nanny_id=e.nanny_id,
+					date=e.day,
+					start_time=e.start_time,
+					end_time=e.end_time,
+					is_available=e.is_available,
+					notes=e.notes,
+					created_by="admin",
+				)
+				db.add(row)
+				status = "created"
+			touched.append((i, row, status))
+
+	db.flush()
+	for i, row, status in touched:
+		results[i] = {"index": i, "status": status, "id": row.id}
+	db.commit()
+	for i, row, status in touched:
+		e = payload.entries[i]
+		audit.record(actor, f"bulk_availability_{status}", "NannyAvailability", row.id, e.model_dump())
+	return {
+		"created": sum(1 for r in results if r["status"] == "created"),
+		"updated": sum(1 for r in results if r["status"] == "updated"),
+		"errors": sum(1 for r in results if r["status"] == "error"),
+		"results": results,
+	}
+
 @router.get("/availability", dependencies=[Depends(require_admin)])
 def list_availability(
 	nanny_id: int = Query(...),
@@ -80,19 +158,155 @@ def list_availability(
 	return q.all()
 
 
-@router.post("/reviews/{review_id}/approve", dependencies=[Depends(require_admin)])
-def approve_review(review_id: int, db: Session = Depends(get_db)):
+@router.get("/availability/windows", dependencies=[Depends(require_admin)])
+def list_availability_windows(
+	nanny_id: int = Query(...),
+	from_: date = Query(..., alias="from"),
+	to: date = Query(...),
+	db: Session = Depends(get_db),
+):
+	"""Effective availability: stored slots plus recurrence rules expanded for the range."""
+	if to < from_:
+		raise HTTPException(status_code=400, detail="to must not be before from")
+	try:
+		windows = availability.windows(db, nanny_id, from_, to)
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e))
+	return [w._asdict() for w in windows]
+
+
+@router.post("/availability/rules")
+def create_availability_rule(payload: AvailabilityRuleCreate, db: Session = Depends(get_db), actor: Optional[int] = Depends(require_admin)):
+	if payload.start_time >= payload.end_time:
+		raise HTTPException(status_code=400, detail="start_time must be before end_time")
+	if payload.ends_on is not None and payload.ends_on < payload.starts_on:
+		raise HTTPException(status_code=400, detail="ends_on must not be before starts_on")
+	rule = models.NannyAvailabilityRule(
+		nanny_id=payload.nanny_id,
+		rrule=payload.rrule.strip(),
+		starts_on=payload.starts_on,
+		ends_on=payload.ends_on,
+		start_time=payload.start_time,
+		end_time=payload.end_time,
+		exdates=",".join(d.isoformat() for d in sorted(set(payload.exdates))) or None,
+		is_available=payload.is_available,
+		notes=payload.notes,
+	)
+	try:
+		availability.build_ruleset(rule)
+	except (ValueError, TypeError) as e:
+		raise HTTPException(status_code=400, detail=f"Invalid rrule: {e}")
+	db.add(rule)
+	coherence.bump(db, coherence.AVAILABILITY_RULES)
+	db.commit()
+	db.refresh(rule)
+	availability.invalidate(rule.nanny_id)
+	audit.record(actor, "create_availability_rule", "NannyAvailabilityRule", rule.id, payload.model_dump())
+	return rule
+
+
+@router.get("/availability/rules", dependencies=[Depends(require_admin)])
+def list_availability_rules(nanny_id: int = Query(...), db: Session = Depends(get_db)):
+	return db.query(models.NannyAvailabilityRule).filter_by(nanny_id=nanny_id).all()
+
+
+@router.delete("/availability/rules/{rule_id}")
+def delete_availability_rule(rule_id: int, db: Session = Depends(get_db), actor: Optional[int] = Depends(require_admin)):
+	rule = db.query(models.NannyAvailabilityRule).filter_by(id=rule_id).first()
+	if not rule:
+		raise HTTPException(status_code=404, detail="Rule not found")
+	nanny_id = rule.nanny_id
+	db.delete(rule)
+	coherence.bump(db, coherence.AVAILABILITY_RULES)
+	db.commit()
+	availability.invalidate(nanny_id)
+	audit.record(actor, "delete_availability_rule", "NannyAvailabilityRule", rule_id, {"nanny_id": nanny_id})
+	return {"ok": True, "rule_id": rule_id}
+
+
+@router.get("/nannies/{nanny_id}/rate-card", dependencies=[Depends(require_admin)])
+def get_rate_card(nanny_id: int, db: Session = Depends(get_db)):
+	card = pricing.rate_cards.get(db, nanny_id)
+	return {"nanny_id": nanny_id, **card._asdict()}
+
+
+@router.put("/nannies/{nanny_id}/rate-card")
+def set_rate_card(nanny_id: int, payload: RateCardUpdate, db: Session = Depends(get_db), actor: Optional[int] = Depends(require_admin)):
+	if not db.query(models.Nanny.id).filter_by(id=nanny_id).first():
+		raise HTTPException(status_code=404, detail="Nanny not found")
+	fields = payload.model_dump(exclude_none=True)
+	if "currency" in fields:
+		fields["currency"] = fields["currency"].upper()
+	pricing.set_rate_card(db, nanny_id, **fields)
+	db.commit()
+	pricing.rate_cards.invalidate(nanny_id)
+	audit.record(actor, "set_rate_card", "NannyRateCard", nanny_id, fields)
+	return get_rate_card(nanny_id, db)
+
+
+@router.post("/reviews/{review_id}/approve")
+def approve_review(review_id: int, db: Session = Depends(get_db), actor: Optional[int] = Depends(require_admin)):
 	review = db.query(models.Review).filter_by(id=review_id).first()
 	if not review:
 		raise HTTPException(status_code=404, detail="Review not found")
 	if not review.approved:
 		review.approved = True
+		db.flush()
+		ratings.refresh(db, [review.nanny_id])
 		db.commit()
 		db.refresh(review)
+		audit.record(actor, "approve_review", "Review", review.id, {"nanny_id": review.nanny_id})
 	# If already approved, do not update or error, just return 200 with review
 	return review
 
 
+@router.post("/reviews/moderate")
+def moderate_reviews(payload: ReviewModerationRequest, db: Session = Depends(get_db), actor: Optional[int] = Depends(require_admin)):
+	"""
+	Approve or reject many pending reviews with one set-based statement. Rejected reviews
+	are deleted; reviews that are already approved are left alone either way. Rating stats
+	are recomputed once per affected nanny and only changed reviews are audited.
+	"""
+	ids = list(set(payload.review_ids))
+	found = db.query(models.Review.id, models.Review.nanny_id, models.Review.approved).filter(models.Review.id.in_(ids)).all()
+	found_ids = [r.id for r in found]
+	pending = [r for r in found if not r.approved]
+	pending_ids = [r.id for r in pending]
+	affected = {r.nanny_id for r in pending}
+	changed = 0
+	if pending_ids:
+		q = db.query(models.Review).filter(models.Review.id.in_(pending_ids), models.Review.approved == False)
+		if payload.action == "approve":
+			changed = q.update({models.Review.approved: True}, synchronize_session=False)
+			ratings.refresh(db, affected)
+		else:
+			# pending reviews never count towards ratings, so deleting them changes no stats
+			changed = q.delete(synchronize_session=False)
+		db.commit()
+	for r in pending:
+		audit.record(actor, f"{payload.action}_review", "Review", r.id, {"nanny_id": r.nanny_id, "bulk": True})
+	return {
+		"action": payload.action,
+		"changed": changed,
+		"not_found": sorted(set(ids) - set(found_ids)),
+		"already_approved": sorted(r.id for r in found if r.approved),
+		"nanny_ids": sorted(affected),
+	}
+
+
 @router.get("/reviews", dependencies=[Depends(require_admin)])
-def list_reviews(approved: bool = Query(False), db: Session = Depends(get_db)):
-	return db.query(models.Review).filter_by(approved=approved).order_by(models.Review.created_at.desc()).all()
+def list_reviews(
+	response: Response,
+	approved: bool = Query(False),
+	limit: int = Query(100, ge=1, le=1000),
+	cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+	db: Session = Depends(get_db),
+):
+	q = db.query(models.Review).filter_by(approved=approved)
+	try:
+		rows, next_cursor = pagination.keyset_page(q, models.Review.created_at, models.Review.id, cursor, limit)
+	except ValueError as e:
+		raise HTTPException(status_code=400, detail=str(e))
+	if next_cursor:
+		response.headers["X-Next-Cursor"] = next_cursor
+	return rows
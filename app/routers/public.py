@@ -1,12 +1,19 @@
 
-import math
+import hashlib
+from email.utils import format_datetime, parsedate_to_datetime
 from typing import Optional, List
-from datetime import date, datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from datetime import date, datetime, timedelta, timezone
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session, aliased
-from sqlalchemy import func, text, distinct
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import func, text, distinct, literal_column, or_, select
+from app.config import AREA_NEIGHBOR_MAX_KM
 from app.db import SessionLocal
-from app import models, schemas
+from app import availability, events, geo, idempotency, metrics, models, pagination, pricing, ranking, ratings, schemas, search_index
+from app.geo import haversine_km
+from app.responses import model_response
+from app import health as health_stats
 from app.schemas import NannyReviewsResponse, SetParentAreaRequest, SetParentDefaultLocationRequest, ParentLocationResponse, NannyLocationResponse, ReviewOut, ReviewCreate, SetNannyAreasRequest, CreateNannyProfileRequest, UpdateNannyProfileRequest, BulkBookingRequest, SearchNanniesResponse
 from app.utils.email import send_email, get_admin_emails
 
@@ -41,17 +48,6 @@ def get_db():
         db.close()
 
 
-def haversine_km(lat1, lon1, lat2, lon2):
-    R = 6371.0
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-
-    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-    return R * c
-
 
 def _fmt_booking_lines(b):
     return "\n".join(
@@ -137,67 +133,155 @@ def list_languages(db: Session = Depends(get_db)):
     return [{"id": r.id, "name": r.name} for r in rows]
 
 
-@router.get("/health")
-def health(request: Request, db: Session = Depends(get_db)):
-    # auth enabled if any route starts with /auth
-    auth_enabled = any(getattr(r, "path", "").startswith("/auth") for r in request.app.routes)
+@router.get("/areas/nearest")
+def list_nearest_areas(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    k: int = Query(3, ge=1, le=20),
+    max_km: Optional[float] = Query(None, gt=0),
+    db: Session = Depends(get_db),
+):
+    return geo.nearest_areas(db, lat, lng, k, max_km)
+
+
+def _resolve_parent_area(db: Session, parent, lat: float, lng: float, assign: bool) -> Optional[int]:
+    """
+    Give a parent without an area the one nearest to (lat, lng), or any parent when assign is set.
+    Returns the nearest area when it differs from the parent's (kept) area, as a suggestion.
+    """
+    nearest = geo.nearest_area_id(db, lat, lng)
+    if nearest is None:
+        if parent.area_id is None:
+            raise HTTPException(status_code=400, detail="No areas configured")
+        return None
+    if parent.area_id is None or assign:
+        parent.area_id = nearest
+    return nearest if nearest != parent.area_id else None
+
+
+def _auth_enabled(app) -> bool:
+    # routes don't change after startup, so scan them once
+    enabled = getattr(app.state, "auth_enabled", None)
+    if enabled is None:
+        enabled = any(getattr(r, "path", "").startswith("/auth") for r in app.routes)
+        app.state.auth_enabled = enabled
+    return enabled
+
 
-    # db ping
-    db_ok = True
+def _db_ping(db: Session) -> bool:
     try:
         db.execute(text("SELECT 1"))
+        return True
     except Exception:
-        db_ok = False
+        return False
 
-    # basic counts
-    counts = {
-        "users": db.query(models.User).count(),
-        "nannies": db.query(models.NannyProfile).count(),
-        "reviews": db.query(models.Review).count(),
-    }
 
+@router.get("/health")
+def health(request: Request, db: Session = Depends(get_db)):
+    db_ok = _db_ping(db)
     return {
         "ok": bool(db_ok),
-        "auth_enabled": auth_enabled,
+        "auth_enabled": _auth_enabled(request.app),
         "db_ok": db_ok,
-        "counts": counts,
+        "counts": health_stats.snapshot.get()["counts"],
     }
 
 
+@router.get("/health/live")
+def health_live():
+    # liveness only: no database access
+    return {"ok": True}
+
+
+@router.get("/health/ready")
+def health_ready(response: Response, db: Session = Depends(get_db)):
+    db_ok = _db_ping(db)
+    if not db_ok:
+        response.status_code = 503
+    return {"ok": db_ok, "db_ok": db_ok, **health_stats.snapshot.get()}
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
+
 # ...existing code...
 
 from datetime import datetime, timedelta
 
 @router.get("/nannies/{nanny_id}/reviews", response_model=NannyReviewsResponse)
-def get_nanny_reviews(nanny_id: int, db: Session = Depends(get_db)):
-    nanny = db.query(models.Nanny).filter(models.Nanny.id == nanny_id).first()
+def get_nanny_reviews(
+    nanny_id: int,
+    request: Request,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    db: Session = Depends(get_db),
+):
+    """
+    Approved reviews of the last 12 months, newest first, one keyset page at a time.
+    The average and count come from the maintained rating aggregate. The review window
+    moves once a day, so a page only changes at midnight UTC or when a moderation write
+    refreshes the aggregate; that instant is Last-Modified, and conditional requests
+    for an unchanged page get 304.
+    """
+    nanny = db.query(models.Nanny.id).filter(models.Nanny.id == nanny_id).first()
     if not nanny:
         raise HTTPException(status_code=404, detail="Nanny not found")
 
-    window_start = datetime.utcnow() - timedelta(days=365)
-    reviews_query = (
-        db.query(models.Review)
-        .filter(
-            models.Review.nanny_id == nanny_id,
-            models.Review.approved == True,
-            models.Review.created_at >= window_start
-        )
-        .order_by(models.Review.created_at.desc())
-    )
-    reviews = reviews_query.all()
+    avg, count, refreshed_at = ratings.get_versioned(db, nanny_id)
+    today = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    last_modified = max(today, refreshed_at or today).replace(microsecond=0)
+    headers = {
+        "Last-Modified": format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True),
+        "Cache-Control": "no-cache",
+    }
+    if "if-none-match" not in request.headers and _not_modified_since(request, last_modified):
+        return Response(status_code=304, headers=headers)
 
-    review_count_12m = len(reviews)
-    if review_count_12m == 0:
-        average_rating_12m = None
-    else:
-        average_rating_12m = float(sum(r.stars for r in reviews) / review_count_12m)
+    q = db.query(models.Review).filter(
+        models.Review.nanny_id == nanny_id,
+        models.Review.approved == True,
+        models.Review.created_at >= ratings.window_start(),
+    )
+    try:
+        rows, next_cursor = pagination.keyset_page(q, models.Review.created_at, models.Review.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
 
-    return {
+    response = model_response(NannyReviewsResponse, {
         "nanny_id": nanny_id,
-        "average_rating_12m": average_rating_12m,
-        "review_count_12m": review_count_12m,
-        "reviews": [ReviewOut.model_validate(r, from_attributes=True) for r in reviews],
-    }
+        "average_rating_12m": avg,
+        "review_count_12m": count,
+        "reviews": [ReviewOut.model_validate(r, from_attributes=True) for r in rows],
+    }, headers=headers)
+    etag = '"%s"' % hashlib.sha1(response.body).hexdigest()
+    response.headers["ETag"] = etag
+    if etag in _etags(request.headers.get("if-none-match")):
+        headers["ETag"] = etag
+        return Response(status_code=304, headers=headers)
+    return response
+
+
+def _etags(header: Optional[str]) -> List[str]:
+    if not header:
+        return []
+    return [t.strip().removeprefix("W/") for t in header.split(",")]
+
+
+def _not_modified_since(request: Request, last_modified: datetime) -> bool:
+    since = request.headers.get("if-modified-since")
+    if not since:
+        return False
+    try:
+        since_dt = parsedate_to_datetime(since)
+    except (TypeError, ValueError):
+        return False
+    if since_dt.tzinfo is not None:
+        since_dt = since_dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return last_modified <= since_dt
 
 def compute_age(dob: Optional[date]) -> Optional[int]:
     if dob is None:
@@ -212,13 +296,19 @@ def compute_age(dob: Optional[date]) -> Optional[int]:
 @router.get("/nannies/search", response_model=SearchNanniesResponse)
 def search_nannies(
     parent_user_id: int,
-    max_distance_km: Optional[float] = Query(default=None),
+    max_distance_km: Optional[float] = Query(default=None, description=f"Areas farther than {AREA_NEIGHBOR_MAX_KM:g} km are not searched"),
     min_rating: Optional[float] = Query(default=None),
     tag_ids: Optional[List[int]] = Query(default=None),
     qualification_ids: Optional[List[int]] = Query(default=None),
     language_ids: Optional[List[int]] = Query(default=None),
+    q: Optional[str] = Query(default=None, max_length=200, description="Words or \"phrases\" to find in name, nickname and bio"),
+    limit: Optional[int] = Query(default=None, ge=1, le=500, description="Page size; every match when omitted"),
+    offset: int = Query(default=0, ge=0),
+    ranker: Optional[str] = Query(default=None, description="Override the deployment's ranker (see app.ranking.RANKERS)"),
     db: Session = Depends(get_db),
 ):
+    if ranker is not None and ranker not in ranking.RANKERS:
+        raise HTTPException(status_code=400, detail=f"Unknown ranker, expected one of: {', '.join(sorted(ranking.RANKERS))}")
 
     parent = (
         db.query(models.ParentProfile)
@@ -235,144 +325,84 @@ def search_nannies(
             "message": "Set your default location first",
         }
 
-    parent_area_id = parent.area_id
-    parent_lat = getattr(parent, "lat", None)
-    parent_lng = getattr(parent, "lng", None)
-
-    q = (
-        db.query(models.NannyProfile)
-        .join(models.NannyArea, models.NannyArea.nanny_id == models.NannyProfile.nanny_id)
-        .filter(models.NannyArea.area_id == parent_area_id)
-    )
-
-    if qualification_ids:
-        q = (
-            q.join(models.nanny_profile_qualifications)
-             .filter(models.nanny_profile_qualifications.c.qualification_id.in_(qualification_ids))
-             .group_by(models.NannyProfile.id)
-             .having(
-                 func.count(distinct(models.nanny_profile_qualifications.c.qualification_id))
-                 == len(set(qualification_ids))
-             )
+    area_filter = models.NannySearchArea.area_id == parent.area_id
+    if max_distance_km is not None:
+        # widen to every area that may hold a nanny within max_distance_km of the parent,
+        # as far as the precomputed pairs reach
+        reach_km = min(max_distance_km, AREA_NEIGHBOR_MAX_KM)
+        nearby = select(models.AreaNeighbor.neighbor_id).where(
+            models.AreaNeighbor.area_id == parent.area_id,
+            models.AreaNeighbor.distance_km <= geo.neighbor_cutoff_km(reach_km),
         )
-
-    if tag_ids:
-        q = (
-            q.join(models.nanny_profile_tags)
-             .filter(models.nanny_profile_tags.c.tag_id.in_(tag_ids))
-             .group_by(models.NannyProfile.id)
-             .having(
-                 func.count(distinct(models.nanny_profile_tags.c.tag_id))
-                 == len(set(tag_ids))
-             )
-        )
-
-    if language_ids:
-        q = (
-            q.join(models.nanny_profile_languages)
-             .filter(models.nanny_profile_languages.c.language_id.in_(language_ids))
-             .group_by(models.NannyProfile.id)
-             .having(
-                 func.count(distinct(models.nanny_profile_languages.c.language_id))
-                 == len(set(language_ids))
-             )
-        )
-
-    profiles = q.all()
-
-    def simple_list(items):
-        return [{"id": x.id, "name": x.name} for x in (items or [])]
-
-    results = []
-    for p in profiles:
-        nanny = db.query(models.Nanny).filter(models.Nanny.id == p.nanny_id).first()
-        if not nanny:
-            continue
-        nanny_user = db.query(models.User).filter(models.User.id == nanny.user_id).first()
-        if not nanny_user:
-            continue
-
-        avg, cnt = get_rating_12m_for_nanny(db, p.nanny_id)
+        area_filter = or_(area_filter, models.NannySearchArea.area_id.in_(nearby))
+    # one semi-join, so a nanny registered in several candidate areas appears once
+    candidate_ids = select(models.NannySearchArea.nanny_id).where(area_filter)
+    # reviews age out of the 12-month window without a write; bring those figures up to date
+    ratings.refresh_stale(db, candidate_ids)
+    doc = models.NannySearchDocument
+    stats = models.NannyRatingStats
+    matches = search_index.match(db, q) if q else None
+    if matches is not None:
+        query = db.query(doc, matches.c.score, stats.last_review_at).join(matches, matches.c.nanny_id == doc.nanny_id)
+    else:
+        query = db.query(doc, literal_column("0.0"), stats.last_review_at)
+    query = query.outerjoin(stats, stats.nanny_id == doc.nanny_id)
+    query = query.filter(doc.nanny_id.in_(candidate_ids))
+    for column, ids in (
+        (doc.qualification_ids, qualification_ids),
+        (doc.tag_ids, tag_ids),
+        (doc.language_ids, language_ids),
+    ):
+        for id_ in set(ids or ()):
+            query = query.filter(search_index.has_id(column, id_))
+    if min_rating is not None:
+        query = query.filter(doc.average_rating_12m >= min_rating)
+
+    candidates = []
+    for d, score, last_review_at in query.all():
         distance_km = None
-        if parent.lat is not None and parent.lng is not None and p.lat is not None and p.lng is not None:
-            distance_km = round(haversine_km(parent.lat, parent.lng, p.lat, p.lng), 2)
-
-        if min_rating is not None:
-            if avg is None or avg < min_rating:
-                continue
-
+        if d.lat is not None and d.lng is not None:
+            distance_km = round(haversine_km(parent.lat, parent.lng, d.lat, d.lng), 2)
         if max_distance_km is not None:
             if distance_km is None or distance_km > max_distance_km:
                 continue
-
-        results.append(
-            {
-                "nanny_id": p.nanny_id,
-                "approved": nanny.approved,
-                "user_id": nanny_user.id,
-                "name": nanny_user.name,
-                "nickname": getattr(nanny_user, "nickname", None),
-                "last_initial": getattr(nanny_user, "last_initial", None),
-                "profile_photo_url": getattr(nanny_user, "profile_photo_url", None),
-                "bio": getattr(p, "bio", None),
-                "date_of_birth": getattr(p, "date_of_birth", None),
-                "age": compute_age(getattr(p, "date_of_birth", None)),
-                "nationality": getattr(p, "nationality", None),
-                "ethnicity": getattr(p, "ethnicity", None),
-                "qualifications": simple_list(getattr(p, "qualifications", None)),
-                "tags": simple_list(getattr(p, "tags", None)),
-                "languages": simple_list(getattr(p, "languages", None)),
-                "average_rating_12m": avg,
-                "review_count_12m": cnt or 0,
-                "distance_km": distance_km,
-            }
-        )
-
-    def sort_key(x: dict):
-        dist = x.get("distance_km")
-        rating = x.get("average_rating_12m")
-        rc = x.get("review_count_12m")
-
-        # distance: nulls last
-        dist_is_null = dist is None
-        dist_val = dist if dist is not None else 10**9
-
-        # rating: nulls last, higher first
-        rating_is_null = rating is None
-        rating_val = rating if rating is not None else -1
-
-        # review_count: higher first, null treated as 0
-        rc_val = rc if rc is not None else 0
-
-        return (
-            dist_is_null,
-            dist_val,
-            rating_is_null,
-            -rating_val,
-            -rc_val,
-            x.get("nanny_id", 0),
-        )
-
-    results.sort(key=sort_key)
-
-    return {"results": results, "code": None, "message": None}
+        result = search_index.as_result(d)
+        result["distance_km"] = distance_km
+        candidates.append(ranking.Candidate(
+            d.nanny_id, distance_km, d.average_rating_12m, d.review_count_12m or 0,
+            last_review_at, score or 0.0, result,
+        ))
+
+    page = ranking.top_k(ranking.get_ranker(ranker), candidates, limit, offset)
+    results = [c.result for c in page]
+
+    return model_response(
+        SearchNanniesResponse,
+        {"results": results, "code": None, "message": None},
+        headers={"X-Total-Count": str(len(candidates))},
+    )
 
 
 @router.post("/parents/default-location")
-def set_parent_default_location(payload: SetParentDefaultLocationRequest, db: Session = Depends(get_db)):
+def set_parent_default_location(
+    payload: SetParentDefaultLocationRequest,
+    assign_area: bool = Query(False, description="Move the parent to the nearest area even if one is set"),
+    db: Session = Depends(get_db),
+):
     user = db.query(models.User).filter_by(id=payload.user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     existing = db.query(models.ParentProfile).filter_by(user_id=payload.user_id).first()
     if not existing:
         existing = models.ParentProfile(user_id=payload.user_id)
-        db.add(existing)
+    suggested = _resolve_parent_area(db, existing, payload.lat, payload.lng, assign_area)
+    db.add(existing)
     existing.lat = payload.lat
     existing.lng = payload.lng
-    existing.location_confirmed_at = datetime.utcnow().isoformat()
+    existing.location_confirmed_at = datetime.utcnow()
     existing.location_confirm_version = payload.confirm_version
     db.commit()
-    return {"ok": True}
+    return {"ok": True, "area_id": existing.area_id, "suggested_area_id": suggested}
 
 
 @router.get("/parents/location-status")
@@ -388,17 +418,30 @@ def get_parent_location_status(user_id: int, db: Session = Depends(get_db)):
 
 
 @router.patch("/parents/{user_id}/location", response_model=schemas.SetLocationResponse)
-def set_parent_location(user_id: int, payload: schemas.SetLocationRequest, db: Session = Depends(get_db)):
+def set_parent_location(
+    user_id: int,
+    payload: schemas.SetLocationRequest,
+    assign_area: bool = Query(False, description="Move the parent to the nearest area even if one is set"),
+    db: Session = Depends(get_db),
+):
     parent = db.query(models.ParentProfile).filter(models.ParentProfile.user_id == user_id).first()
     if not parent:
-        raise HTTPException(status_code=400, detail="Parent area not set")
-    if parent.area_id is None:
-        raise HTTPException(status_code=400, detail="Parent area not set")
+        if not db.query(models.User.id).filter_by(id=user_id).first():
+            raise HTTPException(status_code=404, detail="User not found")
+        parent = models.ParentProfile(user_id=user_id)
+    suggested = _resolve_parent_area(db, parent, payload.lat, payload.lng, assign_area)
+    db.add(parent)
     parent.lat = payload.lat
     parent.lng = payload.lng
     db.commit()
     db.refresh(parent)
-    return {"user_id": parent.user_id, "lat": parent.lat, "lng": parent.lng}
+    return {
+        "user_id": parent.user_id,
+        "lat": parent.lat,
+        "lng": parent.lng,
+        "area_id": parent.area_id,
+        "suggested_area_id": suggested,
+    }
 
 
 @router.patch("/nannies/{nanny_id}/location", response_model=NannyLocationResponse)
@@ -408,6 +451,7 @@ def set_nanny_location(nanny_id: int, payload: schemas.SetLocationRequest, db: S
         raise HTTPException(status_code=404, detail="Nanny profile not found")
     profile.lat = payload.lat
     profile.lng = payload.lng
+    search_index.refresh(db, [nanny_id])
     db.commit()
     db.refresh(profile)
     return {"nanny_id": profile.nanny_id, "lat": profile.lat, "lng": profile.lng}
@@ -458,6 +502,7 @@ def set_nanny_areas(nanny_id: int, payload: SetNannyAreasRequest, db: Session =
     db.query(models.NannyArea).filter_by(nanny_id=nanny_id).delete()
     for area_id in payload.area_ids:
         db.add(models.NannyArea(nanny_id=nanny_id, area_id=area_id))
+    search_index.refresh(db, [nanny_id])
     db.commit()
     return {"nanny_id": nanny_id, "area_ids": payload.area_ids}
 
@@ -494,6 +539,7 @@ def create_nanny_profile(
         ethnicity=payload.ethnicity.strip() if payload.ethnicity else None,
     )
     db.add(profile)
+    search_index.refresh(db, [nanny_id])
     db.commit()
     db.refresh(profile)
     return {
@@ -540,12 +586,24 @@ def update_nanny_profile(nanny_id: int, payload: UpdateNannyProfileRequest, db:
             .filter(models.Language.id.in_(payload.language_ids))
             .all()
         )
+    search_index.refresh(db, [nanny_id])
     db.commit()
     return {"ok": True, "nanny_id": nanny_id}
 
 
 @router.post("/bookings", response_model=schemas.BookingOut)
-def create_booking(payload: schemas.BookingCreateRequest, db: Session = Depends(get_db)):
+def create_booking(
+    payload: schemas.BookingCreateRequest,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(default=None, description="Replays return the first response instead of booking again"),
+):
+    return idempotency.run(
+        idempotency_key, idempotency.scope("POST /bookings", payload.parent_user_id), payload,
+        lambda: _create_booking(payload, db),
+    )
+
+
+def _create_booking(payload: schemas.BookingCreateRequest, db: Session) -> dict:
     lat = payload.lat
     lng = payload.lng
     location_label = payload.location_label.strip() if payload.location_label is not None else None
@@ -562,12 +620,17 @@ def create_booking(payload: schemas.BookingCreateRequest, db: Session = Depends(
         if lat is None or lng is None:
             raise HTTPException(status_code=400, detail="Current location requires lat and lng")
 
+    cover = availability.coverage(db, payload.nanny_id, [payload])
+    if cover is not None and not cover.covers(payload.starts_at, payload.ends_at):
+        raise HTTPException(status_code=400, detail="Nanny not available for this time window")
+
+    price = pricing.quote(pricing.rate_cards.get(db, payload.nanny_id), [(payload.starts_at, payload.ends_at)])
     booking = models.Booking(
         nanny_id=payload.nanny_id,
         client_user_id=payload.parent_user_id,
         day=payload.starts_at.date(),
         status="pending",
-        price_cents=0,
+        price_cents=price.total_amount_cents,
         starts_at=payload.starts_at,
         ends_at=payload.ends_at,
         lat=lat,
@@ -576,6 +639,8 @@ def create_booking(payload: schemas.BookingCreateRequest, db: Session = Depends(
         location_label=location_label,
     )
     db.add(booking)
+    db.flush()
+    events.record(db, "booking", booking.id, booking.status, events.participants(db, booking.nanny_id, booking.client_user_id))
     db.commit()
     db.refresh(booking)
     notify_booking_created(db, booking)
@@ -591,6 +656,7 @@ def create_booking(payload: schemas.BookingCreateRequest, db: Session = Depends(
         "location_label": booking.location_label,
         "lat": booking.lat,
         "lng": booking.lng,
+        "price_cents": booking.price_cents,
     }
 
 
@@ -639,6 +705,7 @@ def update_booking_status(booking_id: int, payload: schemas.BookingStatusUpdateR
         )
 
     b.status = target.value
+    events.record(db, "booking", b.id, b.status, events.participants(db, b.nanny_id, b.client_user_id))
     db.commit()
     db.refresh(b)
 
@@ -648,6 +715,27 @@ def update_booking_status(booking_id: int, payload: schemas.BookingStatusUpdateR
     }
 
 
+@router.get("/users/{user_id}/booking-events")
+async def stream_booking_events(
+    user_id: int,
+    last_event_id: Optional[int] = Header(default=None, description="Set by EventSource when it reconnects"),
+    since: Optional[int] = Query(default=None, ge=0, description="Resume after this event id, for clients that cannot send Last-Event-ID"),
+):
+    """Server-Sent Events for status changes of this user's bookings and booking requests."""
+    if not await run_in_threadpool(_user_exists, user_id):
+        raise HTTPException(status_code=404, detail="User not found")
+    return StreamingResponse(
+        events.stream(user_id, last_event_id if last_event_id is not None else since),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _user_exists(user_id: int) -> bool:
+    with SessionLocal() as db:
+        return db.query(models.User.id).filter(models.User.id == user_id).first() is not None
+
+
 @router.get("/parents/{user_id}/bookings", response_model=schemas.BookingListResponse)
 def list_parent_bookings(
     user_id: int,
@@ -670,7 +758,7 @@ def list_parent_bookings(
 
     rows = q.order_by(models.Booking.starts_at.desc()).all()
 
-    return {
+    return model_response(schemas.BookingListResponse, {
         "results": [
             {
                 "booking_id": b.id,
@@ -684,7 +772,7 @@ def list_parent_bookings(
             }
             for b in rows
         ]
-    }
+    })
 
 
 @router.get("/nannies/{nanny_id}/bookings", response_model=schemas.BookingListResponse)
@@ -709,7 +797,7 @@ def list_nanny_bookings(
 
     rows = q.order_by(models.Booking.starts_at.desc()).all()
 
-    return {
+    return model_response(schemas.BookingListResponse, {
         "results": [
             {
                 "booking_id": b.id,
@@ -723,10 +811,21 @@ def list_nanny_bookings(
             }
             for b in rows
         ]
-    }
+    })
 
 @router.post("/bookings/bulk")
-def create_bulk_booking_request(payload: BulkBookingRequest, db: Session = Depends(get_db)):
+def create_bulk_booking_request(
+    payload: BulkBookingRequest,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(default=None, description="Replays return the first response instead of booking again"),
+):
+    return idempotency.run(
+        idempotency_key, idempotency.scope("POST /bookings/bulk", payload.parent_user_id), payload,
+        lambda: _create_bulk_booking_request(payload, db),
+    )
+
+
+def _create_bulk_booking_request(payload: BulkBookingRequest, db: Session) -> dict:
     created_slots = []
     errors = []
     req = models.BookingRequest(
@@ -738,10 +837,16 @@ def create_bulk_booking_request(payload: BulkBookingRequest, db: Session = Depen
     )
     db.add(req)
     db.flush()
+    # one load of slots + expanded recurrence rules covers every requested slot;
+    # nannies who never set any availability are not checked
+    cover = availability.coverage(db, payload.nanny_id, payload.slots)
     for i, slot in enumerate(payload.slots):
         if slot.ends_at <= slot.starts_at:
             errors.append({"index": i, "error": "ends_at must be after starts_at"})
             continue
+        if cover is not None and not cover.covers(slot.starts_at, slot.ends_at):
+            errors.append({"index": i, "error": "nanny not available for this time window"})
+            continue
         existing = (
             db.query(models.BookingRequestSlot)
             .join(models.BookingRequest)
@@ -765,8 +870,16 @@ def create_bulk_booking_request(payload: BulkBookingRequest, db: Session = Depen
         db.flush()
         created_slots.append({"id": s.id, "starts_at": s.starts_at, "ends_at": s.ends_at})
     req.status = "approved" if created_slots else "declined"
+    price = None
     if created_slots:
         req.payment_status = "paid"
+        # every accepted slot priced together against one cached rate card lookup
+        price = pricing.quote(
+            pricing.rate_cards.get(db, payload.nanny_id),
+            [(s["starts_at"], s["ends_at"]) for s in created_slots],
+        )
+        pricing.write_snapshots(db, [(req.id, price)])
+    events.record(db, "booking_request", req.id, req.status, events.participants(db, req.nanny_id, req.parent_user_id))
     db.commit()
     return {
         "booking_request_id": req.id,
@@ -774,4 +887,5 @@ def create_bulk_booking_request(payload: BulkBookingRequest, db: Session = Depen
         "payment_status": getattr(req, "payment_status", None),
         "created_slots": created_slots,
         "errors": errors,
+        "pricing": price._asdict() if price else None,
     }
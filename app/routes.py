@@ -3,7 +3,9 @@ from fastapi import APIRouter
 
 from app.routers.public import router as public_router
 from app.routers.admin import router as admin_router
+from app.routes_admin import router as admin_users_router
 
 router = APIRouter()
 router.include_router(public_router)
-router.include_router(admin_router)
\ No newline at end of file
+router.include_router(admin_router)
+router.include_router(admin_users_router)
\ No newline at end of file
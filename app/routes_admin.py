@@ -1,62 +1,276 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from app.db import SessionLocal
 from app.deps import get_db, require_admin, compute_age
-from app import models
+from app import archive, audit, models, pagination, search_index
 from app.schemas import AdminUpdateUserRequest, AdminUpdateParentRequest, AdminUpdateNannyRequest, AdminUpdateNannyProfileRequest
 
 router = APIRouter()
 
+LIST_MAX_LIMIT = 500
+COUNT_CACHE_TTL = 30.0
+COUNT_CACHE_SIZE = 256
+
+# (filters key) -> (monotonic time, count); exact counts are reused briefly,
+# and only for the most recently used filter combinations
+_count_cache: "OrderedDict[tuple, Tuple[float, int]]" = OrderedDict()
+_count_lock = threading.Lock()
+
+
+def _exact_count(db: Session, key: tuple, query) -> int:
+    now = time.monotonic()
+    with _count_lock:
+        hit = _count_cache.get(key)
+        if hit and now - hit[0] < COUNT_CACHE_TTL:
+            _count_cache.move_to_end(key)
+            return hit[1]
+    total = query.order_by(None).count()
+    with _count_lock:
+        _count_cache[key] = (now, total)
+        _count_cache.move_to_end(key)
+        while len(_count_cache) > COUNT_CACHE_SIZE:
+            _count_cache.popitem(last=False)
+    return total
+
+
+def _projection(columns: Dict[str, tuple], fields: Optional[str]) -> List[str]:
+    if not fields:
+        return list(columns)
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in columns]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return wanted
+
+
+def _page(db, response, query, key_columns, sort_column, order, limit, offset, total, count_key, count_query):
+    """Apply sort/offset/limit, set paging headers, return the rows of this page."""
+    direction = sort_column.desc() if order == "desc" else sort_column.asc()
+    tiebreak = [c.desc() if order == "desc" else c.asc() for c in key_columns]
+    rows = query.order_by(direction, *tiebreak).offset(offset).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    response.headers["X-Has-More"] = "true" if has_more else "false"
+    if total == "exact":
+        response.headers["X-Total-Count"] = str(_exact_count(db, count_key, count_query))
+    return rows
+
+
+# field -> columns it needs; "area" is a nested object built from two columns
+PARENT_COLUMNS = {
+    "user_id": (models.User.id,),
+    "name": (models.User.name,),
+    "email": (models.User.email,),
+    "phone": (models.User.phone,),
+    "area_id": (models.ParentProfile.area_id,),
+    "area": (models.Area.id, models.Area.name),
+}
+PARENT_SORTS = {"user_id": models.User.id, "name": models.User.name, "email": models.User.email}
+
 @router.get("/admin/parents")
-def admin_list_parents(db: Session = Depends(get_db), _: None = Depends(require_admin)):
-    rows = (
-        db.query(models.User, models.ParentProfile, models.Area)
-        .outerjoin(models.ParentProfile, models.ParentProfile.user_id == models.User.id)
-        .outerjoin(models.Area, models.Area.id == models.ParentProfile.area_id)
-        .filter(models.User.role == "parent")
-        .all()
+def admin_list_parents(
+    response: Response,
+    limit: int = Query(50, ge=1, le=LIST_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    sort: Literal["user_id", "name", "email"] = "user_id",
+    order: Literal["asc", "desc"] = "asc",
+    role: str = "parent",
+    area_id: Optional[int] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return"),
+    total: Literal["none", "exact"] = Query("none", description="exact adds X-Total-Count (briefly cached)"),
+    db: Session = Depends(get_db),
+    _: None = Depends(require_admin),
+):
+    selected = _projection(PARENT_COLUMNS, fields)
+    columns = [c for f in selected for c in PARENT_COLUMNS[f]]
+    needs_area = "area" in selected
+    needs_parent = needs_area or "area_id" in selected or area_id is not None
+
+    def filtered(q):
+        if needs_parent:
+            q = q.outerjoin(models.ParentProfile, models.ParentProfile.user_id == models.User.id)
+        if needs_area:
+            q = q.outerjoin(models.Area, models.Area.id == models.ParentProfile.area_id)
+        q = q.filter(models.User.role == role)
+        if area_id is not None:
+            q = q.filter(models.ParentProfile.area_id == area_id)
+        return q
+
+    rows = _page(
+        db, response, filtered(db.query(*columns).select_from(models.User)), [models.User.id], PARENT_SORTS[sort], order,
+        limit, offset, total, ("parents", role, area_id), filtered(db.query(models.User.id)),
     )
     out = []
-    for user, parent, area in rows:
-        out.append({
-            "user_id": user.id,
-            "name": user.name,
-            "email": user.email,
-            "phone": user.phone,
-            "area_id": parent.area_id if parent else None,
-            "area": {"id": area.id, "name": area.name} if area else None,
-        })
+    for row in rows:
+        values = iter(row)
+        item = {}
+        for f in selected:
+            if f == "area":
+                aid, aname = next(values), next(values)
+                item["area"] = {"id": aid, "name": aname} if aid is not None else None
+            else:
+                item[f] = next(values)
+        out.append(item)
     return out
 
+NANNY_COLUMNS = {
+    "nanny_id": models.Nanny.id,
+    "approved": models.Nanny.approved,
+    "user_id": models.User.id,
+    "name": models.User.name,
+    "email": models.User.email,
+    "phone": models.User.phone,
+    "nickname": models.User.nickname,
+    "last_initial": models.User.last_initial,
+    "profile_photo_url": models.User.profile_photo_url,
+    "bio": models.NannyProfile.bio,
+    "date_of_birth": models.NannyProfile.date_of_birth,
+    "age": models.NannyProfile.date_of_birth,
+    "nationality": models.NannyProfile.nationality,
+    "ethnicity": models.NannyProfile.ethnicity,
+}
+NANNY_SORTS = {
+    "nanny_id": models.Nanny.id,
+    "name": models.User.name,
+    "email": models.User.email,
+    "approved": models.Nanny.approved,
+    "date_of_birth": models.NannyProfile.date_of_birth,
+}
+
 @router.get("/admin/nannies")
-def admin_list_nannies(db: Session = Depends(get_db), _: None = Depends(require_admin)):
-    rows = (
-        db.query(models.Nanny, models.User, models.NannyProfile)
-        .join(models.User, models.User.id == models.Nanny.user_id)
-        .outerjoin(models.NannyProfile, models.NannyProfile.nanny_id == models.Nanny.id)
-        .all()
+def admin_list_nannies(
+    response: Response,
+    limit: int = Query(50, ge=1, le=LIST_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    sort: Literal["nanny_id", "name", "email", "approved", "date_of_birth"] = "nanny_id",
+    order: Literal["asc", "desc"] = "asc",
+    approved: Optional[bool] = None,
+    area_id: Optional[int] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated subset of fields to return"),
+    total: Literal["none", "exact"] = Query("none", description="exact adds X-Total-Count (briefly cached)"),
+    db: Session = Depends(get_db),
+    _: None = Depends(require_admin),
+):
+    selected = _projection({k: (v,) for k, v in NANNY_COLUMNS.items()}, fields)
+    needs_user = sort in ("name", "email") or any(NANNY_COLUMNS[f].class_ is models.User for f in selected)
+    needs_profile = sort == "date_of_birth" or any(NANNY_COLUMNS[f].class_ is models.NannyProfile for f in selected)
+
+    def filtered(q, with_joins=True):
+        if with_joins and needs_user:
+            q = q.join(models.User, models.User.id == models.Nanny.user_id)
+        if with_joins and needs_profile:
+            q = q.outerjoin(models.NannyProfile, models.NannyProfile.nanny_id == models.Nanny.id)
+        if approved is not None:
+            q = q.filter(models.Nanny.approved == approved)
+        if area_id is not None:
+            q = q.filter(
+                db.query(models.NannyArea.id)
+                .filter(models.NannyArea.nanny_id == models.Nanny.id, models.NannyArea.area_id == area_id)
+                .exists()
+            )
+        return q
+
+    # dedupe columns: "age" reuses date_of_birth
+    columns = list(dict.fromkeys(NANNY_COLUMNS[f] for f in selected))
+    rows = _page(
+        db, response, filtered(db.query(*columns).select_from(models.Nanny)), [models.Nanny.id],
+        NANNY_SORTS[sort], order, limit, offset, total, ("nannies", approved, area_id),
+        filtered(db.query(models.Nanny.id), with_joins=False),
     )
+    index = {c: i for i, c in enumerate(columns)}
     out = []
-    for nanny, user, profile in rows:
-        out.append({
-            "nanny_id": nanny.id,
-            "approved": nanny.approved,
-            "user_id": user.id,
-            "name": user.name,
-            "email": user.email,
-            "phone": user.phone,
-            "nickname": user.nickname,
-            "last_initial": user.last_initial,
-            "profile_photo_url": user.profile_photo_url,
-            "bio": getattr(profile, "bio", None),
-            "date_of_birth": getattr(profile, "date_of_birth", None),
-            "age": compute_age(getattr(profile, "date_of_birth", None)),
-            "nationality": getattr(profile, "nationality", None),
-            "ethnicity": getattr(profile, "ethnicity", None),
-        })
+    for row in rows:
+        item = {}
+        for f in selected:
+            value = row[index[NANNY_COLUMNS[f]]]
+            item[f] = compute_age(value) if f == "age" else value
+        out.append(item)
     return out
 
+EXPORT_BATCH = 1000
+
+# dataset -> (ordered (field, column) pairs, function adding the joins those columns need)
+EXPORTS = {
+    "nannies": (
+        [(f, c) for f, c in NANNY_COLUMNS.items() if f != "age"],
+        lambda q: q.select_from(models.Nanny)
+        .join(models.User, models.User.id == models.Nanny.user_id)
+        .outerjoin(models.NannyProfile, models.NannyProfile.nanny_id == models.Nanny.id)
+        .order_by(models.Nanny.id),
+    ),
+    "parents": (
+        [("user_id", models.User.id), ("name", models.User.name), ("email", models.User.email),
+         ("phone", models.User.phone), ("area_id", models.ParentProfile.area_id), ("area_name", models.Area.name)],
+        lambda q: q.select_from(models.User)
+        .outerjoin(models.ParentProfile, models.ParentProfile.user_id == models.User.id)
+        .outerjoin(models.Area, models.Area.id == models.ParentProfile.area_id)
+        .where(models.User.role == "parent")
+        .order_by(models.User.id),
+    ),
+    "bookings": (
+        [(c.name, c) for c in models.Booking.__table__.columns],
+        lambda q: q.order_by(models.Booking.id),
+    ),
+    "reviews": (
+        [(c.name, c) for c in models.Review.__table__.columns],
+        lambda q: q.order_by(models.Review.id),
+    ),
+}
+
+
+def _export_chunks(dataset: str, fmt: str):
+    """Yield encoded chunks, one per fetched batch, so memory stays flat."""
+    pairs, build = EXPORTS[dataset]
+    fields = [f for f, _ in pairs]
+    stmt = build(select(*[c for _, c in pairs])).execution_options(yield_per=EXPORT_BATCH)
+    # The request's get_db session is closed before the body streams, so use our own.
+    with SessionLocal() as db:
+        result = db.execute(stmt)
+        buf = io.StringIO()
+        writer = csv.writer(buf) if fmt == "csv" else None
+        if writer:
+            writer.writerow(fields)
+        for batch in result.partitions():
+            for row in batch:
+                if writer:
+                    writer.writerow(["" if v is None else v for v in row])
+                else:
+                    buf.write(json.dumps(dict(zip(fields, row)), default=str))
+                    buf.write("\n")
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+        tail = buf.getvalue()
+        if tail:
+            yield tail.encode("utf-8")
+
+
+@router.get("/admin/export/{dataset}")
+def admin_export(
+    dataset: Literal["nannies", "parents", "bookings", "reviews"],
+    format: Literal["csv", "ndjson"] = "csv",
+    _: None = Depends(require_admin),
+):
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_chunks(dataset, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+    )
+
 @router.put("/admin/users/{user_id}")
-def admin_update_user(user_id: int, payload: AdminUpdateUserRequest, db: Session = Depends(get_db), _: None = Depends(require_admin)):
+def admin_update_user(user_id: int, payload: AdminUpdateUserRequest, db: Session = Depends(get_db), actor: int | None = Depends(require_admin)):
     user = db.query(models.User).filter_by(id=user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -85,12 +299,14 @@ def admin_update_user(user_id: int, payload: AdminUpdateUserRequest, db: Session
         user.last_initial = li
     if payload.profile_photo_url is not None:
         user.profile_photo_url = payload.profile_photo_url.strip() if payload.profile_photo_url else None
+    search_index.refresh_users(db, [user.id])
     db.commit()
     db.refresh(user)
+    audit.record(actor, "update_user", "User", user.id, payload.model_dump(exclude_none=True))
     return {"ok": True, "user_id": user.id}
 
 @router.put("/admin/parents/{user_id}")
-def admin_update_parent(user_id: int, payload: AdminUpdateParentRequest, db: Session = Depends(get_db), _: None = Depends(require_admin)):
+def admin_update_parent(user_id: int, payload: AdminUpdateParentRequest, db: Session = Depends(get_db), actor: int | None = Depends(require_admin)):
     parent = db.query(models.ParentProfile).filter_by(user_id=user_id).first()
     if not parent:
         parent = models.ParentProfile(user_id=user_id)
@@ -100,20 +316,23 @@ def admin_update_parent(user_id: int, payload: AdminUpdateParentRequest, db: Ses
     if payload.area_id is not None:
         parent.area_id = payload.area_id
     db.commit()
+    audit.record(actor, "update_parent", "ParentProfile", user_id, payload.model_dump(exclude_none=True))
     return {"ok": True, "user_id": user_id}
 
 @router.put("/admin/nannies/{nanny_id}")
-def admin_update_nanny(nanny_id: int, payload: AdminUpdateNannyRequest, db: Session = Depends(get_db), _: None = Depends(require_admin)):
+def admin_update_nanny(nanny_id: int, payload: AdminUpdateNannyRequest, db: Session = Depends(get_db), actor: int | None = Depends(require_admin)):
     nanny = db.query(models.Nanny).filter_by(id=nanny_id).first()
     if not nanny:
         raise HTTPException(status_code=404, detail="Nanny not found")
     if payload.approved is not None:
         nanny.approved = payload.approved
+    search_index.refresh(db, [nanny_id])
     db.commit()
+    audit.record(actor, "update_nanny", "Nanny", nanny_id, payload.model_dump(exclude_none=True))
     return {"ok": True, "nanny_id": nanny_id}
 
 @router.put("/admin/nanny-profiles/{nanny_id}")
-def admin_update_nanny_profile(nanny_id: int, payload: AdminUpdateNannyProfileRequest, db: Session = Depends(get_db), _: None = Depends(require_admin)):
+def admin_update_nanny_profile(nanny_id: int, payload: AdminUpdateNannyProfileRequest, db: Session = Depends(get_db), actor: int | None = Depends(require_admin)):
     profile = db.query(models.NannyProfile).filter_by(nanny_id=nanny_id).first()
     if not profile:
         profile = models.NannyProfile(nanny_id=nanny_id)
@@ -146,5 +365,103 @@ def admin_update_nanny_profile(nanny_id: int, payload: AdminUpdateNannyProfileRe
             .filter(models.Language.id.in_(payload.language_ids))
             .all()
         )
+    search_index.refresh(db, [nanny_id])
     db.commit()
+    audit.record(actor, "update_nanny_profile", "NannyProfile", nanny_id, payload.model_dump(exclude_none=True))
     return {"ok": True, "nanny_id": nanny_id}
+
+
+@router.get("/admin/audit-logs")
+def admin_list_audit_logs(
+    response: Response,
+    actor_user_id: Optional[int] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    action: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor from the previous page"),
+    db: Session = Depends(get_db),
+    _: None = Depends(require_admin),
+):
+    # make this admin's own recent changes visible without waiting for the timer
+    audit.buffer.flush()
+    q = db.query(models.AuditLog)
+    if actor_user_id is not None:
+        q = q.filter(models.AuditLog.actor_user_id == actor_user_id)
+    if entity_type is not None:
+        q = q.filter(models.AuditLog.entity_type == entity_type)
+    if entity_id is not None:
+        q = q.filter(models.AuditLog.entity_id == entity_id)
+    if action is not None:
+        q = q.filter(models.AuditLog.action == action)
+    if since is not None:
+        q = q.filter(models.AuditLog.created_at >= since)
+    if until is not None:
+        q = q.filter(models.AuditLog.created_at < until)
+    try:
+        rows, next_cursor = pagination.keyset_page(q, models.AuditLog.created_at, models.AuditLog.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return [
+        {
+            "id": r.id,
+            "actor_user_id": r.actor_user_id,
+            "action": r.action,
+            "entity_type": r.entity_type,
+            "entity_id": r.entity_id,
+            "details": r.details,
+            "created_at": r.created_at,
+        }
+        for r in rows
+    ]
+
+
+# query parameter -> archive column it filters, where the table has it
+ARCHIVE_FILTERS = {
+    "nanny_id": ("nanny_id",),
+    "user_id": ("actor_user_id", "parent_user_id", "client_user_id"),
+    "entity_type": ("entity_type",),
+    "entity_id": ("entity_id",),
+    "booking_request_id": ("booking_request_id",),
+}
+
+@router.get("/admin/archive/{table}")
+def admin_list_archive(
+    table: Literal["audit_logs", "reviews", "booking_requests", "booking_request_slots", "bookings"],
+    response: Response,
+    nanny_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    entity_type: Optional[str] = None,
+    entity_id: Optional[int] = None,
+    booking_request_id: Optional[int] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    before_id: Optional[int] = Query(None, description="X-Next-Cursor from the previous page"),
+    _: None = Depends(require_admin),
+):
+    """Archived history, newest id first."""
+    t = archive.BROWSABLE[table]
+    values = {
+        "nanny_id": nanny_id, "user_id": user_id, "entity_type": entity_type,
+        "entity_id": entity_id, "booking_request_id": booking_request_id,
+    }
+    stmt = select(t)
+    for param, value in values.items():
+        if value is None:
+            continue
+        columns = [t.c[c] for c in ARCHIVE_FILTERS[param] if c in t.c]
+        if not columns:
+            raise HTTPException(status_code=400, detail=f"{param} does not apply to {table}")
+        stmt = stmt.where(columns[0] == value)
+    if before_id is not None:
+        stmt = stmt.where(t.c.id < before_id)
+    stmt = stmt.order_by(t.c.id.desc()).limit(limit + 1)
+    with archive.archive_engine().connect() as conn:
+        rows = [dict(r._mapping) for r in conn.execute(stmt)]
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1]["id"])
+    return rows
@@ -21,8 +21,8 @@ class NannyReviewsResponse(BaseModel):
     reviews: List['ReviewOut']
 
 
-from datetime import datetime, date
-from typing import List, Optional
+from datetime import datetime, date, time
+from typing import List, Literal, Optional
 from pydantic import BaseModel, Field, conint, field_validator
 from enum import Enum
 
@@ -102,6 +102,8 @@ class SetLocationResponse(BaseModel):
     user_id: int
     lat: float
     lng: float
+    area_id: Optional[int] = None
+    suggested_area_id: Optional[int] = None
 
 
 class ParentLocationResponse(BaseModel):
@@ -151,6 +153,7 @@ class BookingOut(BaseModel):
     location_label: Optional[str] = None
     lat: Optional[float] = None
     lng: Optional[float] = None
+    price_cents: Optional[int] = None
 
     class Config:
         from_attributes = True
@@ -192,3 +195,71 @@ class ReviewOut(BaseModel):
         from_attributes = True
 
 
+
+
+class AdminUpdateUserRequest(BaseModel):
+    email: Optional[str] = None
+    name: Optional[str] = None
+    role: Optional[str] = None
+    phone: Optional[str] = None
+    lat: Optional[float] = None
+    lng: Optional[float] = None
+    nickname: Optional[str] = None
+    last_initial: Optional[str] = None
+    profile_photo_url: Optional[str] = None
+
+
+class AdminUpdateParentRequest(BaseModel):
+    area_id: Optional[int] = None
+
+
+class AdminUpdateNannyRequest(BaseModel):
+    approved: Optional[bool] = None
+
+
+class AdminUpdateNannyProfileRequest(BaseModel):
+    bio: Optional[str] = None
+    date_of_birth: Optional[date] = None
+    nationality: Optional[str] = None
+    ethnicity: Optional[str] = None
+    qualification_ids: Optional[List[int]] = None
+    tag_ids: Optional[List[int]] = None
+    language_ids: Optional[List[int]] = None
+
+
+class AvailabilityEntry(BaseModel):
+    nanny_id: int
+    day: date
+    start_time: time = time(0, 0)
+    end_time: time = time(23, 59)
+    is_available: bool = True
+    notes: Optional[str] = None
+
+
+class BulkAvailabilityRequest(BaseModel):
+    entries: List[AvailabilityEntry] = Field(min_length=1, max_length=5000)
+
+
+class AvailabilityRuleCreate(BaseModel):
+    nanny_id: int
+    rrule: str = Field(min_length=1, description='RFC 5545 rule, e.g. "FREQ=WEEKLY;BYDAY=MO,WE,FR"')
+    starts_on: date
+    ends_on: Optional[date] = None
+    start_time: time
+    end_time: time
+    exdates: List[date] = []
+    is_available: bool = True
+    notes: Optional[str] = None
+
+
+class RateCardUpdate(BaseModel):
+    hourly_rate_cents: int = Field(ge=0)
+    currency: Optional[str] = Field(default=None, min_length=3, max_length=3)
+    evening_bps: Optional[int] = Field(default=None, ge=0, description="Evening multiplier in basis points, 10000 = 1x")
+    night_bps: Optional[int] = Field(default=None, ge=0)
+    weekend_bps: Optional[int] = Field(default=None, ge=0)
+
+
+class ReviewModerationRequest(BaseModel):
+    review_ids: List[int] = Field(min_length=1, max_length=5000)
+    action: Literal["approve", "reject"]
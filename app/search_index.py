@@ -0,0 +1,373 @@
+"""
+Denormalized nanny search documents.
+
+    python -m app.search_index rebuild [--chunk-size 1000]
+
+nanny_search_documents holds one row per nanny that has a profile, with the
+user's display fields, the profile, area and facet ids and the rating
+aggregate, so /nannies/search reads a single table narrowed by the
+(area_id, nanny_id) index in nanny_search_areas.
+
+Every write path that changes one of those inputs calls refresh() (or
+refresh_users()) for the affected nannies before committing; app.ratings
+pushes new rating figures through set_ratings(). All functions take either a
+Session or a Connection and leave committing to the caller.
+
+On SQLite, nanny_search_fts is an FTS5 index over the documents' name,
+nickname and bio (rowid = nanny_id), written alongside them. ensure_fts()
+creates and backfills it at startup; match() turns free text from the q=
+search parameter into a ranked candidate subquery. Without FTS5 the same
+parameter falls back to substring matching.
+
+ensure_documents() builds the documents at startup when a database has nanny
+profiles but no documents yet, as after upgrading one that predates them.
+
+Two inputs drift without a write: the stored age and the 12-month rating
+window. Search recomputes age from date_of_birth when it reads a document,
+and refreshes the rating figures of candidates whose stats are older than
+app.ratings.STATS_MAX_AGE (ratings.refresh_stale()) before filtering on them.
+"""
+import argparse
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+from sqlalchemy import and_, bindparam, delete, func, insert, literal_column, or_, select, table, text, update
+from sqlalchemy.orm import Session
+
+from app import models
+from app.deps import compute_age
+
+# document field -> (lookup model, association table, association column)
+FACETS = {
+    "qualifications": (models.Qualification, models.nanny_profile_qualifications, "qualification_id"),
+    "tags": (models.NannyTag, models.nanny_profile_tags, "tag_id"),
+    "languages": (models.Language, models.nanny_profile_languages, "language_id"),
+}
+ID_FIELDS = {
+    "qualifications": "qualification_ids",
+    "tags": "tag_ids",
+    "languages": "language_ids",
+}
+FTS_TABLE = "nanny_search_fts"
+# bm25 column weights: name, nickname, bio
+FTS_WEIGHTS = (4.0, 2.0, 1.0)
+MAX_QUERY_TERMS = 8
+_fts_enabled: Dict[str, bool] = {}
+
+
+def id_list(ids: Iterable[int]) -> str:
+    """",1,4," form of a set of ids; ",4," is contained in it exactly when 4 is a member."""
+    return "," + "".join(f"{i}," for i in sorted(set(ids)))
+
+
+def has_id(column, id_: int):
+    return column.like(f"%,{int(id_)},%")
+
+
+def build(db, nanny_ids: Iterable[int]) -> List[dict]:
+    """Document rows for these nannies, from one query per source table."""
+    ids = list(set(nanny_ids))
+    if not ids:
+        return []
+    nannies = models.Nanny.__table__
+    users = models.User.__table__
+    profiles = models.NannyProfile.__table__
+    stats = models.NannyRatingStats.__table__
+
+    base = db.execute(
+        select(
+            nannies.c.id, nannies.c.approved, users.c.id.label("user_id"), users.c.name,
+            users.c.nickname, users.c.last_initial, users.c.profile_photo_url, profiles.c.id.label("profile_id"),
+            profiles.c.bio, profiles.c.date_of_birth, profiles.c.nationality, profiles.c.ethnicity,
+            profiles.c.lat, profiles.c.lng, stats.c.average_rating_12m, stats.c.review_count_12m,
+        )
+        .select_from(nannies)
+        .join(users, users.c.id == nannies.c.user_id)
+        .join(profiles, profiles.c.nanny_id == nannies.c.id)
+        .outerjoin(stats, stats.c.nanny_id == nannies.c.id)
+        .where(nannies.c.id.in_(ids))
+    ).all()
+    if not base:
+        return []
+
+    areas: Dict[int, List[int]] = defaultdict(list)
+    for nanny_id, area_id in db.execute(
+        select(models.NannyArea.nanny_id, models.NannyArea.area_id).where(models.NannyArea.nanny_id.in_(ids))
+    ):
+        areas[nanny_id].append(area_id)
+
+    profile_ids = [r.profile_id for r in base]
+    facets: Dict[str, Dict[int, List[dict]]] = {}
+    for field, (model, table, column) in FACETS.items():
+        by_profile: Dict[int, List[dict]] = defaultdict(list)
+        for profile_id, id_, name in db.execute(
+            select(table.c.nanny_profile_id, model.id, model.name)
+            .join(model, model.id == table.c[column])
+            .where(table.c.nanny_profile_id.in_(profile_ids))
+            .order_by(model.id)
+        ):
+            by_profile[profile_id].append({"id": id_, "name": name})
+        facets[field] = by_profile
+
+    now = datetime.utcnow()
+    docs = []
+    for r in base:
+        doc = {
+            "nanny_id": r.id,
+            "user_id": r.user_id,
+            "approved": bool(r.approved),
+            "name": r.name,
+            "nickname": r.nickname,
+            "last_initial": r.last_initial,
+            "profile_photo_url": r.profile_photo_url,
+            "bio": r.bio,
+            "date_of_birth": r.date_of_birth,
+            "age": compute_age(r.date_of_birth),
+            "nationality": r.nationality,
+            "ethnicity": r.ethnicity,
+            "lat": r.lat,
+            "lng": r.lng,
+            "area_ids": id_list(areas.get(r.id, ())),
+            "average_rating_12m": r.average_rating_12m,
+            "review_count_12m": r.review_count_12m or 0,
+            "updated_at": now,
+        }
+        for field in FACETS:
+            items = facets[field].get(r.profile_id, [])
+            doc[field] = json.dumps(items)
+            doc[ID_FIELDS[field]] = id_list(i["id"] for i in items)
+        docs.append(doc)
+    return docs
+
+
+def refresh(db, nanny_ids: Iterable[int]) -> int:
+    """Rewrite the documents of these nannies; nannies without a profile lose theirs."""
+    ids = list(set(nanny_ids))
+    if not ids:
+        return 0
+    if isinstance(db, Session):
+        db.flush()  # build() reads through Core, which does not autoflush pending ORM changes
+    docs = build(db, ids)
+    area_table = models.NannySearchArea.__table__
+    doc_table = models.NannySearchDocument.__table__
+    fts = fts_enabled(db)
+    db.execute(delete(area_table).where(area_table.c.nanny_id.in_(ids)))
+    db.execute(delete(doc_table).where(doc_table.c.nanny_id.in_(ids)))
+    if fts:
+        db.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid IN :ids").bindparams(bindparam("ids", expanding=True)), {"ids": ids})
+    if docs:
+        db.execute(insert(doc_table), docs)
+        area_rows = [
+            {"area_id": int(a), "nanny_id": d["nanny_id"]}
+            for d in docs for a in d["area_ids"].strip(",").split(",") if a
+        ]
+        if area_rows:
+            db.execute(insert(area_table), area_rows)
+        if fts:
+            db.execute(
+                text(f"INSERT INTO {FTS_TABLE} (rowid, name, nickname, bio) VALUES (:nanny_id, :name, :nickname, :bio)"),
+                [{k: d[k] for k in ("nanny_id", "name", "nickname", "bio")} for d in docs],
+            )
+    return len(docs)
+
+
+def refresh_users(db, user_ids: Iterable[int]) -> int:
+    """refresh() for the nannies behind these user ids (non-nanny users are ignored)."""
+    ids = list(set(user_ids))
+    if not ids:
+        return 0
+    nanny_ids = db.execute(select(models.Nanny.id).where(models.Nanny.user_id.in_(ids))).scalars().all()
+    return refresh(db, nanny_ids)
+
+
+def set_ratings(db, stats: Dict[int, dict]) -> None:
+    """Copy freshly computed rating figures (app.ratings.compute output) into the documents."""
+    if not stats:
+        return
+    table = models.NannySearchDocument.__table__
+    db.execute(
+        update(table)
+        .where(table.c.nanny_id == bindparam("b_nanny_id"))
+        .values(average_rating_12m=bindparam("b_avg"), review_count_12m=bindparam("b_count")),
+        [
+            {"b_nanny_id": nid, "b_avg": v["average_rating_12m"], "b_count": v["review_count_12m"]}
+            for nid, v in stats.items()
+        ],
+    )
+
+
+def _engine_of(db):
+    bind = db.get_bind() if isinstance(db, Session) else db
+    return getattr(bind, "engine", bind)
+
+
+def fts_enabled(db) -> bool:
+    """Whether the FTS5 table exists in this database (checked once per engine)."""
+    engine = _engine_of(db)
+    key = str(engine.url)
+    if key not in _fts_enabled:
+        if engine.dialect.name != "sqlite":
+            _fts_enabled[key] = False
+        else:
+            found = db.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+            ).first()
+            _fts_enabled[key] = found is not None
+    return _fts_enabled[key]
+
+
+def ensure_fts(engine) -> bool:
+    """Create the FTS5 table if this SQLite build supports it, backfilling it from the documents."""
+    key = str(engine.url)
+    if engine.dialect.name != "sqlite":
+        _fts_enabled[key] = False
+        return False
+    with engine.begin() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": FTS_TABLE}
+        ).first()
+        if exists is None:
+            try:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(name, nickname, bio, tokenize='porter unicode61')"
+                ))
+            except Exception:
+                _fts_enabled[key] = False
+                return False
+            conn.execute(text(
+                f"INSERT INTO {FTS_TABLE} (rowid, name, nickname, bio) "
+                "SELECT nanny_id, name, nickname, bio FROM nanny_search_documents"
+            ))
+    _fts_enabled[key] = True
+    return True
+
+
+def ensure_documents(engine) -> int:
+    """Build the documents at startup when there are none but nanny profiles exist."""
+    with engine.connect() as conn:
+        if conn.execute(select(func.count()).select_from(models.NannySearchDocument.__table__)).scalar():
+            return 0
+        if not conn.execute(select(func.count()).select_from(models.NannyProfile.__table__)).scalar():
+            return 0
+    return rebuild(engine, progress=None)
+
+
+def query_terms(q: str) -> List[str]:
+    """Words and "quoted phrases" of a free-text query, reduced to word characters."""
+    terms = []
+    for phrase, word in re.findall(r'"([^"]*)"|(\w+)', q or ""):
+        words = re.findall(r"\w+", phrase or word)
+        if words:
+            terms.append(" ".join(words))
+    return terms[:MAX_QUERY_TERMS]
+
+
+def match(db, q: str):
+    """Subquery of (nanny_id, score) for documents matching every term, lower score = better.
+
+    Returns None when q has no searchable terms.
+    """
+    terms = query_terms(q)
+    if not terms:
+        return None
+    doc = models.NannySearchDocument.__table__
+    if fts_enabled(db):
+        fts = table(FTS_TABLE)
+        weights = ", ".join(str(w) for w in FTS_WEIGHTS)
+        return (
+            select(
+                literal_column("rowid").label("nanny_id"),
+                literal_column(f"bm25({FTS_TABLE}, {weights})").label("score"),
+            )
+            .select_from(fts)
+            .where(text(f"{FTS_TABLE} MATCH :fts_query").bindparams(
+                fts_query=" ".join('"%s"' % t for t in terms)
+            ))
+            .subquery()
+        )
+    conditions = [
+        or_(*(col.ilike(f"%{t}%") for col in (doc.c.name, doc.c.nickname, doc.c.bio)))
+        for t in terms
+    ]
+    return (
+        select(doc.c.nanny_id.label("nanny_id"), literal_column("0.0").label("score"))
+        .where(and_(*conditions))
+        .subquery()
+    )
+
+
+def as_result(doc) -> dict:
+    """NannySearchResult fields of a stored document (distance_km is added by the caller)."""
+    return {
+        "nanny_id": doc.nanny_id,
+        "approved": doc.approved,
+        "user_id": doc.user_id,
+        "name": doc.name,
+        "nickname": doc.nickname,
+        "last_initial": doc.last_initial,
+        "profile_photo_url": doc.profile_photo_url,
+        "bio": doc.bio,
+        "date_of_birth": doc.date_of_birth,
+        "age": compute_age(doc.date_of_birth),
+        "nationality": doc.nationality,
+        "ethnicity": doc.ethnicity,
+        "qualifications": json.loads(doc.qualifications),
+        "tags": json.loads(doc.tags),
+        "languages": json.loads(doc.languages),
+        "average_rating_12m": doc.average_rating_12m,
+        "review_count_12m": doc.review_count_12m or 0,
+    }
+
+
+def rebuild(engine, chunk_size: int = 1000, progress=sys.stderr) -> int:
+    """Recompute ratings and rewrite every document, one transaction per chunk of nannies."""
+    from app import ratings
+
+    started = time.perf_counter()
+    ensure_fts(engine)
+    with engine.connect() as conn:
+        all_ids = conn.execute(select(models.Nanny.id).order_by(models.Nanny.id)).scalars().all()
+    written = 0
+    for i in range(0, len(all_ids), chunk_size):
+        chunk = all_ids[i:i + chunk_size]
+        with Session(engine) as db:
+            ratings.refresh(db, chunk)
+            written += refresh(db, chunk)
+            db.commit()
+        if progress is not None:
+            progress.write(f"{min(i + chunk_size, len(all_ids))}/{len(all_ids)} nannies  {written} documents\n")
+    # documents of nannies that no longer exist
+    doc_table = models.NannySearchDocument.__table__
+    with engine.begin() as conn:
+        stale = select(models.Nanny.id)
+        conn.execute(delete(models.NannySearchArea.__table__).where(
+            models.NannySearchArea.nanny_id.not_in(stale)
+        ))
+        conn.execute(delete(doc_table).where(doc_table.c.nanny_id.not_in(stale)))
+        if fts_enabled(conn):
+            conn.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid NOT IN (SELECT nanny_id FROM nanny_search_documents)"))
+    if progress is not None:
+        progress.write(f"rebuilt {written} documents in {time.perf_counter() - started:.2f}s\n")
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the nanny search documents.")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    from app.db import Base, engine
+
+    Base.metadata.create_all(bind=engine)
+    rebuild(engine, args.chunk_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Admin credential checks.
+
+Bearer tokens are verified with a full jwt.decode only on first sight; the
+decoded claims are then kept in a bounded LRU keyed by the token's sha256
+digest (the raw token is never stored). An entry lives for at most
+TOKEN_CACHE_TTL seconds and never past the token's own "exp", so an expired
+token is rejected exactly as it would be without the cache. Failed
+verifications are not cached.
+"""
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+from jose import jwt
+
+from app.config import ADMIN_API_KEY, JWT_ALG, JWT_SECRET, TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL
+
+
+def api_key_matches(key: Optional[str]) -> bool:
+    """Constant-time comparison against the configured admin API key."""
+    if not key:
+        return False
+    return hmac.compare_digest(key.encode(), ADMIN_API_KEY.encode())
+
+
+class _TokenCache:
+    """LRU of verified token claims: digest -> (expires_at wall clock, claims)."""
+
+    def __init__(self, size: int = TOKEN_CACHE_SIZE, ttl: float = TOKEN_CACHE_TTL):
+        self.size = size
+        self.ttl = ttl
+        self._data: "OrderedDict[bytes, Tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest: bytes, now: float) -> Optional[dict]:
+        with self._lock:
+            hit = self._data.get(digest)
+            if hit is None:
+                return None
+            if hit[0] <= now:
+                del self._data[digest]
+                return None
+            self._data.move_to_end(digest)
+            return hit[1]
+
+    def put(self, digest: bytes, claims: dict, now: float) -> None:
+        expires_at = now + self.ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        if expires_at <= now or self.size <= 0:
+            return
+        with self._lock:
+            self._data[digest] = (expires_at, claims)
+            self._data.move_to_end(digest)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+token_cache = _TokenCache()
+
+
+def decode_token(token: str) -> dict:
+    """Verified claims for a bearer token; raises jose.JWTError if it is invalid."""
+    digest = hashlib.sha256(token.encode()).digest()
+    now = time.time()
+    claims = token_cache.get(digest, now)
+    if claims is None:
+        claims = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALG])
+        token_cache.put(digest, claims, now)
+    return claims
@@ -0,0 +1,105 @@
+"""
+Per-request SQL instrumentation.
+
+Cursor events on the engine record how many statements a request issued and
+how long they spent in the database. The middleware in app.main exposes the
+totals as a Server-Timing header. When SQL_REPEAT_THRESHOLD is set, the same
+statement shape running more than that many times in one request is logged
+(or raised, with SQL_REPEAT_ACTION=raise) as a likely N+1 pattern.
+"""
+import logging
+import re
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+from sqlalchemy import event
+
+from app import config
+
+logger = logging.getLogger(__name__)
+
+
+class RepeatedQueryError(RuntimeError):
+    """Raised in "raise" mode when one statement shape repeats too often."""
+
+
+class QueryStats:
+    __slots__ = ("count", "duration", "shapes", "flagged")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes: Dict[str, int] = {}
+        self.flagged = set()
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.duration * 1000:.3f};desc="{self.count} queries"'
+
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+_WHITESPACE = re.compile(r"\s+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_LITERAL = re.compile(r"\b\d+\b|'(?:[^']|'')*'")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalise a statement so the same query with different parameters compares equal."""
+    shape = _WHITESPACE.sub(" ", statement).strip()
+    shape = _LITERAL.sub("?", shape)
+    return _IN_LIST.sub("(?)", shape)
+
+
+def begin():
+    """Start collecting for the current request; returns (stats, token)."""
+    stats = QueryStats()
+    return stats, _current.set(stats)
+
+
+def end(token) -> None:
+    _current.reset(token)
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("sql_stats_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["sql_stats_start"].pop()
+    stats = _current.get()
+    if stats is None:
+        return
+    stats.count += 1
+    stats.duration += time.perf_counter() - started
+
+    threshold = config.SQL_REPEAT_THRESHOLD
+    if threshold <= 0:
+        return
+    shape = statement_shape(statement)
+    seen = stats.shapes.get(shape, 0) + 1
+    stats.shapes[shape] = seen
+    if seen > threshold and shape not in stats.flagged:
+        stats.flagged.add(shape)
+        message = f"statement repeated {seen} times in one request (threshold {threshold}): {shape}"
+        if config.SQL_REPEAT_ACTION == "raise":
+            raise RepeatedQueryError(message)
+        logger.warning(message)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("sql_stats_start"):
+        conn.info["sql_stats_start"].pop()
+
+
+def install(engine) -> None:
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
@@ -3,6 +3,8 @@ import smtplib
 from email.message import EmailMessage
 from typing import List, Optional
 
+from app.metrics import EMAIL_SENDS
+
 
 def _env(name: str, default: Optional[str] = None) -> Optional[str]:
     v = os.getenv(name)
@@ -26,6 +28,7 @@ def send_email(to_email: str, subject: str, body: str) -> None:
     from_email = _env("FROM_EMAIL", user)
 
     if not host or not from_email:
+        EMAIL_SENDS.inc("not_configured")
         raise RuntimeError("SMTP_HOST and FROM_EMAIL (or SMTP_USER) must be set")
 
     msg = EmailMessage()
@@ -34,11 +37,16 @@ def send_email(to_email: str, subject: str, body: str) -> None:
     msg["Subject"] = subject
     msg.set_content(body)
 
-    with smtplib.SMTP(host, port, timeout=10) as server:
-        server.ehlo()
-        if _env("SMTP_STARTTLS", "1") == "1":
-            server.starttls()
+    try:
+        with smtplib.SMTP(host, port, timeout=10) as server:
             server.ehlo()
-        if user and password:
-            server.login(user, password)
-        server.send_message(msg)
+            if _env("SMTP_STARTTLS", "1") == "1":
+                server.starttls()
+                server.ehlo()
+            if user and password:
+                server.login(user, password)
+            server.send_message(msg)
+    except Exception:
+        EMAIL_SENDS.inc("failure")
+        raise
+    EMAIL_SENDS.inc("success")
@@ -0,0 +1,14 @@
+"""
+Reproducible load benchmarks.
+
+    python -m benchmarks.run --scale small            # seed, drive endpoints, compare to baseline
+    python -m benchmarks.run --scale small --update-baseline
+    python -m benchmarks.seed --scale large --db /tmp/nanny_bench.db
+    python -m benchmarks.serialization                # response encoding CPU per 1,000 results
+    python -m benchmarks.area_lookup                  # nearest-area lookups over 50,000 areas
+    python -m benchmarks.ranking_eval                 # search rankers scored against hidden relevance
+    python -m benchmarks.sse_idle                     # thousands of idle booking-event streams in one worker
+
+Everything runs in-process against a throwaway SQLite database selected through
+DATABASE_URL, so results depend only on the seed, the scale and the machine.
+"""
@@ -0,0 +1,58 @@
+"""
+Nearest-area lookup cost with a large number of areas.
+
+    python -m benchmarks.area_lookup [--areas 50000] [--lookups 20000]
+
+Builds app.geo.AreaIndex over random areas spread like benchmarks.seed places
+them, checks a sample of answers against a brute-force scan and reports build
+time and microseconds per lookup (half the queries fall inside the covered
+region, half up to a degree outside it).
+"""
+import argparse
+import random
+import time
+
+from app.geo import AreaIndex, haversine_km
+from benchmarks.seed import LAT_RANGE, LNG_RANGE
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--areas", type=int, default=50_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--k", type=int, default=1)
+    parser.add_argument("--check", type=int, default=50, help="answers verified by brute force")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(42)
+    points = [(i, rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for i in range(1, args.areas + 1)]
+    started = time.perf_counter()
+    index = AreaIndex(points)
+    build_s = time.perf_counter() - started
+
+    queries = []
+    for i in range(args.lookups):
+        pad = 0.0 if i % 2 == 0 else 1.0
+        queries.append((
+            rng.uniform(LAT_RANGE[0] - pad, LAT_RANGE[1] + pad),
+            rng.uniform(LNG_RANGE[0] - pad, LNG_RANGE[1] + pad),
+        ))
+
+    for lat, lng in queries[:args.check]:
+        got = [area_id for area_id, _ in index.nearest(lat, lng, args.k)]
+        want = [p[0] for p in sorted(points, key=lambda p: haversine_km(lat, lng, p[1], p[2]))[:args.k]]
+        if got != want:
+            raise SystemExit(f"mismatch at ({lat}, {lng}): {got} != {want}")
+
+    started = time.perf_counter()
+    for lat, lng in queries:
+        index.nearest(lat, lng, args.k)
+    per_lookup_us = (time.perf_counter() - started) / len(queries) * 1e6
+    print(
+        f"areas {args.areas}  build {build_s:.2f}s  lookup {per_lookup_us:.1f} us"
+        f"  (k={args.k}, {args.check} answers verified)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Minimal in-process ASGI client, so the benchmarks need nothing beyond the app's own dependencies."""
+import asyncio
+import json
+import re
+from typing import Optional
+from urllib.parse import urlencode
+
+_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+class Result:
+    __slots__ = ("status", "headers", "body")
+
+    def __init__(self, status: int, headers: dict, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+    @property
+    def queries(self) -> Optional[int]:
+        m = _QUERIES.search(self.headers.get("server-timing", ""))
+        return int(m.group(1)) if m else None
+
+
+class InProcessClient:
+    def __init__(self, app):
+        self.app = app
+        self.loop = asyncio.new_event_loop()
+
+    def close(self):
+        self.loop.close()
+
+    def request(self, method: str, path: str, params=None, json_body=None, headers=None) -> Result:
+        return self.loop.run_until_complete(self._request(method, path, params, json_body, headers or {}))
+
+    def get(self, path, params=None, headers=None) -> Result:
+        return self.request("GET", path, params=params, headers=headers)
+
+    def post(self, path, json_body=None, params=None, headers=None) -> Result:
+        return self.request("POST", path, params=params, json_body=json_body, headers=headers)
+
+    async def _request(self, method, path, params, json_body, headers) -> Result:
+        body = b""
+        raw_headers = [(k.lower().encode(), str(v).encode()) for k, v in headers.items()]
+        if json_body is not None:
+            body = json.dumps(json_body, default=str).encode()
+            raw_headers.append((b"content-type", b"application/json"))
+        raw_headers.append((b"content-length", str(len(body)).encode()))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params or {}, doseq=True).encode(),
+            "root_path": "",
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        sent = False
+
+        async def receive():
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await asyncio.Event().wait()
+
+        status = 0
+        out_headers = {}
+        chunks = []
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for k, v in message.get("headers", []):
+                    out_headers[k.decode().lower()] = v.decode()
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return Result(status, out_headers, b"".join(chunks))
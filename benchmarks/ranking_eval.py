@@ -0,0 +1,95 @@
+"""
+Offline comparison of the search rankers in app.ranking.
+
+    python -m benchmarks.ranking_eval [--queries 500] [--candidates 400] [--k 20]
+    python -m benchmarks.ranking_eval --weights distance=0.5,rating=0.3 --weights distance=0.2,rating=0.5
+
+Every query gets a seeded candidate set in which each nanny has a hidden
+quality. Reviews are drawn from that quality (noisy stars, more reviews for
+busier nannies), and the relevance a parent would assign is the hidden quality
+discounted by distance. Each ranker only sees what search sees (distance,
+12-month average, review count, last review date) and is scored by NDCG@k and
+precision@k against the hidden relevance. Each --weights adds a blended
+variant. The last line times top_k() against a full sort of the candidates.
+"""
+import argparse
+import math
+import random
+import time
+from datetime import datetime, timedelta
+
+from app import ranking
+from app.ranking import BlendedRanker, Candidate, LexicographicRanker
+
+NOW = datetime(2026, 1, 1)
+
+
+def make_query(rng: random.Random, n: int, max_km: float):
+    candidates, relevance = [], {}
+    for nanny_id in range(1, n + 1):
+        quality = rng.betavariate(4, 2)
+        distance = rng.uniform(0, max_km)
+        reviews = int(rng.expovariate(1 / (2 + 20 * quality * rng.random())))
+        stars = [min(5, max(1, round(1 + 4 * quality + rng.gauss(0, 0.9)))) for _ in range(reviews)]
+        last_review_at = NOW - timedelta(days=rng.uniform(0, 365) / (1 + reviews)) if reviews else None
+        candidates.append(Candidate(
+            nanny_id, round(distance, 2), round(sum(stars) / reviews, 2) if reviews else None,
+            reviews, last_review_at, 0.0, {},
+        ))
+        relevance[nanny_id] = quality * math.exp(-distance / 8)
+    return candidates, relevance
+
+
+def ndcg(ranked, relevance, k: int) -> float:
+    dcg = sum(relevance[c.nanny_id] / math.log2(i + 2) for i, c in enumerate(ranked[:k]))
+    ideal = sorted(relevance.values(), reverse=True)[:k]
+    idcg = sum(r / math.log2(i + 2) for i, r in enumerate(ideal))
+    return dcg / idcg if idcg else 0.0
+
+
+def precision(ranked, relevance, k: int) -> float:
+    best = set(sorted(relevance, key=relevance.get, reverse=True)[:k])
+    return len(best & {c.nanny_id for c in ranked[:k]}) / k
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--candidates", type=int, default=400)
+    parser.add_argument("--max-km", type=float, default=25.0)
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--weights", action="append", default=[], help="blended weights, name=value,...")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    queries = [make_query(rng, args.candidates, args.max_km) for _ in range(args.queries)]
+
+    rankers = [("lexicographic", LexicographicRanker()), ("blended", BlendedRanker())]
+    rankers += [(f"blended[{spec}]", BlendedRanker(ranking.parse_weights(spec))) for spec in args.weights]
+    for name, ranker in rankers:
+        total_ndcg = total_precision = 0.0
+        for candidates, relevance in queries:
+            ranked = ranking.top_k(ranker, candidates, args.k, now=NOW)
+            total_ndcg += ndcg(ranked, relevance, args.k)
+            total_precision += precision(ranked, relevance, args.k)
+        print(
+            f"{name:<40} ndcg@{args.k} {total_ndcg / len(queries):.3f}"
+            f"  precision@{args.k} {total_precision / len(queries):.3f}"
+        )
+
+    ranker = rankers[1][1]
+    timings = {}
+    for label, limit in (("top_k", args.k), ("full sort", None)):
+        started = time.perf_counter()
+        for candidates, _ in queries:
+            ranking.top_k(ranker, candidates, limit, now=NOW)
+        timings[label] = (time.perf_counter() - started) / len(queries) * 1000
+    print(
+        f"{args.candidates} candidates: top_k({args.k}) {timings['top_k']:.3f} ms"
+        f"  full sort {timings['full sort']:.3f} ms per query"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Seed a database, drive the hot endpoints in-process and compare against a baseline.
+
+Latencies are wall-clock per request through the full ASGI stack (middleware,
+validation, serialization). Query counts come from the Server-Timing header
+written by app.sql_stats. A scenario regresses when its p95 or its mean query
+count exceeds the stored baseline by more than --tolerance.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BASELINE_PATH = Path(__file__).resolve().parent / "baseline.json"
+
+
+def percentiles(samples):
+    if len(samples) < 2:
+        v = samples[0] if samples else 0.0
+        return v, v, v
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return cuts[49], cuts[94], cuts[98]
+
+
+def build_scenarios(ids: dict, now: datetime, rng: random.Random):
+    nanny_lo, nanny_hi = ids["nanny_ids"]
+    parent_lo, parent_hi = ids["parent_user_ids"]
+    counter = {"bulk": 0}
+
+    def nanny():
+        return rng.randrange(nanny_lo, nanny_hi)
+
+    def parent():
+        return rng.randrange(parent_lo, parent_hi)
+
+    def search(client):
+        return client.get("/nannies/search", params={"parent_user_id": parent()})
+
+    def bulk(client):
+        counter["bulk"] += 1
+        base = now + timedelta(days=400 + counter["bulk"], hours=8)
+        slots = [
+            {"starts_at": (base + timedelta(days=k)).isoformat(),
+             "ends_at": (base + timedelta(days=k, hours=4)).isoformat()}
+            for k in range(rng.randint(5, 20))
+        ]
+        return client.post("/bookings/bulk", json_body={
+            "parent_user_id": parent(), "nanny_id": nanny(), "slots": slots,
+        })
+
+    def reviews(client):
+        return client.get(f"/nannies/{nanny()}/reviews")
+
+    def parent_bookings(client):
+        return client.get(f"/parents/{parent()}/bookings")
+
+    def nanny_bookings(client):
+        return client.get(f"/nannies/{nanny()}/bookings")
+
+    return {
+        "nannies_search": search,
+        "bookings_bulk": bulk,
+        "nanny_reviews": reviews,
+        "parent_bookings": parent_bookings,
+        "nanny_bookings": nanny_bookings,
+    }
+
+
+def run_scenario(client, fn, iterations: int, warmup: int):
+    for _ in range(warmup):
+        fn(client)
+    latencies = []
+    queries = []
+    errors = 0
+    for _ in range(iterations):
+        started = time.perf_counter()
+        result = fn(client)
+        latencies.append((time.perf_counter() - started) * 1000)
+        if result.status >= 400:
+            errors += 1
+        if result.queries is not None:
+            queries.append(result.queries)
+    p50, p95, p99 = percentiles(latencies)
+    return {
+        "iterations": iterations,
+        "errors": errors,
+        "p50_ms": round(p50, 3),
+        "p95_ms": round(p95, 3),
+        "p99_ms": round(p99, 3),
+        "queries_per_request": round(statistics.fmean(queries), 2) if queries else None,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float):
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base["p95_ms"] and current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']}ms > baseline {base['p95_ms']}ms")
+        bq, cq = base.get("queries_per_request"), current.get("queries_per_request")
+        if bq is not None and cq is not None and cq > bq * (1 + tolerance):
+            regressions.append(f"{name}: {cq} queries/request > baseline {bq}")
+    return regressions
+
+
+def main(argv=None):
+    from benchmarks.seed import SCALES
+
+    parser = argparse.ArgumentParser(description="Run the load benchmark suite.")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db", help="reuse this SQLite file instead of a fresh temporary one")
+    parser.add_argument("--only", action="append", help="run only the named scenario (repeatable)")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="nanny-bench-")
+    db_path = args.db or os.path.join(workdir, "bench.db")
+    fresh = not os.path.exists(db_path)
+    # app.db builds its engine at import time, so point it at the bench database first.
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+    os.environ.setdefault("SQL_STATS_ENABLED", "1")
+    # the benchmark is one client hammering the app; keep the limiter out of the numbers
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+
+    from app.db import engine
+    from benchmarks.seed import seed
+
+    scale = SCALES[args.scale]
+    if fresh:
+        print(f"seeding {args.scale} dataset into {db_path}")
+        ids = seed(engine, scale, seed=args.seed)
+    else:
+        ids = {
+            "nanny_ids": [1, scale.nannies + 1],
+            "parent_user_ids": [scale.nannies + 1, scale.users + 1],
+        }
+
+    from app.main import app
+    from benchmarks.client import InProcessClient
+
+    client = InProcessClient(app)
+    rng = random.Random(args.seed)
+    scenarios = build_scenarios(ids, datetime(2026, 1, 1, 12), rng)
+    results = {}
+    try:
+        for name, fn in scenarios.items():
+            if args.only and name not in args.only:
+                continue
+            results[name] = run_scenario(client, fn, args.iterations, args.warmup)
+            r = results[name]
+            print(f"{name:<18} p50 {r['p50_ms']:>8.2f}ms  p95 {r['p95_ms']:>8.2f}ms  "
+                  f"p99 {r['p99_ms']:>8.2f}ms  queries/req {r['queries_per_request']}  errors {r['errors']}")
+    finally:
+        client.close()
+
+    stored = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    if args.update_baseline:
+        stored.setdefault(args.scale, {}).update(results)
+        args.baseline.write_text(json.dumps(stored, indent=2, sort_keys=True) + "\n")
+        print(f"baseline updated: {args.baseline}")
+        return 0
+
+    regressions = compare(results, stored.get(args.scale, {}), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,273 @@
+"""
+Synthetic dataset generator.
+
+Rows are produced by generators and written with Core executemany inserts in
+fixed-size chunks, so memory stays flat even at the "large" scale. Each review
+needs its own completed booking (reviews.booking_id is unique), so those
+bookings are generated on top of the requested booking count.
+"""
+import argparse
+import random
+import time
+from dataclasses import dataclass, asdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, insert
+
+CHUNK = 10_000
+
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    nannies: int
+    reviews: int
+    bookings: int
+    booking_requests: int
+    areas: int
+    tags: int
+    qualifications: int
+    languages: int
+
+
+SCALES = {
+    "tiny": Scale(users=500, nannies=100, reviews=2_000, bookings=1_000, booking_requests=200,
+                  areas=20, tags=15, qualifications=10, languages=8),
+    "small": Scale(users=5_000, nannies=1_000, reviews=20_000, bookings=10_000, booking_requests=2_000,
+                   areas=200, tags=40, qualifications=20, languages=15),
+    "large": Scale(users=50_000, nannies=10_000, reviews=1_000_000, bookings=500_000, booking_requests=50_000,
+                   areas=5_000, tags=120, qualifications=60, languages=40),
+}
+
+# Rough bounding box around Cape Town, where areas are scattered.
+LAT_RANGE = (-34.2, -33.6)
+LNG_RANGE = (18.3, 18.9)
+
+
+def _chunked(engine, table, rows):
+    batch = []
+    total = 0
+    with engine.begin() as conn:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= CHUNK:
+                conn.execute(insert(table), batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            conn.execute(insert(table), batch)
+            total += len(batch)
+    return total
+
+
+def seed(engine, scale: Scale, seed: int = 42, now: datetime = None, log=print) -> dict:
+    """Create the schema and fill it; returns the ids the load driver needs."""
+    import app.models  # noqa: F401  (register every table on Base.metadata)
+    from app import models
+    from app.db import Base
+
+    rng = random.Random(seed)
+    now = now or datetime(2026, 1, 1, 12, 0, 0)
+    Base.metadata.create_all(bind=engine)
+
+    def step(name, table, rows):
+        started = time.perf_counter()
+        n = _chunked(engine, table, rows)
+        log(f"  {name:<28} {n:>9} rows  {time.perf_counter() - started:6.2f}s")
+
+    n_nannies = scale.nannies
+    n_parents = max(scale.users - n_nannies, 1)
+    nanny_ids = range(1, n_nannies + 1)
+    parent_user_ids = range(n_nannies + 1, n_nannies + n_parents + 1)
+    area_ids = range(1, scale.areas + 1)
+
+    area_coords = {
+        a: (rng.uniform(*LAT_RANGE), rng.uniform(*LNG_RANGE)) for a in area_ids
+    }
+
+    step("areas", models.Area.__table__, (
+        {"id": a, "name": f"Area {a}", "lat": area_coords[a][0], "lng": area_coords[a][1]} for a in area_ids
+    ))
+    from app import geo
+
+    with engine.begin() as conn:
+        started = time.perf_counter()
+        n = geo.rebuild_neighbors(conn)
+        log(f"  {'area_neighbors':<28} {n:>9} rows  {time.perf_counter() - started:6.2f}s")
+    step("qualifications", models.Qualification.__table__, (
+        {"id": i, "name": f"Qualification {i}"} for i in range(1, scale.qualifications + 1)
+    ))
+    step("nanny_tags", models.NannyTag.__table__, (
+        {"id": i, "name": f"Tag {i}"} for i in range(1, scale.tags + 1)
+    ))
+    step("languages", models.Language.__table__, (
+        {"id": i, "name": f"Language {i}"} for i in range(1, scale.languages + 1)
+    ))
+
+    def users():
+        for uid in range(1, n_nannies + n_parents + 1):
+            role = "nanny" if uid <= n_nannies else "parent"
+            yield {
+                "id": uid,
+                "name": f"{role.title()} {uid}",
+                "role": role,
+                "email": f"{role}{uid}@bench.example",
+                "password_hash": "!",
+                "phone": f"+2782{uid:07d}",
+                "nickname": f"{role[:1]}{uid}" if uid % 3 else None,
+                "last_initial": chr(65 + uid % 26),
+                "profile_photo_url": None,
+            }
+
+    step("users", models.User.__table__, users())
+    step("nannies", models.Nanny.__table__, (
+        {"id": n, "user_id": n, "approved": rng.random() < 0.8} for n in nanny_ids
+    ))
+
+    nanny_home = {n: rng.choice(area_ids) for n in nanny_ids}
+
+    def profiles():
+        for n in nanny_ids:
+            lat, lng = area_coords[nanny_home[n]]
+            yield {
+                "id": n,
+                "nanny_id": n,
+                "bio": f"Experienced nanny {n}. Loves outdoor play and reading.",
+                "date_of_birth": date(1970, 1, 1) + timedelta(days=rng.randint(0, 365 * 35)),
+                "nationality": rng.choice(["South African", "Zimbabwean", "Malawian", "British"]),
+                "ethnicity": None,
+                "lat": lat + rng.uniform(-0.02, 0.02),
+                "lng": lng + rng.uniform(-0.02, 0.02),
+            }
+
+    step("nanny_profiles", models.NannyProfile.__table__, profiles())
+
+    def nanny_areas():
+        for n in nanny_ids:
+            extra = rng.sample(area_ids, k=min(rng.randint(0, 2), len(area_ids)))
+            for a in {nanny_home[n], *extra}:
+                yield {"nanny_id": n, "area_id": a}
+
+    step("nanny_areas", models.NannyArea.__table__, nanny_areas())
+
+    def facet(column, count, k):
+        def rows():
+            for n in nanny_ids:
+                for fid in rng.sample(range(1, count + 1), k=min(rng.randint(0, k), count)):
+                    yield {"nanny_profile_id": n, column: fid}
+        return rows()
+
+    step("nanny_profile_qualifications", models.nanny_profile_qualifications,
+         facet("qualification_id", scale.qualifications, 3))
+    step("nanny_profile_tags", models.nanny_profile_tags, facet("tag_id", scale.tags, 5))
+    step("nanny_profile_languages", models.nanny_profile_languages, facet("language_id", scale.languages, 2))
+
+    def parent_profiles():
+        for uid in parent_user_ids:
+            a = rng.choice(area_ids)
+            lat, lng = area_coords[a]
+            yield {
+                "user_id": uid,
+                "area_id": a,
+                "lat": lat + rng.uniform(-0.02, 0.02),
+                "lng": lng + rng.uniform(-0.02, 0.02),
+                "location_confirmed_at": now,
+                "location_confirm_version": "v1",
+            }
+
+    step("parent_profiles", models.ParentProfile.__table__, parent_profiles())
+
+    def bookings():
+        statuses = ["pending", "accepted", "rejected", "cancelled", "completed"]
+        for bid in range(1, scale.bookings + scale.reviews + 1):
+            reviewed = bid > scale.bookings
+            starts = now + timedelta(hours=rng.randint(-24 * 540 if reviewed else -24 * 180, -2 if reviewed else 24 * 180))
+            ends = starts + timedelta(hours=rng.randint(1, 8))
+            yield {
+                "id": bid,
+                "nanny_id": rng.choice(nanny_ids),
+                "client_user_id": rng.choice(parent_user_ids),
+                "day": starts.date(),
+                "status": "completed" if reviewed else rng.choice(statuses),
+                "price_cents": 0,
+                "starts_at": starts,
+                "ends_at": ends,
+                "lat": None,
+                "lng": None,
+                "location_mode": "default",
+                "location_label": "Home",
+            }
+
+    step("bookings", models.Booking.__table__, bookings())
+
+    def reviews():
+        for i in range(scale.reviews):
+            bid = scale.bookings + i + 1
+            yield {
+                "id": i + 1,
+                "booking_id": bid,
+                "parent_user_id": rng.choice(parent_user_ids),
+                "nanny_id": rng.choice(nanny_ids),
+                "stars": rng.choices([1, 2, 3, 4, 5], weights=[1, 2, 6, 20, 30])[0],
+                "comment": "Great with the kids." if rng.random() < 0.6 else None,
+                "approved": rng.random() < 0.9,
+                "created_at": now - timedelta(minutes=rng.randint(0, 60 * 24 * 540)),
+            }
+
+    step("reviews", models.Review.__table__, reviews())
+
+    # the rating aggregate and the search documents are maintained on every write
+    # (and backfilled on read or at startup where missing); build them the way the
+    # rebuild command does so the benchmark measures the steady state
+    from app import search_index
+
+    started = time.perf_counter()
+    n = search_index.rebuild(engine, progress=None)
+    log(f"  {'nanny_search_documents':<28} {n:>9} rows  {time.perf_counter() - started:6.2f}s")
+
+    request_nanny = {r: rng.choice(nanny_ids) for r in range(1, scale.booking_requests + 1)}
+    step("booking_requests", models.BookingRequest.__table__, (
+        {
+            "id": r,
+            "parent_user_id": rng.choice(parent_user_ids),
+            "nanny_id": request_nanny[r],
+            "status": rng.choice(["pending", "approved", "declined"]),
+            "payment_status": "pending_payment",
+            "created_at": now,
+            "updated_at": now,
+        }
+        for r in request_nanny
+    ))
+
+    def request_slots():
+        for r in request_nanny:
+            base = now + timedelta(days=rng.randint(-30, 90), hours=rng.randint(6, 18))
+            for k in range(rng.randint(1, 4)):
+                starts = base + timedelta(days=k)
+                yield {"booking_request_id": r, "starts_at": starts, "ends_at": starts + timedelta(hours=3)}
+
+    step("booking_request_slots", models.BookingRequestSlot.__table__, request_slots())
+
+    return {
+        "nanny_ids": [nanny_ids.start, nanny_ids.stop],
+        "parent_user_ids": [parent_user_ids.start, parent_user_ids.stop],
+        "scale": asdict(scale),
+        "seed": seed,
+        "now": now.isoformat(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a synthetic nanny database.")
+    parser.add_argument("--db", required=True, help="SQLite file to create (must not exist)")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    engine = create_engine(f"sqlite:///{args.db}")
+    started = time.perf_counter()
+    seed(engine, SCALES[args.scale], seed=args.seed)
+    print(f"seeded {args.scale} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
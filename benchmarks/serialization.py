@@ -0,0 +1,118 @@
+"""
+CPU cost of turning handler output into response bytes, per 1,000 results.
+
+    python -m benchmarks.serialization [--rows 1000] [--repeat 50]
+
+Compares FastAPI's default path (response_model validation, dump to Python
+primitives, stdlib json encoding) with app.responses.model_response for the
+search and booking-list payloads. No database is involved; rows are synthetic
+but shaped exactly like the handlers build them.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+
+from app.responses import model_response
+from app.schemas import BookingListResponse, SearchNanniesResponse
+
+
+def search_payload(n: int, rng: random.Random) -> dict:
+    facets = [{"id": i, "name": f"facet {i}"} for i in range(1, 9)]
+    return {
+        "results": [
+            {
+                "nanny_id": i,
+                "approved": True,
+                "user_id": 1000 + i,
+                "name": f"Nanny {i}",
+                "nickname": None,
+                "last_initial": "K",
+                "profile_photo_url": f"https://example.com/p/{i}.jpg",
+                "bio": "Experienced with toddlers and school-age children. " * 3,
+                "date_of_birth": date(1990, 1, 1) + timedelta(days=i % 5000),
+                "age": 30,
+                "nationality": "NZ",
+                "ethnicity": None,
+                "qualifications": rng.sample(facets, 2),
+                "tags": rng.sample(facets, 3),
+                "languages": rng.sample(facets, 2),
+                "average_rating_12m": round(rng.uniform(3, 5), 2),
+                "review_count_12m": rng.randrange(40),
+                "distance_km": round(rng.uniform(0, 25), 2),
+            }
+            for i in range(n)
+        ],
+        "code": None,
+        "message": None,
+    }
+
+
+def bookings_payload(n: int, rng: random.Random) -> dict:
+    start = datetime(2026, 1, 1, 8)
+    return {
+        "results": [
+            {
+                "booking_id": i,
+                "parent_user_id": rng.randrange(1, 500),
+                "nanny_id": rng.randrange(1, 500),
+                "starts_at": start + timedelta(hours=i),
+                "ends_at": start + timedelta(hours=i + 3),
+                "status": "confirmed",
+                "lat": -36.85 + rng.random() / 10,
+                "lng": 174.76 + rng.random() / 10,
+            }
+            for i in range(n)
+        ]
+    }
+
+
+def default_path(field, payload) -> bytes:
+    content = asyncio.run(serialize_response(field=field, response_content=payload))
+    return JSONResponse(content).body
+
+
+def fast_path(schema, payload) -> bytes:
+    return model_response(schema, payload).body
+
+
+def cpu_ms(fn, repeat: int) -> float:
+    fn()  # warm up
+    started = time.process_time()
+    for _ in range(repeat):
+        fn()
+    return (time.process_time() - started) * 1000 / repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(42)
+    cases = [
+        ("nannies_search", SearchNanniesResponse, search_payload(args.rows, rng)),
+        ("bookings_list", BookingListResponse, bookings_payload(args.rows, rng)),
+    ]
+    per_k = 1000 / args.rows
+    for name, schema, payload in cases:
+        field = create_model_field(name="Response_" + name, type_=schema, mode="serialization")
+        if json.loads(default_path(field, payload)) != json.loads(fast_path(schema, payload)):
+            raise SystemExit(f"{name}: the two paths produce different JSON")
+        slow = cpu_ms(lambda: default_path(field, payload), args.repeat) * per_k
+        fast = cpu_ms(lambda: fast_path(schema, payload), args.repeat) * per_k
+        print(
+            f"{name:<16} default {slow:8.2f} ms  model_response {fast:8.2f} ms"
+            f"  saved {slow - fast:8.2f} ms per 1000 results ({slow / fast:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Idle booking-event streams held by one worker.
+
+    python -m benchmarks.sse_idle [--connections 5000] [--users 1000]
+
+Opens --connections Server-Sent Events streams (GET /users/{id}/booking-events)
+against the app in a single event loop, spread over --users parents, and
+leaves them idle. Then it reports the memory they hold and how long events
+take to reach them:
+
+- local: POST /bookings in this worker, until the parent's streams get it;
+- remote: one event per user inserted straight into booking_events, as
+  another worker would, until every stream got its one (bounded by
+  EVENTS_POLL_INTERVAL);
+- resume: a new stream sent Last-Event-ID replays what it missed.
+
+Finally every client disconnects and the broker must be left with no
+subscribers. Runs in-process against a throwaway SQLite database.
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import tempfile
+import time
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as fh:
+            for line in fh:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Stream:
+    """One SSE client: sends the request, then stays connected until close()."""
+
+    def __init__(self, app, user_id: int, last_event_id=None):
+        self.app = app
+        self.user_id = user_id
+        self.last_event_id = last_event_id
+        self.status = None
+        self.text = ""
+        self.changed = asyncio.Event()
+        self._closed = asyncio.Event()
+        self.task = None
+
+    def open(self):
+        self.task = asyncio.get_running_loop().create_task(self._run())
+        return self
+
+    def close(self):
+        self._closed.set()
+
+    async def wait_for(self, needle: str) -> None:
+        while needle not in self.text:
+            self.changed.clear()
+            await self.changed.wait()
+
+    async def _run(self):
+        headers = [(b"accept", b"text/event-stream")]
+        if self.last_event_id is not None:
+            headers.append((b"last-event-id", str(self.last_event_id).encode()))
+        path = f"/users/{self.user_id}/booking-events"
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+            "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+            "query_string": b"", "root_path": "", "headers": headers,
+            "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+        }
+        requested = False
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await self._closed.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                self.status = message["status"]
+            elif message["type"] == "http.response.body":
+                self.text += message.get("body", b"").decode()
+                self.changed.set()
+
+        await self.app(scope, receive, send)
+
+
+async def post(app, path: str, body: bytes) -> int:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+        "method": "POST", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": b"", "root_path": "",
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000), "server": ("testserver", 80),
+    }
+    status = 0
+
+    async def receive():
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def seed_users(engine, users: int) -> int:
+    """Parents 1..users plus one nanny; returns the nanny id."""
+    from sqlalchemy import insert
+
+    from app import models
+
+    with engine.begin() as conn:
+        conn.execute(insert(models.User.__table__), [
+            {"id": i, "name": f"User {i}", "role": "parent", "email": f"u{i}@example.com", "password_hash": "x"}
+            for i in range(1, users + 2)
+        ])
+        conn.execute(insert(models.Nanny.__table__), [{"id": 1, "user_id": users + 1, "approved": True}])
+    return 1
+
+
+def remote_events(engine, users: int) -> None:
+    from sqlalchemy import insert
+
+    from app import models
+    from datetime import datetime
+
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        conn.execute(insert(models.BookingEvent.__table__), [
+            {"user_id": u, "kind": "booking_request", "entity_id": u, "status": "declined", "created_at": now}
+            for u in range(1, users + 1)
+        ])
+
+
+async def main_async(args) -> int:
+    from app.db import engine
+    from app.main import app
+    from app import events
+
+    nanny_id = seed_users(engine, args.users)
+
+    base_rss = rss_mb()
+    started = time.perf_counter()
+    streams = [Stream(app, 1 + i % args.users).open() for i in range(args.connections)]
+    await asyncio.gather(*(s.wait_for("retry:") for s in streams))
+    open_s = time.perf_counter() - started
+    bad = sum(1 for s in streams if s.status != 200)
+    held_mb = rss_mb() - base_rss
+    print(
+        f"{args.connections} streams open in {open_s:.2f}s  subscribers {events.broker.subscribers}"
+        f"  rss +{held_mb:.1f} MB ({held_mb * 1024 / args.connections:.1f} KB/stream)  non-200 {bad}"
+    )
+
+    await asyncio.sleep(args.idle)
+    idle_ok = all(not s.task.done() for s in streams)
+    print(f"idle {args.idle:.1f}s: all streams still open {idle_ok}")
+
+    target = [s for s in streams if s.user_id == 1]
+    body = (
+        f'{{"parent_user_id": 1, "nanny_id": {nanny_id}, "starts_at": "2030-01-07T09:00:00",'
+        f' "ends_at": "2030-01-07T12:00:00", "location_mode": "current", "location_label": "home",'
+        f' "lat": -33.9, "lng": 18.4}}'
+    ).encode()
+    started = time.perf_counter()
+    status = await post(app, "/bookings", body)
+    await asyncio.gather(*(s.wait_for("event: booking\n") for s in target))
+    print(f"local: POST /bookings {status}, delivered to {len(target)} streams in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    started = time.perf_counter()
+    await asyncio.get_running_loop().run_in_executor(None, remote_events, engine, args.users)
+    await asyncio.gather(*(s.wait_for("event: booking_request") for s in streams))
+    print(f"remote: {args.users} events reached all {len(streams)} streams in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    resumed = Stream(app, 1, last_event_id=0).open()
+    await resumed.wait_for("event: booking_request")
+    replayed = resumed.text.count("\nevent: ")
+    print(f"resume: Last-Event-ID 0 replayed {replayed} events for user 1")
+
+    for s in streams + [resumed]:
+        s.close()
+    await asyncio.gather(*(s.task for s in streams + [resumed]))
+    left = events.broker.subscribers
+    print(f"disconnected: subscribers left {left}")
+    return 0 if bad == 0 and idle_ok and left == 0 and replayed >= 2 else 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--idle", type=float, default=2.0, help="seconds to leave the streams idle")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="nanny-sse-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'sse.db')}"
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "0")
+    return asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())